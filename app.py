@@ -1,40 +1,64 @@
 # ===========================================
 # 🏠 Celo Imóveis - Aplicação Flask com Cloudinary
 # ===========================================
-from flask import Flask, render_template, request, redirect, url_for, flash
-from flask_login import LoginManager, login_user, login_required, logout_user, UserMixin
-from datetime import datetime
-from dotenv import load_dotenv
-import sqlite3
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, g, session, make_response, \
+    send_from_directory, abort
+from flask_login import LoginManager, login_user, login_required, logout_user, UserMixin, current_user
+from urllib.parse import urlencode
+from datetime import datetime, timezone
+from jinja2 import FileSystemBytecodeCache
 import os
-import cloudinary
-import cloudinary.uploader
+import hashlib
+import json
+import mimetypes
+import hmac
+import time
+import ativos
+import banco
+import cache_paginas
+import compressao
+import congelar
+import consultas
+import fila_fotos
+import imagens
+import metricas
 
 # ===========================================
 # ⚙️ Configurações Iniciais
 # ===========================================
-load_dotenv()
+# .env só existe em desenvolvimento; no Render as variáveis já vêm do ambiente
+_ENV = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+if os.path.exists(_ENV):
+    from dotenv import load_dotenv
+    load_dotenv(_ENV)
 
 app = Flask(__name__)
 
+# 🧩 Templates compilados guardados em disco (bytecode do Jinja, refeito só
+# quando o template muda): worker novo não recompila nada. JINJA_CACHE_DIR=off desliga.
+PASTA_JINJA = os.getenv("JINJA_CACHE_DIR", os.path.join(app.root_path, ".cache_jinja"))
+if PASTA_JINJA.lower() != "off":
+    os.makedirs(PASTA_JINJA, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(PASTA_JINJA)
+
 # 🔐 Segurança
 app.secret_key = os.getenv("SECRET_KEY")
 
 # 🗄️ Banco de dados
-DATABASE = "database.db"
+DATABASE = banco.DATABASE
+
+# 📊 Métricas de desempenho (METRICAS=off desliga)
+metricas.instalar(app)
+
+# 📦 Arquivos estáticos com hash no nome (ver ativos.py) e respostas comprimidas (COMPRESSAO=off desliga)
+ATIVOS = ativos.Registro(app.static_folder)
+app.url_map.converters["ativo"] = ativos.conversor(ATIVOS)
+compressao.instalar(app)
 
 # 👤 Credenciais admin
 ADMIN_USERNAME = os.getenv("ADMIN_USERNAME")
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD")
 
-# ☁️ Configuração Cloudinary
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
-    secure=True
-)
-
 # ===========================================
 # 🔑 Flask-Login
 # ===========================================
@@ -54,9 +78,145 @@ def load_user(user_id):
 # 🗄️ Banco de Dados
 # ===========================================
 def get_db_connection():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Conexão da requisição atual (reaproveitada da thread, não feche)."""
+    if "db" not in g:
+        g.db = banco.conexao_da_thread(DATABASE)
+    return g.db
+
+@app.teardown_appcontext
+def liberar_conexao(exc):
+    conn = g.pop("db", None)
+    if conn is not None and conn.in_transaction:
+        # Requisição terminou com erro no meio de uma escrita
+        conn.rollback()
+
+# 🧱 Garante colunas numéricas e índices (idempotente)
+_conn = banco.conectar(DATABASE)
+banco.garantir_schema(_conn)
+FTS_DISPONIVEL = banco.tem_fts(_conn)
+GEO_DISPONIVEL = banco.tem_geo(_conn)
+fila_fotos.garantir_tabela(_conn)
+_conn.close()
+
+# ===========================================
+# 📸 Fila de upload de fotos
+# ===========================================
+_cloudinary = {}
+
+def enviar_foto_cloudinary(caminho):
+    # ☁️ SDK do Cloudinary (~70 ms de import) carregado e configurado no primeiro upload, não na subida
+    if "enviar" not in _cloudinary:
+        from migrar_imagens_cloudinary import uploader_cloudinary
+        _cloudinary["enviar"] = uploader_cloudinary()
+    with metricas.cronometro("cloudinary_upload"):
+        return _cloudinary["enviar"](caminho)
+
+def atualizar_semelhantes():
+    # 🧭 semelhantes.py (e o NumPy, ~100 ms de import) carregado na primeira escrita, não na subida;
+    # o cálculo roda numa thread: a rota não espera nem um recálculo completo
+    import semelhantes
+    semelhantes.agendar(DATABASE)
+
+def enfileirar_fotos(conn, imovel_id):
+    """Guarda as fotos do formulário na fila; o envio acontece em segundo plano."""
+    total = fila_fotos.enfileirar(conn, imovel_id, request.files.getlist("fotos"))
+    conn.commit()
+    if total:
+        fila_fotos.iniciar_trabalhador(enviar_foto_cloudinary, DATABASE)
+    return total
+
+# ===========================================
+# 🧠 Cache de páginas renderizadas
+# ===========================================
+cache = cache_paginas.criar_cache()
+# Marca no environ das requisições do congelar.py (um cliente HTTP não consegue
+# pôr isso lá): a exportação renderiza tudo sem encher os caches dos visitantes
+EXPORTACAO = "celo.exportacao"
+
+def pagina_em_cache(chave, gerar):
+    """
+    Devolve o HTML guardado para `chave` ou chama gerar() e guarda o resultado.
+    A versão do catálogo entra na chave: qualquer escrita em imoveis invalida tudo
+    (e a dos templates/ativos: um deploy não reaproveita HTML com URLs antigas).
+    Usuário logado, mensagens flash pendentes ou exportação estática: sempre a página nova.
+    """
+    if cache is None or request.environ.get(EXPORTACAO) or current_user.is_authenticated or session.get("_flashes"):
+        return gerar()
+
+    chave = f"v{banco.versao_catalogo(get_db_connection())}|{VERSAO_TEMPLATES}|{chave}"
+    html = cache.get(chave)
+    if html is None:
+        html = gerar()
+        cache.set(chave, html)
+    return html
+
+# ===========================================
+# 📊 Facetas (contagens da barra de filtros)
+# ===========================================
+# Sempre em memória: são poucos números por combinação de filtros, e a
+# versão do catálogo na chave descarta tudo a cada escrita em imoveis.
+cache_facetas = cache_paginas.CacheMemoria(max_itens=int(os.getenv("FACETAS_CACHE_MAX", "1000")), ttl=3600)
+
+def facetas_em_cache(conn, filtros):
+    """Contagens de consultas.facetas para a busca atual, uma consulta por versão do catálogo."""
+    if request.environ.get(EXPORTACAO):
+        return consultas.facetas(conn, filtros, fts=FTS_DISPONIVEL, geo=GEO_DISPONIVEL)
+    chave = f"v{banco.versao_catalogo(conn)}|{consultas.chave_facetas(filtros)}"
+    resultado = cache_facetas.get(chave)
+    if resultado is None:
+        with metricas.cronometro("facetas"):
+            resultado = consultas.facetas(conn, filtros, fts=FTS_DISPONIVEL, geo=GEO_DISPONIVEL)
+        cache_facetas.set(chave, resultado)
+    return resultado
+
+# ===========================================
+# 🏷️ Respostas condicionais (ETag / Last-Modified)
+# ===========================================
+def _versao_templates():
+    """Hash dos templates e dos ativos: um deploy com HTML ou CSS novo muda todos os ETags."""
+    h = hashlib.sha1()
+    pasta = os.path.join(app.root_path, app.template_folder)
+    for raiz, _, arquivos in sorted(os.walk(pasta)):
+        for nome in sorted(arquivos):
+            with open(os.path.join(raiz, nome), "rb") as f:
+                h.update(f.read())
+    h.update(ATIVOS.versao.encode())  # CSS/imagens novos mudam as URLs com hash no HTML
+    return h.hexdigest()[:10]
+
+VERSAO_TEMPLATES = _versao_templates()
+
+def _data_sqlite(texto):
+    """'2025-10-06 12:00:00' (UTC, formato do SQLite) → datetime com fuso."""
+    if not texto:
+        return None
+    return datetime.strptime(texto, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+
+def resposta_condicional(etag, atualizado_em, gerar):
+    """
+    Responde 304 se o navegador já tem esta versão (If-None-Match / If-Modified-Since),
+    sem renderizar nada; senão chama gerar(). Só para visitantes anônimos.
+    """
+    if current_user.is_authenticated or session.get("_flashes"):
+        return gerar()
+
+    etag = f"{etag}-{VERSAO_TEMPLATES}"
+    ultima_modificacao = _data_sqlite(atualizado_em)
+
+    if request.if_none_match:
+        # Comparação fraca: a resposta comprimida leva W/"..." (ver compressao.py)
+        nao_mudou = request.if_none_match.contains_weak(etag)
+    else:
+        nao_mudou = bool(request.if_modified_since and ultima_modificacao
+                         and ultima_modificacao <= request.if_modified_since)
+
+    resposta = app.response_class(status=304) if nao_mudou else make_response(gerar())
+    resposta.set_etag(etag)
+    if ultima_modificacao:
+        resposta.last_modified = ultima_modificacao
+    # Pode guardar, mas sempre confirma com o servidor (barato: 304)
+    resposta.headers["Cache-Control"] = "no-cache"
+    resposta.vary.add("Cookie")
+    return resposta
 
 # ===========================================
 # 🏠 Página Inicial
@@ -65,56 +225,232 @@ def get_db_connection():
 def index():
     conn = get_db_connection()
 
-    busca = request.args.get("busca", "").strip()
-    ordenar = request.args.get("ordenar", "").strip()
-    destaque = request.args.get("destaque", "").strip()
+    filtros = consultas.ler_filtros(request.args)
+    busca = filtros["busca"]
 
-    where_clauses = []
-    params = []
+    # 🔢 "Buscar por ID": "15" ou "#15" abre direto o imóvel
+    if busca.lstrip("#").isdigit() and not request.args.get("cursor"):
+        id_busca = int(busca.lstrip("#"))
+        if conn.execute("SELECT 1 FROM imoveis WHERE id=?", (id_busca,)).fetchone():
+            return redirect(url_for("detalhes", id=id_busca))
 
-    if busca:
-        where_clauses.append("(titulo LIKE ? OR descricao LIKE ?)")
-        params.extend([f"%{busca}%", f"%{busca}%"])
+    cursor = request.args.get("cursor", "")
 
-    if destaque == "1":
-        where_clauses.append("destaque = 1")
+    def gerar():
+        imoveis, proximo_cursor = consultas.buscar_pagina(conn, filtros, cursor=cursor, fts=FTS_DISPONIVEL,
+                                                          geo=GEO_DISPONIVEL)
 
-    where_sql = ("WHERE " + " AND ".join(where_clauses)) if where_clauses else ""
+        # ⏩ Próxima página: mesmos filtros + cursor (HTML sem JS e API para o scroll infinito)
+        proxima_url = api_proxima_url = None
+        if proximo_cursor:
+            args = {**request.args.to_dict(), "cursor": proximo_cursor}
+            proxima_url = url_for("index", **args)
+            api_proxima_url = url_for("api_imoveis", **args)
 
-    if ordenar == "preco_asc":
-        order_sql = "ORDER BY CAST(REPLACE(REPLACE(REPLACE(preco, 'R$', ''), '.', ''), ',', '') AS INTEGER) ASC"
-    elif ordenar == "preco_desc":
-        order_sql = "ORDER BY CAST(REPLACE(REPLACE(REPLACE(preco, 'R$', ''), '.', ''), ',', '') AS INTEGER) DESC"
-    else:
-        order_sql = "ORDER BY id DESC"
+        # 📍 Com área do mapa / "perto de mim": link para voltar à listagem sem localização
+        sem_localizacao_url = None
+        if consultas.area_geografica(filtros):
+            sem_localizacao_url = url_for("index", **{k: v for k, v in request.args.items()
+                                                      if k not in ("bbox", "lat", "lon", "raio", "cursor")})
 
-    query = f"SELECT * FROM imoveis {where_sql} {order_sql}"
-    imoveis = conn.execute(query, params).fetchall()
-    conn.close()
+        current_year = datetime.now().year
+        return render_template("index.html", imoveis=imoveis, proxima_url=proxima_url,
+                               api_proxima_url=api_proxima_url, facetas=facetas_em_cache(conn, filtros),
+                               sem_localizacao_url=sem_localizacao_url, current_year=current_year)
 
-    current_year = datetime.now().year
-    return render_template("index.html", imoveis=imoveis, current_year=current_year)
+    # Chave normalizada: só filtros conhecidos, em ordem fixa
+    chave = "/?" + urlencode(sorted((k, v) for k, v in {**filtros, "cursor": cursor}.items() if v))
+    versao, atualizado_em = banco.estado_catalogo(conn)
+    return resposta_condicional(f"c{versao}", atualizado_em, lambda: pagina_em_cache(chave, gerar))
 
 # ===========================================
-# 🏘️ Detalhes do Imóvel
+# 📡 API: listagem paginada (carregamento sob demanda)
 # ===========================================
-@app.route("/imovel/<int:id>")
-def detalhes(id):
+@app.route("/api/imoveis")
+def api_imoveis():
+    filtros = consultas.ler_filtros(request.args)
+    limite = consultas.limite_pagina(request.args.get("limite"))
+
+    cursor = request.args.get("cursor")
     conn = get_db_connection()
-    imovel = conn.execute("SELECT * FROM imoveis WHERE id=?", (id,)).fetchone()
-    conn.close()
-    if not imovel:
-        return "Imóvel não encontrado"
+    imoveis, proximo_cursor = consultas.buscar_pagina(
+        conn, filtros, cursor=cursor, limite=limite, fts=FTS_DISPONIVEL, geo=GEO_DISPONIVEL
+    )
+
+    resposta = {
+        "imoveis": [card_json(imovel) for imovel in imoveis],
+        "proximo_cursor": proximo_cursor,
+    }
+    # 📊 Facetas só na primeira página (ou com ?facetas=1): o scroll infinito não precisa
+    if not cursor or request.args.get("facetas") == "1":
+        resposta["facetas"] = facetas_em_cache(conn, filtros)
+    return jsonify(resposta)
+
+def card_json(imovel):
+    return {
+        "id": imovel["id"],
+        "titulo": imovel["titulo"],
+        "preco": imovel["preco"],
+        "preco_centavos": imovel["preco_centavos"],
+        "dormitorios": imovel["dormitorios"],
+        "banheiros": imovel["banheiros"],
+        "vagas": imovel["vagas"],
+        "area": imovel["area"],
+        "area_m2": imovel["area_m2"],
+        "destaque": bool(imovel["destaque"]),
+        "bairro": imovel["bairro"],
+        "cidade": imovel["cidade"],
+        "latitude": imovel["latitude"],
+        "longitude": imovel["longitude"],
+        "distancia_km": distancia_km(imovel),
+        "capa": foto_variantes(imovel["capa"])["src"] if imovel["capa"] else None,
+        "capa_srcset": foto_variantes(imovel["capa"])["srcset"] if imovel["capa"] else "",
+        "url": url_for("detalhes", id=imovel["id"]),
+    }
+
+@app.template_global()
+def distancia_km(imovel):
+    """Km até o ponto da busca "perto de mim" (1 casa decimal), ou None."""
+    distancia = consultas.distancia_km(imovel)
+    return None if distancia is None else round(distancia, 1)
+
+@app.template_global()
+def foto_url(foto):
+    """Cloudinary (http...) fica como está; foto local vira /static/uploads/..."""
+    if foto.startswith("http"):
+        return foto
+    return url_for("static", filename=f"uploads/{foto}")
+
+@app.template_global()
+def foto_variantes(foto):
+    """Miniaturas/formatos da foto para srcset (ver imagens.py)."""
+    return imagens.variantes(
+        foto,
+        foto_url,
+        lambda arquivo: url_for("static", filename=f"uploads/derivadas/{arquivo}"),
+    )
 
-    fotos = []
-    if imovel["fotos"]:
-        for f in imovel["fotos"].split(","):
-            if f.startswith("http"):  # Se for Cloudinary
-                fotos.append(f)
-            else:  # Se for local (antigo)
-                fotos.append(url_for("static", filename=f"uploads/{f}"))
+# ===========================================
+# 🔄 API: sincronização do catálogo (PWA offline)
+# ===========================================
+# O service worker baixa o snapshot uma vez, guarda no IndexedDB e depois
+# só pede /api/imoveis/changes?since=<versão que já tem>.
+# Um corpo por codificação (identity, gzip, br) da versão atual: comprimir
+# os ~2,5 MB do snapshot a cada pedido custaria ~100 ms de CPU
+cache_snapshot = cache_paginas.CacheMemoria(max_itens=3, ttl=3600)
+
+def linhas_sincronizacao(linhas):
+    """Linhas de consultas.snapshot/mudancas com a capa já como URL (a mesma do card)."""
+    return [[*linha[:-1], foto_variantes(linha[-1])["src"] if linha[-1] else None] for linha in linhas]
+
+@app.route("/api/imoveis/snapshot")
+def api_snapshot():
+    conn = get_db_connection()
+    versao, atualizado_em = banco.estado_catalogo(conn)
+
+    def gerar():
+        # Um JSON por versão do catálogo: todos os visitantes recebem o mesmo, já comprimido
+        codificacao = compressao.escolher(request.accept_encodings) if compressao.ATIVO else None
+        corpo = cache_snapshot.get(f"v{versao}|{codificacao}")
+        if corpo is None:
+            versao_lida, linhas = consultas.snapshot(conn)
+            corpo = json.dumps({"versao": versao_lida, "campos": consultas.CAMPOS_SINCRONIZACAO,
+                                "imoveis": linhas_sincronizacao(linhas)},
+                               ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            if codificacao:
+                corpo = compressao.comprimir(corpo, codificacao)
+            cache_snapshot.set(f"v{versao_lida}|{codificacao}", corpo)
+        resposta = app.response_class(corpo, mimetype="application/json")
+        if codificacao:
+            resposta.headers["Content-Encoding"] = codificacao
+        resposta.vary.add("Accept-Encoding")
+        return resposta
+
+    return resposta_condicional(f"s{versao}", atualizado_em, gerar)
+
+@app.route("/api/imoveis/changes")
+def api_mudancas():
+    desde = banco.inteiro(request.args.get("since"), -1)
+    conn = get_db_connection()
+    resultado = consultas.mudancas(conn, desde) if desde >= 0 else None
+    if resultado is None:
+        # Versão desconhecida ou anterior ao histórico: o cliente recomeça pelo snapshot
+        return jsonify({"erro": "versão fora do histórico", "snapshot": url_for("api_snapshot")}), 410
+
+    versao, linhas, removidos = resultado
+    return jsonify({
+        "versao": versao,
+        "desde": desde,
+        "campos": consultas.CAMPOS_SINCRONIZACAO,
+        "imoveis": linhas_sincronizacao(linhas),
+        "removidos": removidos,
+    })
 
-    return render_template("detalhes.html", imovel=imovel, fotos=fotos)
+# ===========================================
+# 📦 Arquivos estáticos (hash no nome) e service worker
+# ===========================================
+@app.route("/ativos/<ativo:filename>")
+def ativo(filename):
+    """Arquivo de static/ com o hash do conteúdo no nome: pode ficar em cache para sempre."""
+    relativo, imutavel = ATIVOS.resolver(filename)
+    if relativo is None:
+        abort(404)
+    arquivo, codificacao = ATIVOS.variante(relativo, request.accept_encodings)
+    resposta = send_from_directory(app.static_folder, arquivo,
+                                   mimetype=mimetypes.guess_type(relativo)[0] or "application/octet-stream")
+    if codificacao:
+        resposta.headers["Content-Encoding"] = codificacao
+    resposta.vary.add("Accept-Encoding")
+    resposta.headers["Cache-Control"] = "public, max-age=31536000, immutable" if imutavel else "no-cache"
+    return resposta
+
+def _gerar_service_worker():
+    """service-worker.js com a lista de ativos (com hash) e a versão do cache preenchidas."""
+    with open(os.path.join(app.static_folder, "js", "service-worker.js"), encoding="utf-8") as f:
+        codigo = f.read()
+    pre_cache = {relativo: url_for("ativo", filename=relativo) for relativo in ATIVOS.pre_cache()}
+    codigo = codigo.replace('const VERSAO_ATIVOS = "dev";', f'const VERSAO_ATIVOS = "{VERSAO_TEMPLATES}";', 1)
+    return codigo.replace("const ATIVOS = {};", f"const ATIVOS = {json.dumps(pre_cache, sort_keys=True)};", 1)
+
+@app.route("/service-worker.js")
+def service_worker():
+    """
+    Servido na raiz para o escopo ser o site todo (em /static/js/ ele só controlaria /static/js/).
+    Muda a cada deploy com CSS/imagens/templates novos: o navegador instala a versão nova sozinho.
+    """
+    resposta = app.response_class(_gerar_service_worker(), mimetype="application/javascript")
+    resposta.set_etag(f"sw-{VERSAO_TEMPLATES}")
+    resposta.headers["Cache-Control"] = "no-cache"
+    return resposta.make_conditional(request)
+
+# ===========================================
+# 🏘️ Detalhes do Imóvel
+# ===========================================
+@app.route("/imovel/<int:id>")
+def detalhes(id):
+    def gerar():
+        conn = get_db_connection()
+        imovel = conn.execute("SELECT * FROM imoveis WHERE id=?", (id,)).fetchone()
+        if not imovel:
+            # Apagado entre a leitura do updated_at e agora: nada vai para o cache
+            abort(404)
+
+        # URLs/nomes como estão no banco; o template monta URL e srcset (foto_variantes)
+        fotos = [f["url"] for f in banco.fotos_do_imovel(conn, id)]
+
+        # Listas prontas (semelhantes.py): uma leitura pela chave primária
+        return render_template("detalhes.html", imovel=imovel, fotos=fotos,
+                               semelhantes=consultas.semelhantes(conn, id))
+
+    atualizado_em = consultas.detalhe_atualizado_em(get_db_connection(), id)
+    if atualizado_em is None:
+        # Fora do cache: percorrer ids inexistentes não pode expulsar as páginas de verdade
+        return "Imóvel não encontrado", 404
+
+    # Conta também a lista de semelhantes e os cards dela, que mudam sem o imóvel mudar
+    etag = f"i{id}-" + atualizado_em.replace(" ", "T")
+    return resposta_condicional(etag, atualizado_em,
+                                lambda: pagina_em_cache(f"/imovel/{id}|{atualizado_em}", gerar))
 
 # ===========================================
 # 🔐 Login / Logout
@@ -132,6 +468,11 @@ def login():
             flash("Usuário ou senha incorretos", "danger")
     return render_template("login.html")
 
+@app.route("/offline.html")
+def offline():
+    """Página de fallback que o service worker guarda para quando não há conexão."""
+    return render_template("offline.html", current_year=datetime.now().year)
+
 @app.route("/logout")
 @login_required
 def logout():
@@ -141,16 +482,106 @@ def logout():
 # ===========================================
 # ⚙️ Painel Admin
 # ===========================================
+POR_PAGINA_ADMIN = 50
+
 @app.route("/admin")
 @login_required
 def admin():
     conn = get_db_connection()
-    imoveis = conn.execute("SELECT * FROM imoveis").fetchall()
-    conn.close()
-    return render_template("admin.html", imoveis=imoveis)
+    # Mesmos filtros da página inicial (e os mesmos índices), só que paginando de 50 em 50
+    filtros = consultas.ler_filtros(request.args)
+    busca = filtros["busca"]
+    proximo_cursor = None
+    if busca.lstrip("#").isdigit():
+        # "15" ou "#15": só aquele imóvel
+        imoveis = conn.execute(f"SELECT {consultas.COLUNAS_CARD} FROM imoveis_cards WHERE id=?",
+                               (int(busca.lstrip("#")),)).fetchall()
+        total = len(imoveis)
+    else:
+        imoveis, proximo_cursor = consultas.buscar_pagina(
+            conn, filtros, cursor=request.args.get("cursor"), limite=POR_PAGINA_ADMIN, fts=FTS_DISPONIVEL,
+            geo=GEO_DISPONIVEL
+        )
+        total = facetas_em_cache(conn, filtros)["total"]
+    args = {k: v for k, v in request.args.items() if k != "cursor"}
+    proxima_url = url_for("admin", **args, cursor=proximo_cursor) if proximo_cursor else None
+    primeira_url = url_for("admin", **args) if request.args.get("cursor") else None
+    fotos_fila = fila_fotos.status_recentes(conn)
+    if any(f["status"] in ("pendente", "enviando") for f in fotos_fila):
+        # Fila deixada por outro worker/reinício: garante alguém processando
+        fila_fotos.iniciar_trabalhador(enviar_foto_cloudinary, DATABASE)
+    return render_template("admin.html", imoveis=imoveis, total=total, proxima_url=proxima_url,
+                           primeira_url=primeira_url, fotos_fila=fotos_fila)
+
+@app.route("/admin/fotos")
+@login_required
+def admin_fotos():
+    """Situação de cada foto na fila de upload (JSON)."""
+    return jsonify([
+        {
+            "id": f["id"],
+            "imovel_id": f["imovel_id"],
+            "arquivo": f["nome_original"],
+            "status": f["status"],
+            "url": f["url"],
+            "erro": f["erro"],
+            "tentativas": f["tentativas"],
+            "atualizado_em": f["atualizado_em"],
+        }
+        for f in fila_fotos.status_recentes(get_db_connection())
+    ])
+
+@app.route("/admin/cache")
+@login_required
+def admin_cache():
+    """Estatísticas do cache de páginas e do cache de facetas (hits, misses, evictions)."""
+    estatisticas = cache.estatisticas() if cache is not None else {"backend": "off"}
+    return jsonify({**estatisticas, "facetas": cache_facetas.estatisticas()})
+
+@app.route("/admin/metrics")
+@login_required
+def admin_metrics():
+    """Latência por rota (p50/p95/p99), queries por requisição e queries lentas, somando os workers."""
+    dados = metricas.agregado()
+    if request.args.get("formato") == "json":
+        return jsonify(dados)
+    return render_template("admin_metricas.html", ativo=metricas.ATIVO, workers=dados["workers"],
+                           rotas=metricas.resumo(dados["rotas"]),
+                           operacoes=metricas.resumo(dados["operacoes"]),
+                           sql_lentas=dados["sql_lentas"][:50])
+
+@app.route("/metrics")
+def metrics_prometheus():
+    """Formato texto do Prometheus: token Bearer (METRICAS_TOKEN) ou admin logado."""
+    token = os.getenv("METRICAS_TOKEN")
+    autorizado = current_user.is_authenticated or (
+        token and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")
+    )
+    if not autorizado:
+        return app.response_class("Não autorizado\n", status=401, mimetype="text/plain")
+    return app.response_class(metricas.prometheus(metricas.agregado()),
+                              mimetype="text/plain; version=0.0.4")
 
 # ===========================================
-# ➕ Adicionar Imóvel (com upload no Cloudinary)
+# 📍 Localização do formulário
+# ===========================================
+def ler_localizacao(form, atual=None):
+    """
+    (latitude, longitude, bairro, cidade) do formulário do admin.
+    Coordenadas em branco removem a localização; inválidas mantêm as atuais (com aviso).
+    """
+    bairro = form.get("bairro", "").strip() or None
+    cidade = form.get("cidade", "").strip() or None
+    texto_lat, texto_lon = form.get("latitude", "").strip(), form.get("longitude", "").strip()
+    latitude, longitude = banco.coordenadas(texto_lat, texto_lon)
+    if latitude is None and (texto_lat or texto_lon):
+        flash("⚠️ Latitude/longitude inválidas (ex.: -24.0935 e -46.6206): localização não alterada.", "warning")
+        if atual is not None:
+            latitude, longitude = atual["latitude"], atual["longitude"]
+    return latitude, longitude, bairro, cidade
+
+# ===========================================
+# ➕ Adicionar Imóvel (fotos vão para o Cloudinary em segundo plano)
 # ===========================================
 @app.route("/add", methods=["POST"])
 @login_required
@@ -158,36 +589,28 @@ def add_imovel():
     titulo = request.form["titulo"]
     descricao = request.form["descricao"]
     preco = request.form["preco"]
-    dormitorios = request.form.get("dormitorios", 0)
-    banheiros = request.form.get("banheiros", 0)
-    vagas = request.form.get("vagas", 0)
+    dormitorios = banco.inteiro(request.form.get("dormitorios"))
+    banheiros = banco.inteiro(request.form.get("banheiros"))
+    vagas = banco.inteiro(request.form.get("vagas"))
     area = request.form.get("area", "")
     destaque = 1 if request.form.get("destaque") else 0
-
-    fotos = request.files.getlist("fotos")
-    urls_fotos = []
-
-    for foto in fotos:
-        if foto.filename:
-            try:
-                # Upload direto para Cloudinary
-                upload = cloudinary.uploader.upload(foto, folder="celoimoveis")
-                urls_fotos.append(upload["secure_url"])
-            except Exception as e:
-                print("⚠️ Erro no upload Cloudinary:", e)
-                # fallback local se falhar
-                path_local = os.path.join("static/uploads", foto.filename)
-                foto.save(path_local)
-                urls_fotos.append(foto.filename)
+    latitude, longitude, bairro, cidade = ler_localizacao(request.form)
 
     conn = get_db_connection()
-    conn.execute("""
-        INSERT INTO imoveis (titulo, descricao, preco, dormitorios, banheiros, vagas, area, destaque, fotos)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (titulo, descricao, preco, dormitorios, banheiros, vagas, area, destaque, ",".join(urls_fotos)))
-    conn.commit()
-    conn.close()
+    # "fotos" é a coluna antiga (NOT NULL): fica vazia, as fotos vão para imovel_fotos
+    cur = conn.execute("""
+        INSERT INTO imoveis (titulo, descricao, preco, dormitorios, banheiros, vagas, area, destaque, fotos,
+                             preco_centavos, area_m2, latitude, longitude, bairro, cidade, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (titulo, descricao, preco, dormitorios, banheiros, vagas, area, destaque, "",
+          banco.preco_para_centavos(preco), banco.area_para_m2(area), latitude, longitude, bairro, cidade,
+          banco.agora()))
+    total = enfileirar_fotos(conn, cur.lastrowid)
+    atualizar_semelhantes()
+    congelar.agendar()
     flash("🏠 Imóvel adicionado com sucesso!", "info")
+    if total:
+        flash(f"📸 {total} foto(s) sendo enviadas em segundo plano.", "info")
     return redirect(url_for("admin"))
 
 # ===========================================
@@ -203,32 +626,31 @@ def edit_imovel(id):
         titulo = request.form["titulo"]
         descricao = request.form["descricao"]
         preco = request.form["preco"]
-        dormitorios = request.form.get("dormitorios", 0)
-        banheiros = request.form.get("banheiros", 0)
-        vagas = request.form.get("vagas", 0)
+        dormitorios = banco.inteiro(request.form.get("dormitorios"))
+        banheiros = banco.inteiro(request.form.get("banheiros"))
+        vagas = banco.inteiro(request.form.get("vagas"))
         area = request.form.get("area", "")
         destaque = 1 if request.form.get("destaque") else 0
+        latitude, longitude, bairro, cidade = ler_localizacao(request.form, atual=imovel)
 
-        novas_fotos = request.files.getlist("fotos")
-        fotos_existentes = imovel["fotos"].split(",") if imovel["fotos"] else []
-
-        for foto in novas_fotos:
-            if foto.filename:
-                upload = cloudinary.uploader.upload(foto, folder="celoimoveis")
-                fotos_existentes.append(upload["secure_url"])
-
+        # As novas fotos entram em imovel_fotos quando o envio termina (fila_fotos)
         conn.execute("""
             UPDATE imoveis
-            SET titulo=?, descricao=?, preco=?, dormitorios=?, banheiros=?, vagas=?, area=?, destaque=?, fotos=?
+            SET titulo=?, descricao=?, preco=?, dormitorios=?, banheiros=?, vagas=?, area=?, destaque=?,
+                preco_centavos=?, area_m2=?, latitude=?, longitude=?, bairro=?, cidade=?, updated_at=?
             WHERE id=?
-        """, (titulo, descricao, preco, dormitorios, banheiros, vagas, area, destaque, ",".join(fotos_existentes), id))
-        conn.commit()
-        conn.close()
+        """, (titulo, descricao, preco, dormitorios, banheiros, vagas, area, destaque,
+              banco.preco_para_centavos(preco), banco.area_para_m2(area), latitude, longitude, bairro, cidade,
+              banco.agora(), id))
+        total = enfileirar_fotos(conn, id)
+        atualizar_semelhantes()
+        congelar.agendar()
         flash("✅ Imóvel atualizado com sucesso!", "info")
+        if total:
+            flash(f"📸 {total} foto(s) sendo enviadas em segundo plano.", "info")
         return redirect(url_for("admin"))
 
-    conn.close()
-    return render_template("edit_imovel.html", imovel=imovel)
+    return render_template("edit_imovel.html", imovel=imovel, fotos=banco.fotos_do_imovel(conn, id))
 
 # ===========================================
 # ❌ Deletar Imóvel
@@ -238,11 +660,33 @@ def edit_imovel(id):
 def delete_imovel(id):
     conn = get_db_connection()
     conn.execute("DELETE FROM imoveis WHERE id=?", (id,))
+    fila_fotos.descartar(conn, id)
     conn.commit()
-    conn.close()
+    atualizar_semelhantes()
+    congelar.agendar()
     flash("🗑️ Imóvel removido!", "warning")
     return redirect(url_for("admin"))
 
+# ===========================================
+# 🔥 Aquecimento (antes do primeiro visitante)
+# ===========================================
+def aquecer():
+    """
+    Compila todos os templates (do cache de bytecode, se houver) e deixa a página
+    inicial no cache de páginas. Com preload_app (gunicorn.conf.py) roda uma vez
+    no processo pai e os workers já nascem com tudo na memória. Retorna os segundos gastos.
+    """
+    inicio = time.perf_counter()
+    for nome in app.jinja_env.list_templates():
+        app.jinja_env.get_template(nome)
+    # Fora das métricas: o pai não é um worker (nada de retrato <pid>.json)
+    # e os workers não herdam a contagem do aquecimento pelo fork
+    with metricas.ignorando():
+        app.test_client().get("/")
+    # A conexão SQLite aberta para isso não pode atravessar o fork dos workers
+    banco.fechar_conexao_da_thread()
+    return time.perf_counter() - inicio
+
 # ===========================================
 # 🚀 Inicialização
 # ===========================================
@@ -0,0 +1,73 @@
+# ===========================================
+# ⚡ MODO ASGI (uvicorn) - SERVIDOR ALTERNATIVO
+# ===========================================
+# O mesmo app Flask servido por workers uvicorn (SERVIDOR=asgi, ver
+# gunicorn.conf.py). O corpo da requisição (ex.: fotos do /add) é recebido
+# pelo loop assíncrono antes de ocupar uma thread, e o Flask roda num pool
+# de THREADS threads por worker — cliente lento não prende o worker.
+# O SQLite continua síncrono, mas cada thread tem a sua conexão
+# (banco.conexao_da_thread), então as queries rodam em paralelo no pool.
+#
+# Rodar direto: uvicorn asgi:app --workers 2
+# ===========================================
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import SyncToAsync
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+from app import app as app_wsgi
+
+THREADS = int(os.getenv("THREADS", "8"))
+
+_executor = ThreadPoolExecutor(max_workers=THREADS, thread_name_prefix="asgi")
+
+class _Instancia(WsgiToAsgiInstance):
+    # O padrão do asgiref roda todo o WSGI numa única thread (thread_sensitive):
+    # aqui cada requisição vai para o pool, várias ao mesmo tempo
+    async def run_wsgi_app(self, body):
+        await SyncToAsync(self._rodar_wsgi, thread_sensitive=False, executor=_executor)(body)
+
+    def _rodar_wsgi(self, body):
+        """Roda o Flask numa thread do pool e repassa a resposta (como o run_wsgi_app do asgiref)."""
+        try:
+            environ = self.build_environ(self.scope, body)
+        except ValueError:
+            # Cabeçalhos repetidos demais (duplicate_header_limit)
+            self.sync_send({"type": "http.response.start", "status": 400,
+                            "headers": [(b"content-type", b"text/plain")]})
+            self.sync_send({"type": "http.response.body", "body": b"Bad Request: Too many duplicate headers"})
+            return
+        enviados = 0
+        for pedaco in self.wsgi_application(environ, self.start_response):
+            if not self.response_started:
+                self.response_started = True
+                self.sync_send(self.response_start)
+            # Nunca manda mais que o Content-Length anunciado
+            if self.response_content_length is not None:
+                pedaco = pedaco[:self.response_content_length - enviados]
+            self.sync_send({"type": "http.response.body", "body": pedaco, "more_body": True})
+            enviados += len(pedaco)
+            if enviados == self.response_content_length:
+                break
+        if not self.response_started:
+            self.response_started = True
+            self.sync_send(self.response_start)
+        self.sync_send({"type": "http.response.body"})
+
+class AppAsgi(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            # Nada a preparar: o app já inicializa o banco no import
+            while True:
+                mensagem = await receive()
+                if mensagem["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif mensagem["type"] == "lifespan.shutdown":
+                    _executor.shutdown(wait=False)
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        await _Instancia(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+app = AppAsgi(app_wsgi)
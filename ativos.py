@@ -0,0 +1,190 @@
+# ===========================================
+# 📦 ARQUIVOS ESTÁTICOS COM HASH + PRÉ-COMPRESSÃO
+# ===========================================
+# Os templates usam url_for("ativo", filename="css/custom.css") e recebem
+# /ativos/css/custom.1a2b3c4d5e.css: o hash do conteúdo vai no nome, então
+# o navegador guarda o arquivo "para sempre" (Cache-Control: immutable) e
+# um CSS novo muda a URL sozinho — nada de revalidar a cada página nem de
+# subir a versão do cache do service worker à mão.
+#
+# Build (start.sh): python ativos.py
+#   - grava static/ativos.json (caminho → nome com hash)
+#   - gera .gz (e .br, se o pacote brotli estiver instalado) ao lado dos
+#     CSS/JS/JSON/SVG/ICO, entregues conforme o Accept-Encoding
+# Sem o build (desenvolvimento) os hashes são calculados ao iniciar o app.
+# ===========================================
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele, só gzip
+    brotli = None
+
+PASTA_STATIC = "static"
+MANIFESTO = os.path.join(PASTA_STATIC, "ativos.json")
+
+# Fotos enviadas têm o próprio esquema (imagens.py); o service worker precisa de URL fixa
+PASTAS_IGNORADAS = {"uploads"}
+ARQUIVOS_IGNORADOS = {"ativos.json", "js/service-worker.js"}
+
+COMPRIMIVEIS = {".css", ".js", ".json", ".svg", ".ico", ".txt", ".xml", ".webmanifest"}
+# Variantes pré-comprimidas, da preferida para a menos eficiente: (extensão, Content-Encoding)
+VARIANTES = (("br", "br"), ("gz", "gzip"))
+
+# O service worker guarda estes na instalação; o resto entra no cache quando for pedido
+PRE_CACHE = ("css/", "img/", "manifest.json")
+
+_COM_HASH = re.compile(r"^(.*)\.[0-9a-f]{10}(\.[^./]+)$")
+
+def nome_com_hash(relativo, conteudo):
+    """'css/custom.css' → 'css/custom.1a2b3c4d5e.css' (sha256 do conteúdo)."""
+    base, extensao = os.path.splitext(relativo)
+    return f"{base}.{hashlib.sha256(conteudo).hexdigest()[:10]}{extensao}"
+
+def listar(pasta_static=PASTA_STATIC):
+    """Caminhos relativos ('css/custom.css') dos arquivos do site, sem as variantes comprimidas."""
+    for raiz, dirs, arquivos in os.walk(pasta_static):
+        if raiz == pasta_static:
+            dirs[:] = [d for d in dirs if d not in PASTAS_IGNORADAS]
+        dirs.sort()
+        for nome in sorted(arquivos):
+            relativo = os.path.relpath(os.path.join(raiz, nome), pasta_static).replace(os.sep, "/")
+            if relativo not in ARQUIVOS_IGNORADOS and not nome.endswith((".gz", ".br", ".tmp")):
+                yield relativo
+
+def calcular(pasta_static=PASTA_STATIC):
+    """{caminho: nome com hash} lendo os arquivos."""
+    manifesto = {}
+    for relativo in listar(pasta_static):
+        with open(os.path.join(pasta_static, relativo), "rb") as f:
+            manifesto[relativo] = nome_com_hash(relativo, f.read())
+    return manifesto
+
+# ===========================================
+# 🏗️ Build: manifesto + variantes comprimidas
+# ===========================================
+def _gravar(caminho, conteudo):
+    fd, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho) or ".", suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(conteudo)
+    os.replace(temporario, caminho)
+
+def comprimir(caminho):
+    """Grava caminho.gz/.br no nível máximo (feito uma vez no build). Devolve as extensões geradas."""
+    with open(caminho, "rb") as f:
+        conteudo = f.read()
+    compressores = {"gz": lambda dados: gzip.compress(dados, 9, mtime=0)}
+    if brotli:
+        compressores["br"] = lambda dados: brotli.compress(dados, quality=11)
+
+    geradas = []
+    for extensao, _ in VARIANTES:
+        destino = f"{caminho}.{extensao}"
+        comprimido = compressores[extensao](conteudo) if extensao in compressores else None
+        # Só vale a pena se economizar de verdade (PNG/JPG já vêm comprimidos)
+        if comprimido is not None and len(comprimido) < len(conteudo) * 0.9:
+            _gravar(destino, comprimido)
+            geradas.append(extensao)
+        elif os.path.exists(destino):
+            os.remove(destino)
+    return geradas
+
+def gerar(pasta_static=PASTA_STATIC):
+    """Grava o manifesto e as variantes comprimidas. Devolve o manifesto."""
+    manifesto = calcular(pasta_static)
+    for relativo in manifesto:
+        if os.path.splitext(relativo)[1] in COMPRIMIVEIS:
+            comprimir(os.path.join(pasta_static, relativo))
+    _gravar(os.path.join(pasta_static, os.path.basename(MANIFESTO)),
+            json.dumps(manifesto, indent=1, sort_keys=True).encode())
+    return manifesto
+
+# ===========================================
+# 🔎 Registro em memória (usado pelo app)
+# ===========================================
+class Registro:
+    def __init__(self, pasta_static=PASTA_STATIC):
+        self.pasta_static = pasta_static
+        self.com_hash = self._carregar()
+        self.originais = {nome: relativo for relativo, nome in self.com_hash.items()}
+        self.versao = hashlib.sha1(json.dumps(self.com_hash, sort_keys=True).encode()).hexdigest()[:10]
+        # Variantes geradas depois da última mudança do original (senão estariam velhas)
+        self.comprimidos = {}
+        for relativo in self.com_hash:
+            caminho = os.path.join(pasta_static, relativo)
+            self.comprimidos[relativo] = [
+                (extensao, codificacao) for extensao, codificacao in VARIANTES
+                if _mtime(f"{caminho}.{extensao}") >= _mtime(caminho) >= 0
+            ]
+
+    def _carregar(self):
+        """Manifesto do build, se ainda bate com os arquivos; senão calcula na hora."""
+        caminho = os.path.join(self.pasta_static, os.path.basename(MANIFESTO))
+        try:
+            with open(caminho, encoding="utf-8") as f:
+                manifesto = json.load(f)
+            gerado_em = os.path.getmtime(caminho)
+            arquivos = list(listar(self.pasta_static))
+            if sorted(arquivos) == sorted(manifesto) and all(
+                _mtime(os.path.join(self.pasta_static, a)) <= gerado_em for a in arquivos
+            ):
+                return manifesto
+        except (OSError, ValueError):
+            pass
+        return calcular(self.pasta_static)
+
+    def url(self, relativo):
+        """Nome com hash de 'css/custom.css' (ou o próprio nome, se não for um ativo conhecido)."""
+        return self.com_hash.get(relativo, relativo)
+
+    def resolver(self, nome):
+        """
+        Nome pedido em /ativos/ → (caminho em static/, imutável?).
+        Hash de um deploy anterior ainda entrega o arquivo atual, mas sem "immutable".
+        """
+        if nome in self.originais:
+            return self.originais[nome], True
+        m = _COM_HASH.match(nome)
+        relativo = m.group(1) + m.group(2) if m else nome
+        if relativo in self.com_hash:
+            return relativo, False
+        return None, False
+
+    def variante(self, relativo, aceitas):
+        """(arquivo a enviar, Content-Encoding) conforme o Accept-Encoding do navegador."""
+        for extensao, codificacao in self.comprimidos.get(relativo, ()):
+            if aceitas[codificacao]:
+                return f"{relativo}.{extensao}", codificacao
+        return relativo, None
+
+    def pre_cache(self):
+        """Nomes com hash que o service worker baixa na instalação."""
+        return {relativo: nome for relativo, nome in self.com_hash.items() if relativo.startswith(PRE_CACHE)}
+
+def _mtime(caminho):
+    try:
+        return os.path.getmtime(caminho)
+    except OSError:
+        return -1
+
+def conversor(registro):
+    """Conversor de URL <ativo:filename>: url_for("ativo", filename="css/custom.css") já sai com o hash."""
+    from werkzeug.routing import PathConverter
+
+    class ConversorAtivo(PathConverter):
+        def to_url(self, value):
+            return super().to_url(registro.url(value))
+
+    return ConversorAtivo
+
+if __name__ == "__main__":
+    manifesto = gerar()
+    comprimidos = sum(os.path.exists(os.path.join(PASTA_STATIC, f"{r}.gz")) for r in manifesto)
+    print(f"📦 {len(manifesto)} ativos com hash em {MANIFESTO} ({comprimidos} pré-comprimidos"
+          f"{', com Brotli' if brotli else ', só gzip (pip install brotli para .br)'})")
@@ -0,0 +1,674 @@
+# ===========================================
+# 🗄️ BANCO DE DADOS - FUNÇÕES COMPARTILHADAS
+# ===========================================
+# Usado por app.py, gerenciador_imoveis_avancado.py e scripts de migração.
+# ===========================================
+
+import html
+import math
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+import metricas
+
+# DATABASE_PATH: outro arquivo (ex.: banco sintético dos benchmarks)
+DATABASE = os.getenv("DATABASE_PATH", "database.db")
+
+# ===========================================
+# 🔌 Conexões
+# ===========================================
+# WAL: leitores não bloqueiam durante uma escrita do admin (e vice-versa).
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",     # seguro com WAL, bem menos fsync
+    "PRAGMA busy_timeout=5000",      # espera até 5s por um lock em vez de falhar
+    "PRAGMA cache_size=-16000",      # ~16 MB de cache de páginas por conexão
+    "PRAGMA mmap_size=134217728",    # leitura via mmap (até 128 MB)
+    "PRAGMA temp_store=MEMORY",
+)
+
+_local = threading.local()
+
+def conectar(database=None):
+    """Abre uma conexão nova já configurada (scripts e gerenciador)."""
+    # A fábrica mede o tempo de cada query (metricas.py; METRICAS=off desliga)
+    conn = sqlite3.connect(database or DATABASE, timeout=5, factory=metricas.fabrica_conexao())
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def conexao_da_thread(database=None):
+    """
+    Conexão reaproveitada entre requisições: uma por thread de cada worker.
+    Após um fork (gunicorn), o processo filho abre a sua própria.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.pid != os.getpid():
+        conn = _local.conn = conectar(database)
+        _local.pid = os.getpid()
+    return conn
+
+def fechar_conexao_da_thread():
+    """Fecha a conexão desta thread (ex.: no processo pai do gunicorn, antes do fork)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        _local.conn = None
+        conn.close()
+
+# ===========================================
+# 🔢 Normalização de preço e área
+# ===========================================
+def _texto_para_decimal(texto):
+    """
+    Converte números no formato brasileiro ("450.000,00", "269,5", "R$ 250.000")
+    para float. Retorna None se não houver dígitos.
+    """
+    if texto is None:
+        return None
+    if isinstance(texto, (int, float)):
+        return float(texto)
+
+    limpo = re.sub(r"[^\d,.]", "", str(texto))
+    if not re.search(r"\d", limpo):
+        return None
+
+    if "," in limpo:
+        # Vírgula = decimal, pontos = milhar
+        inteiro, _, decimal = limpo.rpartition(",")
+        inteiro = inteiro.replace(".", "").replace(",", "")
+    elif limpo.count(".") == 1 and len(limpo.split(".")[1]) in (1, 2):
+        # "250000.50" → ponto decimal
+        inteiro, decimal = limpo.split(".")
+    else:
+        # "250.000" ou "1.250.000" → pontos de milhar
+        inteiro, decimal = limpo.replace(".", ""), ""
+
+    try:
+        return float(f"{inteiro or 0}.{decimal or 0}")
+    except ValueError:
+        return None
+
+# Valores não reconhecidos viram 0 (nunca NULL): as colunas são chaves de
+# ordenação/paginação e NULL quebraria a comparação do cursor.
+def preco_para_centavos(preco):
+    """'R$450.000,00' → 45000000 (inteiro, em centavos). Sem preço → 0."""
+    valor = _texto_para_decimal(preco)
+    return 0 if valor is None else int(round(valor * 100))
+
+def area_para_m2(area):
+    """'269,5' → 269.5 (float, em m²). Sem área → 0."""
+    return _texto_para_decimal(area) or 0.0
+
+def inteiro(valor, padrao=0):
+    """Dormitórios/banheiros/vagas: '3' → 3; vazio ou inválido → padrão."""
+    try:
+        return int(str(valor).strip())
+    except (TypeError, ValueError):
+        return padrao
+
+def coordenada(valor, limite):
+    """
+    Latitude (limite=90) ou longitude (limite=180) em graus decimais:
+    '-24,0935' ou '-24.0935' → -24.0935. Vazia, inválida ou fora do limite → None.
+    """
+    try:
+        numero = float(str(valor).strip().replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(numero) or abs(numero) > limite:
+        return None
+    return numero
+
+def coordenadas(latitude, longitude):
+    """(latitude, longitude) válidas, ou (None, None): nunca só uma das duas."""
+    lat, lon = coordenada(latitude, 90), coordenada(longitude, 180)
+    if lat is None or lon is None:
+        return None, None
+    return lat, lon
+
+# ===========================================
+# 🔎 Texto para busca
+# ===========================================
+def html_para_texto(descricao_html):
+    """Remove tags e entidades do descricao_html, deixando só o texto."""
+    if not descricao_html:
+        return ""
+    texto = re.sub(r"<[^>]+>", " ", descricao_html)
+    texto = html.unescape(texto)
+    return re.sub(r"\s+", " ", texto).strip()
+
+def consulta_fts(busca):
+    """
+    Monta a consulta FTS5 a partir do texto digitado:
+    cada palavra vira um prefixo ("varan" encontra "Varandá").
+    """
+    palavras = re.findall(r"\w+", busca or "")
+    return " ".join(f'"{p}"*' for p in palavras)
+
+# ===========================================
+# 🧱 Schema (idempotente)
+# ===========================================
+def _colunas(conn, tabela):
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({tabela})").fetchall()}
+
+def _tabelas(conn):
+    return {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+
+def _add_column(conn, tabela, nome, tipo):
+    if nome in _colunas(conn, tabela):
+        return
+    try:
+        conn.execute(f"ALTER TABLE {tabela} ADD COLUMN {nome} {tipo}")
+    except Exception:
+        # Outro worker pode ter criado a coluna ao mesmo tempo
+        pass
+
+def garantir_schema(conn):
+    """Cria colunas e índices usados pelo site, se ainda não existirem."""
+    _add_column(conn, "imoveis", "preco_centavos", "INTEGER NOT NULL DEFAULT 0")
+    _add_column(conn, "imoveis", "area_m2", "REAL NOT NULL DEFAULT 0")
+
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_imoveis_preco ON imoveis (preco_centavos, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_imoveis_area ON imoveis (area_m2, id)")
+
+    # Filtros "N+" da página inicial: toda combinação vira busca por faixa no índice
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_imoveis_destaque_filtros
+                    ON imoveis (destaque, dormitorios, banheiros, preco_centavos)""")
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_imoveis_dormitorios
+                    ON imoveis (dormitorios, banheiros, preco_centavos)""")
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_imoveis_banheiros
+                    ON imoveis (banheiros, dormitorios, preco_centavos)""")
+    conn.commit()
+
+    _add_column(conn, "imoveis", "descricao_texto", "TEXT")
+    garantir_fts(conn)
+    garantir_versao_catalogo(conn)
+
+    # Última alteração de cada imóvel (UTC, "AAAA-MM-DD HH:MM:SS"), gravada pelas rotas e pelo gerenciador
+    _add_column(conn, "imoveis", "updated_at", "TEXT")
+    conn.execute("UPDATE imoveis SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_imoveis_updated_at ON imoveis (updated_at)")
+
+    # Código do imóvel no sistema do parceiro: chave do upsert da importação (carga_imoveis.py)
+    _add_column(conn, "imoveis", "codigo_externo", "TEXT")
+    conn.execute("""CREATE UNIQUE INDEX IF NOT EXISTS idx_imoveis_codigo_externo
+                    ON imoveis (codigo_externo) WHERE codigo_externo IS NOT NULL""")
+
+    # 📍 Localização (opcional): graus decimais (WGS84), indexada em imoveis_geo
+    for coluna, tipo in (("latitude", "REAL"), ("longitude", "REAL"), ("bairro", "TEXT"), ("cidade", "TEXT")):
+        _add_column(conn, "imoveis", coluna, tipo)
+    conn.commit()
+
+    garantir_fotos(conn)
+    garantir_cards(conn)
+    garantir_geo(conn)
+    garantir_semelhantes(conn)
+
+    # descricao_html já sanitizado + resumo (ver descricao.py)
+    _add_column(conn, "imoveis", "descricao_render", "TEXT")
+    _add_column(conn, "imoveis", "descricao_resumo", "TEXT")
+    _add_column(conn, "imoveis", "descricao_hash", "TEXT")
+    # Até que versão do catálogo (e com que regras) as descrições já foram conferidas
+    _add_column(conn, "catalogo", "descricoes_conferidas", "INTEGER NOT NULL DEFAULT -1")
+    _add_column(conn, "catalogo", "descricoes_versao", "TEXT")
+    conn.commit()
+    if "descricao_html" in _colunas(conn, "imoveis"):
+        import descricao  # importa banco; aqui dentro para não ser circular
+        descricao.recompilar(conn)
+
+# ===========================================
+# 🔄 Versão do catálogo
+# ===========================================
+def garantir_versao_catalogo(conn):
+    """
+    Contador que sobe a cada INSERT/UPDATE/DELETE em imoveis (via triggers),
+    venha a escrita do site, do gerenciador ou de qualquer script.
+    Usado para invalidar caches e como ETag/Last-Modified da listagem.
+
+    Os mesmos triggers anotam em imoveis_mudancas a versão em que cada imóvel
+    mudou pela última vez, com removido = 1 (lápide) quando ele é apagado:
+    é o que a sincronização incremental do PWA (/api/imoveis/changes) lê.
+    """
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS catalogo (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            versao INTEGER NOT NULL,
+            atualizado_em TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        INSERT OR IGNORE INTO catalogo (id, versao) VALUES (1, 0);
+    """)
+    linha = conn.execute("SELECT sql FROM sqlite_master WHERE type='trigger' AND name='catalogo_versao_ad'").fetchone()
+    if linha and "imoveis_mudancas" in linha[0]:
+        return
+
+    # Primeira vez (ou banco com os triggers antigos, sem o histórico)
+    _add_column(conn, "catalogo", "historico_desde", "INTEGER NOT NULL DEFAULT 0")
+    conn.commit()
+    versao_atual = "(SELECT versao FROM catalogo WHERE id = 1)"
+    subir = "UPDATE catalogo SET versao = versao + 1, atualizado_em = CURRENT_TIMESTAMP WHERE id = 1;"
+    conn.executescript(f"""
+        BEGIN IMMEDIATE;
+        CREATE TABLE IF NOT EXISTS imoveis_mudancas (
+            id INTEGER PRIMARY KEY,            -- id do imóvel
+            versao INTEGER NOT NULL,           -- versão do catálogo da última mudança
+            removido INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_imoveis_mudancas_versao ON imoveis_mudancas (versao);
+
+        DROP TRIGGER IF EXISTS catalogo_versao_ai;
+        DROP TRIGGER IF EXISTS catalogo_versao_au;
+        DROP TRIGGER IF EXISTS catalogo_versao_ad;
+        CREATE TRIGGER catalogo_versao_ai AFTER INSERT ON imoveis BEGIN
+            {subir}
+            INSERT OR REPLACE INTO imoveis_mudancas (id, versao, removido) VALUES (new.id, {versao_atual}, 0);
+        END;
+        CREATE TRIGGER catalogo_versao_au AFTER UPDATE ON imoveis BEGIN
+            {subir}
+            INSERT OR REPLACE INTO imoveis_mudancas (id, versao, removido) VALUES (new.id, {versao_atual}, 0);
+        END;
+        CREATE TRIGGER catalogo_versao_ad AFTER DELETE ON imoveis BEGIN
+            {subir}
+            INSERT OR REPLACE INTO imoveis_mudancas (id, versao, removido) VALUES (old.id, {versao_atual}, 1);
+        END;
+
+        -- Imóveis de antes do histórico: todos "mudaram" na versão atual.
+        -- Remoções anteriores não foram anotadas: quem sincronizou antes disso recomeça do zero.
+        INSERT OR IGNORE INTO imoveis_mudancas (id, versao, removido) SELECT id, {versao_atual}, 0 FROM imoveis;
+        UPDATE catalogo SET historico_desde = versao WHERE id = 1;
+        COMMIT;
+    """)
+
+def versao_catalogo(conn):
+    linha = conn.execute("SELECT versao FROM catalogo WHERE id = 1").fetchone()
+    return linha[0] if linha else 0
+
+def agora():
+    """Data/hora UTC no formato do SQLite (mesmo de CURRENT_TIMESTAMP), para updated_at."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+def historico_desde(conn):
+    """Menor versão a partir da qual imoveis_mudancas tem todas as remoções."""
+    linha = conn.execute("SELECT historico_desde FROM catalogo WHERE id = 1").fetchone()
+    return linha[0] if linha else 0
+
+def estado_catalogo(conn):
+    """(versao, atualizado_em) do catálogo inteiro."""
+    linha = conn.execute("SELECT versao, atualizado_em FROM catalogo WHERE id = 1").fetchone()
+    return (linha[0], linha[1]) if linha else (0, None)
+
+def tem_fts(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='imoveis_fts'"
+    ).fetchone() is not None
+
+def garantir_fts(conn):
+    """
+    Índice de busca textual (FTS5) sobre título, descrição e descricao_html sem tags.
+    O tokenizer remove acentos e ignora maiúsculas: "mongagua" encontra "Mongaguá".
+    Os triggers mantêm o índice sincronizado com a tabela imoveis.
+    """
+    if tem_fts(conn):
+        return
+
+    # Preenche o texto puro dos imóveis antigos antes de indexar
+    pendentes = conn.execute(
+        "SELECT id, descricao_html FROM imoveis WHERE descricao_texto IS NULL"
+    ).fetchall()
+    conn.executemany(
+        "UPDATE imoveis SET descricao_texto=? WHERE id=?",
+        [(html_para_texto(r[1]), r[0]) for r in pendentes],
+    )
+
+    try:
+        conn.executescript("""
+            BEGIN;
+            CREATE VIRTUAL TABLE IF NOT EXISTS imoveis_fts USING fts5(
+                titulo, descricao, descricao_texto,
+                content='imoveis', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3'
+            );
+
+            CREATE TRIGGER IF NOT EXISTS imoveis_fts_ai AFTER INSERT ON imoveis BEGIN
+                INSERT INTO imoveis_fts (rowid, titulo, descricao, descricao_texto)
+                VALUES (new.id, new.titulo, new.descricao, new.descricao_texto);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS imoveis_fts_ad AFTER DELETE ON imoveis BEGIN
+                INSERT INTO imoveis_fts (imoveis_fts, rowid, titulo, descricao, descricao_texto)
+                VALUES ('delete', old.id, old.titulo, old.descricao, old.descricao_texto);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS imoveis_fts_au AFTER UPDATE OF titulo, descricao, descricao_texto ON imoveis BEGIN
+                INSERT INTO imoveis_fts (imoveis_fts, rowid, titulo, descricao, descricao_texto)
+                VALUES ('delete', old.id, old.titulo, old.descricao, old.descricao_texto);
+                INSERT INTO imoveis_fts (rowid, titulo, descricao, descricao_texto)
+                VALUES (new.id, new.titulo, new.descricao, new.descricao_texto);
+            END;
+
+            INSERT INTO imoveis_fts (imoveis_fts) VALUES ('rebuild');
+            COMMIT;
+        """)
+    except Exception as e:
+        # SQLite sem FTS5 (ou outro worker criando ao mesmo tempo): busca cai no LIKE
+        conn.rollback()
+        print("⚠️ Índice de busca FTS5 indisponível:", e)
+
+# ===========================================
+# 📸 Fotos (tabela imovel_fotos)
+# ===========================================
+# Uma linha por foto, na ordem de exibição. Substitui a antiga coluna
+# imoveis.fotos (texto separado por vírgulas), que fica no banco só como
+# histórico e não é mais lida nem gravada.
+def tipo_storage(url):
+    if url.startswith("https://res.cloudinary.com/") or url.startswith("http://res.cloudinary.com/"):
+        return "cloudinary"
+    if url.startswith("http"):
+        return "externa"
+    return "local"
+
+def garantir_fotos(conn):
+    """Cria imovel_fotos e, na primeira vez, copia as fotos da coluna antiga."""
+    if "imovel_fotos" in _tabelas(conn):
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Outro worker pode ter feito a migração enquanto esperávamos o lock
+        if "imovel_fotos" in _tabelas(conn):
+            conn.execute("ROLLBACK")
+            return
+
+        conn.execute("""
+            CREATE TABLE imovel_fotos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                imovel_id INTEGER NOT NULL,
+                ordem INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                storage TEXT NOT NULL,   -- cloudinary | local | externa
+                width INTEGER,
+                height INTEGER,
+                bytes INTEGER,
+                hash TEXT
+            )
+        """)
+        conn.execute("CREATE UNIQUE INDEX idx_imovel_fotos_ordem ON imovel_fotos (imovel_id, ordem)")
+
+        # Apagar o imóvel apaga as fotos; mexer nas fotos conta como alteração do
+        # imóvel (updated_at → ETag do detalhe; o trigger de imoveis sobe a versão do catálogo)
+        conn.execute("""
+            CREATE TRIGGER imovel_fotos_imovel_ad AFTER DELETE ON imoveis BEGIN
+                DELETE FROM imovel_fotos WHERE imovel_id = old.id;
+            END
+        """)
+        for sufixo, evento, linha in (("ai", "INSERT", "new"), ("au", "UPDATE", "new"), ("ad", "DELETE", "old")):
+            conn.execute(f"""
+                CREATE TRIGGER imovel_fotos_{sufixo} AFTER {evento} ON imovel_fotos BEGIN
+                    UPDATE imoveis SET updated_at = CURRENT_TIMESTAMP WHERE id = {linha}.imovel_id;
+                END
+            """)
+
+        legado = conn.execute("SELECT id, fotos FROM imoveis WHERE fotos IS NOT NULL AND fotos != ''").fetchall()
+        conn.executemany(
+            "INSERT INTO imovel_fotos (imovel_id, ordem, url, storage) VALUES (?, ?, ?, ?)",
+            [
+                (imovel_id, ordem, url, tipo_storage(url))
+                for imovel_id, fotos in legado
+                for ordem, url in enumerate(f.strip() for f in fotos.split(",") if f.strip())
+            ],
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def fotos_do_imovel(conn, imovel_id):
+    """Fotos do imóvel na ordem de exibição."""
+    return conn.execute(
+        "SELECT * FROM imovel_fotos WHERE imovel_id=? ORDER BY ordem", (imovel_id,)
+    ).fetchall()
+
+def adicionar_fotos(conn, imovel_id, fotos):
+    """
+    Acrescenta fotos no fim da lista do imóvel (sem commit).
+    `fotos`: URLs/nomes de arquivo, ou dicts com url e os metadados conhecidos
+    (width, height, bytes, hash).
+    """
+    proxima = conn.execute(
+        "SELECT COALESCE(MAX(ordem), -1) + 1 FROM imovel_fotos WHERE imovel_id=?", (imovel_id,)
+    ).fetchone()[0]
+    for ordem, foto in enumerate(fotos, start=proxima):
+        foto = foto if isinstance(foto, dict) else {"url": foto}
+        conn.execute("""
+            INSERT INTO imovel_fotos (imovel_id, ordem, url, storage, width, height, bytes, hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (imovel_id, ordem, foto["url"], tipo_storage(foto["url"]),
+              foto.get("width"), foto.get("height"), foto.get("bytes"), foto.get("hash")))
+
+def remover_fotos(conn, ids_fotos):
+    """Remove fotos pelo id da linha em imovel_fotos (sem commit)."""
+    conn.executemany("DELETE FROM imovel_fotos WHERE id=?", [(i,) for i in ids_fotos])
+
+def substituir_fotos(conn, imovel_id, fotos):
+    """Troca a lista inteira de fotos do imóvel (sem commit)."""
+    conn.execute("DELETE FROM imovel_fotos WHERE imovel_id=?", (imovel_id,))
+    adicionar_fotos(conn, imovel_id, fotos)
+
+# ===========================================
+# 🃏 Projeção da listagem (tabela imoveis_cards)
+# ===========================================
+# Só as colunas do card, uma linha curta por imóvel, com a capa já resolvida.
+# A listagem e a API leem daqui em vez de imoveis (cujas linhas carregam
+# descricao/descricao_html e ocupam páginas de overflow). Os triggers mantêm
+# a cópia na mesma transação de qualquer escrita: site, gerenciador ou scripts.
+COLUNAS_CARDS = ("titulo", "preco", "preco_centavos", "dormitorios", "banheiros", "vagas",
+                 "area", "area_m2", "destaque", "latitude", "longitude", "bairro", "cidade")
+
+# Colunas que entraram na projeção depois da criação (ALTER TABLE em bancos antigos)
+_COLUNAS_CARDS_NOVAS = {"latitude": "REAL", "longitude": "REAL", "bairro": "TEXT", "cidade": "TEXT"}
+
+_CAPA = "(SELECT url FROM imovel_fotos WHERE imovel_id = {0} ORDER BY ordem LIMIT 1)"
+
+def _criar_triggers_cards(conn):
+    """Triggers que copiam imoveis → imoveis_cards (recriados se COLUNAS_CARDS muda)."""
+    colunas = ", ".join(COLUNAS_CARDS)
+    novos = ", ".join(f"new.{c}" for c in COLUNAS_CARDS)
+    atribuicoes = ", ".join(f"{c} = new.{c}" for c in COLUNAS_CARDS)
+    conn.execute("DROP TRIGGER IF EXISTS imoveis_cards_ai")
+    conn.execute("DROP TRIGGER IF EXISTS imoveis_cards_au")
+    conn.execute(f"""
+        CREATE TRIGGER imoveis_cards_ai AFTER INSERT ON imoveis BEGIN
+            INSERT INTO imoveis_cards (id, {colunas}, capa)
+            VALUES (new.id, {novos}, {_CAPA.format("new.id")});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER imoveis_cards_au AFTER UPDATE OF {colunas} ON imoveis BEGIN
+            UPDATE imoveis_cards SET {atribuicoes} WHERE id = new.id;
+        END
+    """)
+
+def _atualizar_cards(conn):
+    """Banco com imoveis_cards antiga: acrescenta as colunas novas e refaz a cópia."""
+    faltando = [c for c in _COLUNAS_CARDS_NOVAS if c not in _colunas(conn, "imoveis_cards")]
+    if not faltando:
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for coluna in faltando:
+            if coluna not in _colunas(conn, "imoveis_cards"):
+                conn.execute(f"ALTER TABLE imoveis_cards ADD COLUMN {coluna} {_COLUNAS_CARDS_NOVAS[coluna]}")
+        _criar_triggers_cards(conn)
+        reconstruir_cards(conn)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def garantir_cards(conn):
+    """Cria imoveis_cards (índices e triggers) e copia os imóveis existentes."""
+    if "imoveis_cards" in _tabelas(conn):
+        _atualizar_cards(conn)
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if "imoveis_cards" in _tabelas(conn):
+            conn.execute("ROLLBACK")
+            return
+
+        conn.execute("""
+            CREATE TABLE imoveis_cards (
+                id INTEGER PRIMARY KEY,   -- mesmo id de imoveis
+                titulo TEXT NOT NULL,
+                preco TEXT NOT NULL,
+                preco_centavos INTEGER NOT NULL DEFAULT 0,
+                dormitorios INTEGER DEFAULT 0,
+                banheiros INTEGER DEFAULT 0,
+                vagas INTEGER DEFAULT 0,
+                area TEXT,
+                area_m2 REAL NOT NULL DEFAULT 0,
+                destaque INTEGER DEFAULT 0,
+                capa TEXT,
+                latitude REAL,
+                longitude REAL,
+                bairro TEXT,
+                cidade TEXT
+            )
+        """)
+        # Mesmos índices da listagem que existem em imoveis
+        conn.execute("CREATE INDEX idx_cards_preco ON imoveis_cards (preco_centavos, id)")
+        conn.execute("CREATE INDEX idx_cards_area ON imoveis_cards (area_m2, id)")
+        conn.execute("CREATE INDEX idx_cards_destaque_filtros ON imoveis_cards (destaque, dormitorios, banheiros, preco_centavos)")
+        conn.execute("CREATE INDEX idx_cards_dormitorios ON imoveis_cards (dormitorios, banheiros, preco_centavos)")
+        conn.execute("CREATE INDEX idx_cards_banheiros ON imoveis_cards (banheiros, dormitorios, preco_centavos)")
+
+        _criar_triggers_cards(conn)
+        conn.execute("""
+            CREATE TRIGGER imoveis_cards_ad AFTER DELETE ON imoveis BEGIN
+                DELETE FROM imoveis_cards WHERE id = old.id;
+            END
+        """)
+        # Capa: recalculada quando as fotos do imóvel mudam
+        for sufixo, evento, linha in (("ai", "INSERT", "new"), ("au", "UPDATE", "new"), ("ad", "DELETE", "old")):
+            conn.execute(f"""
+                CREATE TRIGGER imoveis_cards_capa_{sufixo} AFTER {evento} ON imovel_fotos BEGIN
+                    UPDATE imoveis_cards SET capa = {_CAPA.format(f"{linha}.imovel_id")}
+                    WHERE id = {linha}.imovel_id;
+                END
+            """)
+
+        reconstruir_cards(conn)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def reconstruir_cards(conn):
+    """Refaz imoveis_cards inteira a partir de imoveis (sem commit)."""
+    colunas = ", ".join(COLUNAS_CARDS)
+    conn.execute("DELETE FROM imoveis_cards")
+    conn.execute(f"""
+        INSERT INTO imoveis_cards (id, {colunas}, capa)
+        SELECT id, {colunas}, {_CAPA.format("imoveis.id")} FROM imoveis
+    """)
+
+# ===========================================
+# 🗺️ Índice geográfico (R*Tree imoveis_geo)
+# ===========================================
+# Um ponto (retângulo de lado zero) por imóvel com coordenadas. A R*Tree
+# responde "que ids caem neste retângulo" sem varrer a tabela: é o que
+# deixa rápidos o mapa (bbox) e o "perto de mim" (raio). Ela guarda float
+# de 32 bits (arredondado para fora, ~1 m de folga), então a comparação
+# exata é refeita com latitude/longitude de imoveis_cards.
+def tem_geo(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='imoveis_geo'"
+    ).fetchone() is not None
+
+def garantir_geo(conn):
+    """Cria imoveis_geo e os triggers que a mantêm; indexa os imóveis que já têm coordenadas."""
+    if tem_geo(conn):
+        return
+
+    try:
+        conn.executescript("""
+            BEGIN IMMEDIATE;
+            CREATE VIRTUAL TABLE IF NOT EXISTS imoveis_geo USING rtree(
+                id, min_lat, max_lat, min_lon, max_lon
+            );
+
+            CREATE TRIGGER IF NOT EXISTS imoveis_geo_ai AFTER INSERT ON imoveis
+            WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+                INSERT INTO imoveis_geo VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS imoveis_geo_au AFTER UPDATE OF latitude, longitude ON imoveis BEGIN
+                DELETE FROM imoveis_geo WHERE id = old.id;
+                INSERT INTO imoveis_geo
+                SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude
+                WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS imoveis_geo_ad AFTER DELETE ON imoveis BEGIN
+                DELETE FROM imoveis_geo WHERE id = old.id;
+            END;
+
+            INSERT OR REPLACE INTO imoveis_geo
+            SELECT id, latitude, latitude, longitude, longitude FROM imoveis
+            WHERE latitude IS NOT NULL AND longitude IS NOT NULL;
+            COMMIT;
+        """)
+    except Exception as e:
+        # SQLite sem R*Tree: os filtros de mapa comparam latitude/longitude direto (sem índice)
+        conn.rollback()
+        print("⚠️ Índice geográfico R*Tree indisponível:", e)
+
+# ===========================================
+# 🧭 Imóveis semelhantes (tabelas de semelhantes.py)
+# ===========================================
+# O cálculo (NumPy) fica em semelhantes.py; aqui só as tabelas, que existem
+# mesmo sem NumPy instalado (a página de detalhes só não mostra nada).
+#   imoveis_vetores:     vetor de cada imóvel (float32), distância do último
+#                        vizinho guardado (raio) e quando a lista foi refeita
+#   imoveis_semelhantes: os K vizinhos de cada imóvel, em ordem; a página de
+#                        detalhes lê pela chave primária, sem calcular nada
+def garantir_semelhantes(conn):
+    conn.executescript("""
+        BEGIN IMMEDIATE;
+        CREATE TABLE IF NOT EXISTS imoveis_vetores (
+            id INTEGER PRIMARY KEY,        -- id do imóvel
+            vetor BLOB NOT NULL,
+            raio REAL,                     -- distância do K-ésimo vizinho (NULL: menos de K)
+            lista_em TEXT                  -- quando a lista de semelhantes mudou (ETag do detalhe)
+        );
+        CREATE TABLE IF NOT EXISTS imoveis_semelhantes (
+            imovel_id INTEGER NOT NULL,
+            posicao INTEGER NOT NULL,
+            semelhante_id INTEGER NOT NULL,
+            distancia REAL NOT NULL,
+            PRIMARY KEY (imovel_id, posicao)
+        ) WITHOUT ROWID;
+        -- Quem tem este imóvel na lista (atualização incremental)
+        CREATE INDEX IF NOT EXISTS idx_semelhantes_inverso ON imoveis_semelhantes (semelhante_id);
+        CREATE TABLE IF NOT EXISTS semelhantes_modelo (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            parametros TEXT NOT NULL,      -- JSON: normalização, vocabulário e idf do último cálculo completo
+            criado_em TEXT NOT NULL
+        );
+
+        -- A lista do imóvel apagado some junto; nas listas dos outros ele só deixa
+        -- de aparecer (JOIN com imoveis_cards) até semelhantes.atualizar() repor
+        CREATE TRIGGER IF NOT EXISTS imoveis_semelhantes_ad AFTER DELETE ON imoveis BEGIN
+            DELETE FROM imoveis_vetores WHERE id = old.id;
+            DELETE FROM imoveis_semelhantes WHERE imovel_id = old.id;
+        END;
+        COMMIT;
+    """)
+    # Até que versão do catálogo os vizinhos já estão calculados
+    _add_column(conn, "catalogo", "semelhantes_conferidas", "INTEGER NOT NULL DEFAULT -1")
+    conn.commit()
@@ -0,0 +1,470 @@
+# ===========================================
+# 🏋️ BENCHMARK / TESTE DE CARGA DAS ROTAS
+# ===========================================
+# Para cada escala (nº de imóveis) gera um banco sintético (semear_banco.py),
+# e mede "/", "/?busca=", "/?ordenar=preco_asc", o mapa (bbox e "perto de mim"), "/imovel/<id>" e as escritas
+# do admin (/add com foto, /edit):
+#   - cliente: Flask test client, uma requisição por vez (custo do código)
+#   - gunicorn: servidor de verdade + gerador de carga local com N conexões,
+#     em cada --servidores (sync, gthread, asgi; ver gunicorn.conf.py)
+# O Cloudinary é trocado por um falso local (só espera --latencia-upload).
+# O resultado vai para bench_resultados/<data>.json; --comparar aponta
+# regressões contra um resultado anterior (sai com código 1).
+#
+# Uso:
+#   python bench_carga.py --escalas 100 10000 --modo ambos
+#   python bench_carga.py --escalas 10000 --comparar bench_resultados/anterior.json
+#   python bench_carga.py --escalas 10000 --modo gunicorn --servidores sync asgi \
+#       --cenarios index admin_add_lento index_com_uploads_lentos --concorrencia 16
+# ===========================================
+
+import argparse
+import http.client
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlencode
+
+import semear_banco
+import verificar_indices
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+PASTA_DADOS = os.path.join(PASTA, "bench_dados")
+PASTA_RESULTADOS = os.path.join(PASTA, "bench_resultados")
+USUARIO, SENHA = "bench", "bench"
+
+# ===========================================
+# 🎯 Cenários
+# ===========================================
+# Cada cenário devolve (método, url, campos do formulário, tem_foto)
+def _index(aleatorio, total):
+    return "GET", "/", None, False
+
+def _busca(aleatorio, total):
+    return "GET", "/?" + urlencode({"busca": aleatorio.choice(semear_banco.PALAVRAS_BUSCA)}), None, False
+
+def _ordenar(aleatorio, total):
+    return "GET", "/?ordenar=preco_asc", None, False
+
+def _mapa(aleatorio, total):
+    # Mapa arrastado sobre uma das cidades: retângulo de ~4 x 4 km
+    lat, lon = aleatorio.choice(list(semear_banco.CENTROS.values()))
+    lat, lon = lat + aleatorio.uniform(-0.03, 0.03), lon + aleatorio.uniform(-0.03, 0.03)
+    bbox = f"{lon - 0.02:.5f},{lat - 0.02:.5f},{lon + 0.02:.5f},{lat + 0.02:.5f}"
+    return "GET", "/api/imoveis?" + urlencode({"bbox": bbox}), None, False
+
+def _perto(aleatorio, total):
+    lat, lon = aleatorio.choice(list(semear_banco.CENTROS.values()))
+    return "GET", "/?" + urlencode({"lat": f"{lat + aleatorio.uniform(-0.03, 0.03):.5f}",
+                                    "lon": f"{lon + aleatorio.uniform(-0.03, 0.03):.5f}", "raio": "2"}), None, False
+
+def _detalhes(aleatorio, total):
+    return "GET", f"/imovel/{aleatorio.randint(1, total)}", None, False
+
+def _formulario(aleatorio):
+    return {
+        "titulo": f"Casa de teste - Mongaguá | Centro #{aleatorio.getrandbits(32)}",
+        "descricao": "Casa com 2 dormitórios, lado praia, aceita financiamento.",
+        "preco": f"R$ {aleatorio.randrange(150, 900)}.000",
+        "dormitorios": str(aleatorio.randint(1, 4)),
+        "banheiros": str(aleatorio.randint(1, 3)),
+        "vagas": "1",
+        "area": "250,5",
+    }
+
+def _admin_add(aleatorio, total):
+    return "POST", "/add", _formulario(aleatorio), True
+
+def _admin_edit(aleatorio, total):
+    return "POST", f"/edit/{aleatorio.randint(1, total)}", _formulario(aleatorio), False
+
+CENARIOS = {
+    "index": (_index, False),
+    "busca": (_busca, False),
+    "ordenar_preco": (_ordenar, False),
+    "mapa": (_mapa, False),
+    "perto_de_mim": (_perto, False),
+    "detalhes": (_detalhes, False),
+    "admin_add": (_admin_add, True),
+    "admin_edit": (_admin_edit, True),
+    # Só no modo gunicorn: cliente lento (ex.: 3G) mandando a foto aos poucos
+    "admin_add_lento": (_admin_add, True),
+    # Só no modo gunicorn: "/" medido enquanto --concorrencia uploads lentos ocupam o servidor
+    "index_com_uploads_lentos": (_index, False),
+}
+CENARIOS_SO_HTTP = {"admin_add_lento", "index_com_uploads_lentos"}
+ENVIO_LENTO_S = 0.5  # tempo para o cliente lento mandar o corpo inteiro
+
+FOTO_FALSA = b"\xff\xd8\xff\xe0" + b"bench" * 2000  # ~10 KB; o uploader falso não abre o arquivo
+
+# ===========================================
+# ☁️ Cloudinary falso
+# ===========================================
+def uploader_falso(caminho):
+    time.sleep(float(os.getenv("BENCH_LATENCIA_UPLOAD", "0.2")))
+    return f"https://res.cloudinary.com/bench/image/upload/v1/celoimoveis/{uuid.uuid4().hex}.jpg"
+
+def criar_app():
+    """Alvo do gunicorn (bench_carga:criar_app()): o app com o Cloudinary falso."""
+    import app as site
+    site.enviar_foto_cloudinary = uploader_falso
+    return site.app
+
+def criar_app_asgi():
+    """Alvo do gunicorn no modo asgi (bench_carga:criar_app_asgi())."""
+    criar_app()
+    import asgi
+    return asgi.app
+
+# ===========================================
+# 📏 Estatísticas
+# ===========================================
+def _percentil(ordenados, p):
+    if not ordenados:
+        return None
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return round(ordenados[indice], 3)
+
+def resumir(tempos_ms, erros, duracao):
+    ordenados = sorted(tempos_ms)
+    return {
+        "requisicoes": len(tempos_ms),
+        "erros": erros,
+        "duracao_s": round(duracao, 3),
+        "rps": round(len(tempos_ms) / duracao, 1) if duracao else None,
+        "media_ms": round(sum(ordenados) / len(ordenados), 3) if ordenados else None,
+        "p50_ms": _percentil(ordenados, 50),
+        "p95_ms": _percentil(ordenados, 95),
+        "p99_ms": _percentil(ordenados, 99),
+        "max_ms": round(ordenados[-1], 3) if ordenados else None,
+    }
+
+# ===========================================
+# 🧪 Modo cliente (Flask test client, roda num subprocesso por escala)
+# ===========================================
+def _rodar_cliente(parametros):
+    """Executado no subprocesso: DATABASE_PATH já aponta para o banco da escala."""
+    site_app = criar_app()
+    cliente = site_app.test_client()
+    cliente.post("/login", data={"username": USUARIO, "password": SENHA})
+    anonimo = site_app.test_client()
+
+    resultados = []
+    for nome in parametros["cenarios"]:
+        if nome in CENARIOS_SO_HTTP:
+            continue
+        gerar, admin = CENARIOS[nome]
+        aleatorio = random.Random(parametros["semente"])
+        usar = cliente if admin else anonimo
+
+        def pedir():
+            metodo, url, campos, tem_foto = gerar(aleatorio, parametros["escala"])
+            if metodo == "GET":
+                return usar.get(url).status_code
+            dados = dict(campos)
+            if tem_foto:
+                dados["fotos"] = [(io.BytesIO(FOTO_FALSA), "foto.jpg")]
+            return usar.post(url, data=dados, content_type="multipart/form-data").status_code
+
+        for _ in range(parametros["aquecimento"]):
+            pedir()
+        tempos, erros = [], 0
+        inicio = time.perf_counter()
+        for _ in range(parametros["requisicoes"]):
+            t = time.perf_counter()
+            status = pedir()
+            tempos.append((time.perf_counter() - t) * 1000)
+            erros += status >= 400
+        resultados.append({"cenario": nome, **resumir(tempos, erros, time.perf_counter() - inicio)})
+    return resultados
+
+# ===========================================
+# 🦄 Modo gunicorn (HTTP de verdade)
+# ===========================================
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _multipart(campos, tem_foto):
+    fronteira = uuid.uuid4().hex
+    partes = []
+    for chave, valor in campos.items():
+        partes.append(f'--{fronteira}\r\nContent-Disposition: form-data; name="{chave}"\r\n\r\n{valor}\r\n'.encode())
+    if tem_foto:
+        partes.append(f'--{fronteira}\r\nContent-Disposition: form-data; name="fotos"; filename="foto.jpg"\r\n'
+                      f"Content-Type: image/jpeg\r\n\r\n".encode() + FOTO_FALSA + b"\r\n")
+    partes.append(f"--{fronteira}--\r\n".encode())
+    return b"".join(partes), f"multipart/form-data; boundary={fronteira}"
+
+def _http(porta, metodo, url, corpo=None, cabecalhos=None, lento=False):
+    conexao = http.client.HTTPConnection("127.0.0.1", porta, timeout=60)
+    try:
+        if lento and corpo:
+            # Manda o corpo em 10 pedaços ao longo de ENVIO_LENTO_S
+            conexao.putrequest(metodo, url)
+            for chave, valor in {**(cabecalhos or {}), "Content-Length": str(len(corpo))}.items():
+                conexao.putheader(chave, valor)
+            conexao.endheaders()
+            pedaco = len(corpo) // 10 + 1
+            for i in range(0, len(corpo), pedaco):
+                time.sleep(ENVIO_LENTO_S / 10)
+                conexao.send(corpo[i:i + pedaco])
+        else:
+            conexao.request(metodo, url, body=corpo, headers=cabecalhos or {})
+        resposta = conexao.getresponse()
+        resposta.read()
+        return resposta.status, resposta.getheader("Set-Cookie")
+    finally:
+        conexao.close()
+
+def _login_http(porta):
+    corpo = urlencode({"username": USUARIO, "password": SENHA})
+    _, cookie = _http(porta, "POST", "/login", corpo, {"Content-Type": "application/x-www-form-urlencoded"})
+    return cookie.split(";", 1)[0] if cookie else ""
+
+def _rodar_gunicorn(parametros, ambiente, trabalho, servidor):
+    porta = _porta_livre()
+    log = open(os.path.join(trabalho, f"gunicorn_{servidor}.log"), "w")
+    alvo = "bench_carga:criar_app_asgi()" if servidor == "asgi" else "bench_carga:criar_app()"
+    # Mesma configuração do start.sh; só o alvo troca (app com o Cloudinary falso)
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", os.path.join(PASTA, "gunicorn.conf.py"),
+         "-b", f"127.0.0.1:{porta}", "--pythonpath", PASTA, "--log-level", "warning", alvo],
+        cwd=trabalho, stdout=log, stderr=subprocess.STDOUT,
+        env={**ambiente, "SERVIDOR": servidor, "WEB_CONCURRENCY": str(parametros["workers"]),
+             "THREADS": str(parametros["threads"])},
+    )
+    try:
+        limite = time.monotonic() + 60
+        while True:
+            try:
+                if _http(porta, "GET", "/offline.html")[0] == 200:
+                    break
+            except OSError:
+                pass
+            if processo.poll() is not None or time.monotonic() > limite:
+                raise RuntimeError(f"gunicorn não subiu (veja {log.name})")
+            time.sleep(0.2)
+
+        cookie = _login_http(porta)
+        resultados = []
+        for nome in parametros["cenarios"]:
+            gerar, admin = CENARIOS[nome]
+            aleatorio = random.Random(parametros["semente"])
+            trava = threading.Lock()
+
+            def pedir(gerar=gerar, admin=admin, lento=nome == "admin_add_lento"):
+                with trava:
+                    metodo, url, campos, tem_foto = gerar(aleatorio, parametros["escala"])
+                cabecalhos = {"Cookie": cookie} if admin else {}
+                corpo = None
+                if metodo == "POST":
+                    corpo, cabecalhos["Content-Type"] = _multipart(campos, tem_foto)
+                t = time.perf_counter()
+                try:
+                    status = _http(porta, metodo, url, corpo, cabecalhos, lento)[0]
+                except OSError:
+                    status = 599
+                # Redirect do POST (302) é sucesso
+                return (time.perf_counter() - t) * 1000, status >= 400
+
+            # Uploads lentos em segundo plano durante a medição
+            parar = threading.Event()
+            def upload_lento():
+                while not parar.is_set():
+                    pedir(_admin_add, True, True)
+            fundo = []
+            if nome == "index_com_uploads_lentos":
+                fundo = [threading.Thread(target=upload_lento) for _ in range(parametros["concorrencia"])]
+                for thread in fundo:
+                    thread.start()
+                time.sleep(ENVIO_LENTO_S)
+
+            with ThreadPoolExecutor(parametros["concorrencia"]) as executor:
+                list(executor.map(lambda _: pedir(), range(parametros["aquecimento"])))
+                inicio = time.perf_counter()
+                medidas = list(executor.map(lambda _: pedir(), range(parametros["requisicoes"])))
+                duracao = time.perf_counter() - inicio
+            parar.set()
+            for thread in fundo:
+                thread.join()
+            resultados.append({
+                "cenario": nome,
+                "servidor": servidor,
+                "concorrencia": parametros["concorrencia"],
+                **resumir([m[0] for m in medidas], sum(m[1] for m in medidas), duracao),
+            })
+        return resultados
+    finally:
+        processo.terminate()
+        processo.wait(timeout=30)
+        log.close()
+
+# ===========================================
+# 🧭 Orquestração
+# ===========================================
+def banco_da_escala(escala, semente):
+    """Banco sintético guardado em bench_dados/ (gerado só na primeira vez)."""
+    caminho = os.path.join(PASTA_DADOS, f"imoveis_{escala}_s{semente}.db")
+    if not os.path.exists(caminho):
+        print(f"🌱 Gerando banco com {escala} imóveis...")
+        segundos = semear_banco.semear(caminho, escala, semente)
+        print(f"   pronto em {segundos:.1f}s")
+    return caminho
+
+def medir_escala(escala, modo, args):
+    """Copia o banco da escala para uma pasta de trabalho (as escritas não sujam o original) e mede."""
+    trabalho = os.path.join(PASTA_DADOS, f"trabalho_{escala}_{modo}")
+    shutil.rmtree(trabalho, ignore_errors=True)
+    os.makedirs(trabalho)
+    banco = os.path.join(trabalho, "database.db")
+    shutil.copy(banco_da_escala(escala, args.semente), banco)
+    # Medir com um plano que varre a tabela não vale: para antes, com erro
+    if not verificar_indices.verificar_indices(banco, detalhar=False):
+        shutil.rmtree(trabalho, ignore_errors=True)
+        sys.exit(f"❌ {escala} imóveis: plano de consulta sem índice (python verificar_indices.py)")
+
+    ambiente = {
+        **os.environ,
+        "DATABASE_PATH": banco,
+        "SECRET_KEY": os.getenv("SECRET_KEY", "bench"),
+        "ADMIN_USERNAME": USUARIO,
+        "ADMIN_PASSWORD": SENHA,
+        "BENCH_LATENCIA_UPLOAD": str(args.latencia_upload),
+        "METRICAS_DIR": os.path.join(trabalho, "metricas"),
+        "PYTHONPATH": PASTA + os.pathsep + os.getenv("PYTHONPATH", ""),
+    }
+    parametros = {
+        "escala": escala, "semente": args.semente, "cenarios": args.cenarios,
+        "requisicoes": args.requisicoes, "aquecimento": args.aquecimento,
+        "concorrencia": args.concorrencia, "workers": args.workers, "threads": args.threads,
+    }
+    try:
+        if modo == "cliente":
+            saida = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--_cliente", json.dumps(parametros)],
+                cwd=trabalho, env=ambiente, capture_output=True, text=True, check=True,
+            ).stdout
+            resultados = json.loads(saida.strip().splitlines()[-1])
+        else:
+            resultados = []
+            for servidor in args.servidores:
+                resultados.extend(_rodar_gunicorn(parametros, ambiente, trabalho, servidor))
+    finally:
+        if not args.manter:
+            shutil.rmtree(trabalho, ignore_errors=True)
+    return [{"escala": escala, "modo": modo, **r} for r in resultados]
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PASTA,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def _rotulo(r):
+    return r["modo"] if r["modo"] == "cliente" else f"{r['modo']}/{r.get('servidor', 'sync')}"
+
+def imprimir(resultados):
+    print(f"\n{'escala':>7} {'modo':<16} {'cenário':<24} {'req':>5} {'erros':>5} {'req/s':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for r in resultados:
+        print(f"{r['escala']:>7} {_rotulo(r):<16} {r['cenario']:<24} {r['requisicoes']:>5} {r['erros']:>5} "
+              f"{r['rps']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8}")
+    print()
+
+def comparar(atual, anterior, tolerancia):
+    """Mostra a variação de p95 e req/s; retorna quantas regressões passaram da tolerância (%)."""
+    base = {(r["escala"], _rotulo(r), r["cenario"]): r for r in anterior["resultados"]}
+    regressoes = 0
+    print(f"📊 Comparando com {anterior.get('quando')} ({anterior.get('commit')}), tolerância {tolerancia}%\n")
+    for r in atual["resultados"]:
+        antes = base.get((r["escala"], _rotulo(r), r["cenario"]))
+        if not antes or not antes["p95_ms"] or not antes["rps"]:
+            continue
+        var_p95 = (r["p95_ms"] - antes["p95_ms"]) / antes["p95_ms"] * 100
+        var_rps = (r["rps"] - antes["rps"]) / antes["rps"] * 100
+        piorou = var_p95 > tolerancia or var_rps < -tolerancia
+        regressoes += piorou
+        print(f"{'❌' if piorou else '✅'} {r['escala']:>7} {_rotulo(r):<16} {r['cenario']:<24} "
+              f"p95 {antes['p95_ms']:>8} → {r['p95_ms']:>8} ({var_p95:+.1f}%) | "
+              f"req/s {antes['rps']:>8} → {r['rps']:>8} ({var_rps:+.1f}%)")
+    print()
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark e teste de carga das rotas do site.")
+    parser.add_argument("--escalas", type=int, nargs="+", default=[100, 10000],
+                        help="quantidades de imóveis (ex.: 100 10000 100000)")
+    parser.add_argument("--modo", choices=["cliente", "gunicorn", "ambos"], default="cliente")
+    parser.add_argument("--cenarios", nargs="+", choices=list(CENARIOS),
+                        default=[c for c in CENARIOS if c not in CENARIOS_SO_HTTP])
+    parser.add_argument("--requisicoes", type=int, default=300, help="por cenário")
+    parser.add_argument("--aquecimento", type=int, default=20)
+    parser.add_argument("--concorrencia", type=int, default=8, help="conexões simultâneas (gunicorn)")
+    parser.add_argument("--workers", type=int, default=4, help="workers do gunicorn (WEB_CONCURRENCY)")
+    parser.add_argument("--threads", type=int, default=8, help="threads por worker (gthread/asgi)")
+    parser.add_argument("--servidores", nargs="+", choices=["sync", "gthread", "asgi"], default=["sync"],
+                        help="modos do gunicorn.conf.py comparados no modo gunicorn")
+    parser.add_argument("--latencia-upload", type=float, default=0.2, help="segundos do Cloudinary falso")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", default=None, help="arquivo JSON (padrão: bench_resultados/<data>.json)")
+    parser.add_argument("--comparar", default=None, help="resultado anterior para apontar regressões")
+    parser.add_argument("--tolerancia", type=float, default=15.0, help="%% de piora aceita no p95/req/s")
+    parser.add_argument("--manter", action="store_true", help="não apaga as pastas de trabalho")
+    parser.add_argument("--_cliente", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._cliente:
+        print(json.dumps(_rodar_cliente(json.loads(args._cliente))))
+        return
+
+    modos = ["cliente", "gunicorn"] if args.modo == "ambos" else [args.modo]
+    resultados = []
+    for escala in args.escalas:
+        for modo in modos:
+            print(f"⏱️ {escala} imóveis | {modo}...")
+            resultados.extend(medir_escala(escala, modo, args))
+
+    documento = {
+        "quando": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": _commit_atual(),
+        "ambiente": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+            "page_cache": os.getenv("PAGE_CACHE", "memoria"),
+            "metricas": os.getenv("METRICAS", "on"),
+        },
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("_cliente", "saida", "comparar")},
+        "resultados": resultados,
+    }
+    imprimir(resultados)
+
+    os.makedirs(PASTA_RESULTADOS, exist_ok=True)
+    saida = args.saida or os.path.join(PASTA_RESULTADOS, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(documento, f, ensure_ascii=False, indent=1)
+    print(f"💾 Resultado salvo em {saida}\n")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            if comparar(documento, json.load(f), args.tolerancia):
+                sys.exit(1)
+
+if __name__ == "__main__":
+    main()
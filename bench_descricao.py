@@ -0,0 +1,65 @@
+# ===========================================
+# ⏱️ BENCHMARK - RENDERIZAÇÃO DA PÁGINA DE DETALHES
+# ===========================================
+# Compara o tempo de renderizar detalhes.html com uma descrição grande:
+#   - antes (sem sanitizar): descricao_html cru com | safe (o que o site fazia)
+#   - sanitizando por requisição: o custo de deixar o HTML seguro a cada acesso
+#   - pré-compilado: descricao_render gravado na escrita (descricao.py)
+# Não grava nada no banco (o imóvel é montado em memória).
+#
+# Uso: python bench_descricao.py [--repeticoes 200] [--tamanho 200]
+# ===========================================
+
+import argparse
+import statistics
+import time
+
+import app as site
+import descricao
+
+BLOCO = """📍 Localizada no <strong>lado praia</strong> a 150 metros do mar.
+📐 Área total: 269,5 m² &amp; área construída: 208,81 m²
+<ul><li>✅ Igreja</li><li>✅ Farmácia</li><li>✅ Supermercado</li></ul>
+<p style="color:red" onclick="x()">Aceita <em>financiamento</em> bancário. <a href="https://wa.me/5513">Fale conosco</a></p>
+<script>console.log("colado sem querer")</script>
+"""
+
+def medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos), max(tempos)
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede a renderização de detalhes.html.")
+    parser.add_argument("--repeticoes", type=int, default=200)
+    parser.add_argument("--tamanho", type=int, default=200, help="quantas vezes repetir o bloco de exemplo")
+    args = parser.parse_args()
+
+    descricao_html = BLOCO * args.tamanho
+    campos = descricao.compilar(descricao_html)
+    base = {"id": 1, "titulo": "Casa de teste", "descricao": "Resumo", "preco": "R$ 450.000,00",
+            "descricao_html": descricao_html, **campos}
+
+    def renderizar(imovel):
+        with site.app.test_request_context("/imovel/1"):
+            site.render_template("detalhes.html", imovel=imovel, fotos=[])
+
+    cenarios = {
+        "antes (cru, sem sanitizar)": lambda: renderizar({**base, "descricao_render": descricao_html}),
+        "sanitizando por requisição": lambda: renderizar({**base, "descricao_render": descricao.sanitizar(descricao_html)}),
+        "pré-compilado (descricao_render)": lambda: renderizar(base),
+    }
+
+    renderizar(base)  # aquece o cache de templates do Jinja
+    print(f"\n⏱️ detalhes.html com descrição de {len(descricao_html) / 1024:.0f} KB "
+          f"({args.repeticoes} repetições)\n")
+    for nome, funcao in cenarios.items():
+        mediana, pior = medir(funcao, args.repeticoes)
+        print(f"  {nome:<34} mediana {mediana:7.2f} ms | pior {pior:7.2f} ms")
+    print()
+
+if __name__ == "__main__":
+    main()
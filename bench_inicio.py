@@ -0,0 +1,156 @@
+# ===========================================
+# 🥶 BENCHMARK DE SUBIDA (cold start)
+# ===========================================
+# Mede o que um visitante espera quando o Render acorda o serviço:
+#   - processo: tempo do "import app", do aquecimento (app.aquecer) e da
+#     primeira resposta de "/" num Python novo, em três situações:
+#       frio      → sem cache de bytecode do Jinja (primeira subida)
+#       bytecode  → com o cache de bytecode já gravado (subidas seguintes)
+#       aquecido  → import + aquecer() antes de "/" (o que o preload faz)
+#   - gunicorn: do início do processo até a primeira resposta 200 de "/" e o
+#     pior tempo das primeiras requisições (uma por worker, em paralelo),
+#     com PRELOAD_APP=0 e PRELOAD_APP=1
+# Cada medida é a mediana de --repeticoes processos novos.
+#
+# Uso: python bench_inicio.py [--escala 10000] [--repeticoes 5] [--workers 4]
+# ===========================================
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+
+def _fase_processo(aquecer):
+    """Roda num Python novo (--_processo): imprime os tempos em ms como JSON."""
+    inicio = time.perf_counter()
+    import app
+    importado = time.perf_counter()
+    if aquecer:
+        app.aquecer()
+    aquecido = time.perf_counter()
+    resposta = app.app.test_client().get("/")
+    fim = time.perf_counter()
+    assert resposta.status_code == 200, resposta.status_code
+    print(json.dumps({
+        "import_ms": round((importado - inicio) * 1000, 1),
+        "aquecer_ms": round((aquecido - importado) * 1000, 1),
+        "primeira_resposta_ms": round((fim - aquecido) * 1000, 1),
+        "total_ms": round((fim - inicio) * 1000, 1),
+    }))
+
+def medir_processo(situacao, ambiente, trabalho, repeticoes):
+    pasta_jinja = ambiente["JINJA_CACHE_DIR"]
+    medidas = []
+    for _ in range(repeticoes):
+        if situacao == "frio":
+            shutil.rmtree(pasta_jinja, ignore_errors=True)
+        inicio = time.perf_counter()
+        saida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--_processo", "1" if situacao == "aquecido" else "0"],
+            cwd=trabalho, env=ambiente, capture_output=True, text=True, check=True,
+        ).stdout
+        medida = json.loads(saida.strip().splitlines()[-1])
+        medida["processo_ms"] = round((time.perf_counter() - inicio) * 1000, 1)  # inclui subir o Python
+        medidas.append(medida)
+    return {chave: statistics.median(m[chave] for m in medidas) for chave in medidas[0]}
+
+def medir_gunicorn(preload, ambiente, trabalho, repeticoes, workers):
+    import bench_carga
+
+    medidas = []
+    for _ in range(repeticoes):
+        porta = bench_carga._porta_livre()
+        inicio = time.perf_counter()
+        processo = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", os.path.join(PASTA, "gunicorn.conf.py"),
+             "-b", f"127.0.0.1:{porta}", "--pythonpath", PASTA, "--log-level", "warning"],
+            cwd=trabalho, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            env={**ambiente, "PRELOAD_APP": "1" if preload else "0", "WEB_CONCURRENCY": str(workers)},
+        )
+        try:
+            limite = time.monotonic() + 60
+            while True:
+                try:
+                    if bench_carga._http(porta, "GET", "/")[0] == 200:
+                        break
+                except OSError:
+                    pass
+                if processo.poll() is not None or time.monotonic() > limite:
+                    raise RuntimeError("gunicorn não subiu")
+                time.sleep(0.01)
+            primeira = time.perf_counter() - inicio
+
+            # Logo em seguida: várias ao mesmo tempo, caindo em workers que talvez ainda estejam frios
+            def pedir(_):
+                comeco = time.perf_counter()
+                bench_carga._http(porta, "GET", "/imovel/1")
+                return time.perf_counter() - comeco
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                pior = max(executor.map(pedir, range(workers * 2)))
+        finally:
+            processo.terminate()
+            processo.wait(timeout=30)
+        medidas.append({"primeira_resposta_ms": round(primeira * 1000, 1),
+                        "pior_das_seguintes_ms": round(pior * 1000, 1)})
+    return {chave: statistics.median(m[chave] for m in medidas) for chave in medidas[0]}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da subida do app (import, aquecimento, 1ª resposta).")
+    parser.add_argument("--escala", type=int, default=10000, help="nº de imóveis do banco sintético")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--sem-gunicorn", action="store_true", help="mede só o processo")
+    parser.add_argument("--_processo", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._processo is not None:
+        _fase_processo(args._processo == "1")
+        return
+
+    import bench_carga
+
+    trabalho = os.path.join(bench_carga.PASTA_DADOS, f"trabalho_inicio_{args.escala}")
+    shutil.rmtree(trabalho, ignore_errors=True)
+    os.makedirs(trabalho)
+    shutil.copy(bench_carga.banco_da_escala(args.escala, args.semente), os.path.join(trabalho, "database.db"))
+    ambiente = {
+        **os.environ,
+        "DATABASE_PATH": os.path.join(trabalho, "database.db"),
+        "SECRET_KEY": os.getenv("SECRET_KEY", "bench"),
+        "JINJA_CACHE_DIR": os.path.join(trabalho, "cache_jinja"),
+        "METRICAS_DIR": os.path.join(trabalho, "metricas"),
+        "PYTHONPATH": PASTA + os.pathsep + os.getenv("PYTHONPATH", ""),
+    }
+
+    try:
+        # O banco copiado ganha o schema atual na primeira importação: fora da medida
+        subprocess.run([sys.executable, "-c", "import app"], cwd=trabalho, env=ambiente, check=True)
+
+        print(f"\n⏱️ Processo novo, {args.escala} imóveis (mediana de {args.repeticoes})\n")
+        print(f"{'situação':<10} {'import':>9} {'aquecer':>9} {'1ª resp.':>9} {'total':>9} {'c/ Python':>10}")
+        for situacao in ("frio", "bytecode", "aquecido"):
+            m = medir_processo(situacao, ambiente, trabalho, args.repeticoes)
+            print(f"{situacao:<10} {m['import_ms']:>7} ms {m['aquecer_ms']:>6} ms "
+                  f"{m['primeira_resposta_ms']:>6} ms {m['total_ms']:>6} ms {m['processo_ms']:>7} ms")
+
+        if not args.sem_gunicorn:
+            print(f"\n🦄 gunicorn, {args.workers} workers (mediana de {args.repeticoes})\n")
+            print(f"{'preload':<8} {'1ª resposta de /':>17} {'pior das seguintes':>19}")
+            for preload in (False, True):
+                m = medir_gunicorn(preload, ambiente, trabalho, args.repeticoes, args.workers)
+                print(f"{'sim' if preload else 'não':<8} {m['primeira_resposta_ms']:>14} ms "
+                      f"{m['pior_das_seguintes_ms']:>16} ms")
+        print()
+    finally:
+        shutil.rmtree(trabalho, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# ===========================================
+# 🧭 BENCHMARK - IMÓVEIS SEMELHANTES
+# ===========================================
+# Para cada escala do banco sintético (cópia em bench_dados/, o original
+# não é alterado) mede:
+#   - cálculo completo (python semelhantes.py --tudo), por etapa
+#   - atualização incremental depois de editar 1 imóvel e de importar 100
+#   - leitura da lista na página de detalhes (consultas.semelhantes)
+# e confere o resultado da árvore k-d contra a força bruta numa amostra.
+#
+# Uso: python bench_semelhantes.py [--escalas 10000,50000] [--semente 42]
+# ===========================================
+
+import argparse
+import os
+import shutil
+import statistics
+import time
+
+import banco
+import bench_carga
+import consultas
+import semelhantes
+
+def _cronometrar(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+def etapas(conn):
+    """Tempo de cada etapa do cálculo completo (sem gravar) + conferência com a força bruta."""
+    np = semelhantes.np
+    linhas, ler = _cronometrar(lambda: conn.execute(f"SELECT {semelhantes.COLUNAS} FROM imoveis ORDER BY id").fetchall())
+    textos, tokens = _cronometrar(lambda: [semelhantes.palavras(imovel) for imovel in linhas])
+    modelo, ajustar = _cronometrar(lambda: semelhantes.ajustar(linhas, textos))
+    matriz, vetorizar = _cronometrar(lambda: semelhantes.vetores(linhas, textos, modelo))
+    (posicoes, distancias), knn = _cronometrar(lambda: semelhantes.todos_os_vizinhos(matriz))
+
+    amostra = np.random.default_rng(0).choice(len(matriz), size=min(500, len(matriz)), replace=False)
+    _, bruta = semelhantes.vizinhos(matriz, amostra)
+    iguais = np.allclose(distancias[amostra], bruta, atol=1e-4)
+    return {"ler": ler, "palavras": tokens, "ajustar": ajustar, "vetores": vetorizar, "vizinhos": knn}, iguais
+
+def medir_escala(escala, semente):
+    trabalho = os.path.join(bench_carga.PASTA_DADOS, f"trabalho_semelhantes_{escala}")
+    shutil.rmtree(trabalho, ignore_errors=True)
+    os.makedirs(trabalho)
+    caminho = os.path.join(trabalho, "database.db")
+    shutil.copy(bench_carga.banco_da_escala(escala, semente), caminho)
+    try:
+        conn = banco.conectar(caminho)
+        banco.garantir_schema(conn)
+
+        tempos, iguais = etapas(conn)
+        _, completo = _cronometrar(lambda: semelhantes.atualizar(conn, tudo=True))
+
+        # 1 imóvel editado (o que /edit faz)
+        conn.execute("UPDATE imoveis SET preco_centavos = preco_centavos * 2, updated_at = ? WHERE id = 7",
+                     (banco.agora(),))
+        conn.commit()
+        listas_um, um = _cronometrar(lambda: semelhantes.atualizar(conn))
+
+        # 100 imóveis de uma vez (uma importação pequena)
+        conn.execute("UPDATE imoveis SET area_m2 = area_m2 + 1 WHERE id % ? = 0", (max(escala // 100, 1),))
+        conn.commit()
+        listas_cem, cem = _cronometrar(lambda: semelhantes.atualizar(conn))
+
+        leituras = []
+        for imovel_id in range(1, 201):
+            inicio = time.perf_counter()
+            consultas.semelhantes(conn, imovel_id)
+            leituras.append((time.perf_counter() - inicio) * 1000)
+        conn.close()
+    finally:
+        shutil.rmtree(trabalho, ignore_errors=True)
+
+    print(f"\n📦 {escala} imóveis\n")
+    print("   etapas: " + " | ".join(f"{nome} {segundos:.2f}s" for nome, segundos in tempos.items()))
+    print(f"   cálculo completo (com gravação): {completo:.2f}s "
+          f"— árvore k-d {'igual' if iguais else 'DIFERENTE'} à força bruta")
+    print(f"   incremental, 1 editado:   {um * 1000:.0f} ms ({listas_um} listas)")
+    print(f"   incremental, 100 editados: {cem * 1000:.0f} ms ({listas_cem} listas)")
+    print(f"   leitura no detalhe: mediana {statistics.median(leituras):.3f} ms, pior {max(leituras):.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede o cálculo dos imóveis semelhantes.")
+    parser.add_argument("--escalas", default="10000,50000")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+    if semelhantes.np is None:
+        raise SystemExit("⚠️ NumPy não instalado (pip install numpy).")
+
+    print(f"\n🧭 Imóveis semelhantes: {semelhantes.VIZINHOS} vizinhos, {semelhantes.THREADS} thread(s)")
+    for escala in (int(e) for e in args.escalas.split(",")):
+        medir_escala(escala, args.semente)
+    print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# ===========================================
+# 🧠 CACHE DE PÁGINAS RENDERIZADAS
+# ===========================================
+# Guarda o HTML pronto de "/" e "/imovel/<id>".
+# A chave inclui a versão do catálogo (banco.versao_catalogo), que sobe a
+# cada INSERT/UPDATE/DELETE em imoveis — então nada fica desatualizado:
+# páginas de versões antigas simplesmente deixam de ser pedidas e expiram.
+#
+# Backends (variável de ambiente PAGE_CACHE):
+#   - "memoria" (padrão): LRU por processo, com TTL e limite de itens
+#   - "arquivo": arquivos em PAGE_CACHE_DIR, compartilhados entre os workers do gunicorn
+#   - "off": desligado
+# ===========================================
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+class Estatisticas:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def como_dict(self, **extra):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            **extra,
+        }
+
+# ===========================================
+# 💾 Memória (LRU por processo)
+# ===========================================
+class CacheMemoria:
+    def __init__(self, max_itens=500, ttl=300):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = Estatisticas()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self.stats.misses += 1
+                return None
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                self.stats.misses += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.stats.hits += 1
+            return valor
+
+    def set(self, chave, valor):
+        with self._lock:
+            self._itens[chave] = (time.monotonic() + self.ttl, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                self.stats.evictions += 1
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self):
+        return self.stats.como_dict(backend="memoria", itens=len(self._itens), max_itens=self.max_itens)
+
+# ===========================================
+# 📁 Arquivo (compartilhado entre workers)
+# ===========================================
+class CacheArquivo:
+    def __init__(self, diretorio, max_itens=2000, ttl=300):
+        self.diretorio = diretorio
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self.stats = Estatisticas()
+        self._gravacoes = 0
+        os.makedirs(diretorio, exist_ok=True)
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, hashlib.sha1(chave.encode()).hexdigest() + ".html")
+
+    def get(self, chave):
+        caminho = self._caminho(chave)
+        try:
+            if os.path.getmtime(caminho) + self.ttl < time.time():
+                os.remove(caminho)
+                self.stats.misses += 1
+                return None
+            with open(caminho, encoding="utf-8") as f:
+                valor = f.read()
+        except OSError:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return valor
+
+    def set(self, chave, valor):
+        # Grava num temporário e renomeia: outro worker nunca lê meio arquivo
+        fd, temporario = tempfile.mkstemp(dir=self.diretorio, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(valor)
+        os.replace(temporario, self._caminho(chave))
+        # Listar o diretório custa caro: confere o limite a cada 50 gravações
+        self._gravacoes += 1
+        if self._gravacoes % 50 == 0:
+            self._limitar_tamanho()
+
+    def _limitar_tamanho(self):
+        arquivos = [e for e in os.scandir(self.diretorio) if e.name.endswith(".html")]
+        excesso = len(arquivos) - self.max_itens
+        if excesso <= 0:
+            return
+        # Remove os mais antigos (por data de gravação)
+        for entrada in sorted(arquivos, key=lambda e: e.stat().st_mtime)[:excesso]:
+            try:
+                os.remove(entrada.path)
+                self.stats.evictions += 1
+            except OSError:
+                pass
+
+    def limpar(self):
+        for entrada in os.scandir(self.diretorio):
+            if entrada.name.endswith(".html"):
+                os.remove(entrada.path)
+
+    def estatisticas(self):
+        itens = sum(1 for e in os.scandir(self.diretorio) if e.name.endswith(".html"))
+        return self.stats.como_dict(backend="arquivo", itens=itens, max_itens=self.max_itens,
+                                    diretorio=self.diretorio)
+
+# ===========================================
+# ⚙️ Escolha do backend
+# ===========================================
+def criar_cache():
+    """Cria o cache conforme PAGE_CACHE / PAGE_CACHE_TTL / PAGE_CACHE_MAX. Retorna None se desligado."""
+    tipo = os.getenv("PAGE_CACHE", "memoria").lower()
+    ttl = int(os.getenv("PAGE_CACHE_TTL", "300"))
+    max_itens = int(os.getenv("PAGE_CACHE_MAX", "500"))
+
+    if tipo == "off":
+        return None
+    if tipo == "arquivo":
+        diretorio = os.getenv("PAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "celo-imoveis-cache"))
+        return CacheArquivo(diretorio, max_itens=max_itens, ttl=ttl)
+    return CacheMemoria(max_itens=max_itens, ttl=ttl)
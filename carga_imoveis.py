@@ -0,0 +1,350 @@
+# ===========================================
+# 📦 IMPORTAÇÃO / EXPORTAÇÃO EM MASSA (CSV e JSONL)
+# ===========================================
+# Para a carteira de um parceiro (milhares de imóveis) sem digitar um a um.
+# Tudo em fluxo, com geradores: lê uma linha → valida/normaliza → junta em
+# lotes → grava cada lote numa transação só, sempre com os mesmos comandos
+# SQL (preparados uma vez e reaproveitados). Nem a importação nem a
+# exportação carregam a tabela ou o arquivo inteiro na memória.
+#
+# Chave do upsert: "codigo" (código no sistema do parceiro → imoveis.codigo_externo);
+# sem código, "id"; sem nenhum dos dois, o imóvel é sempre novo.
+# Linha igual à do banco não é regravada (não muda updated_at nem a versão do catálogo).
+#
+# Fotos ("fotos": lista no JSONL, URLs separadas por "|" ou "," no CSV):
+#   - Cloudinary e arquivos locais entram direto em imovel_fotos
+#   - URLs externas (site do parceiro) vão para a fila (fila_fotos.py) e são
+#     enviadas ao Cloudinary depois, fora da importação; entram no fim da lista
+# Em imóveis que já existiam, as fotos só mudam com --substituir-fotos.
+#
+# Uso (pelo gerenciador):
+#   python gerenciador_imoveis_avancado.py importar carteira.csv [--lote 1000] [--processar-fotos]
+#   python gerenciador_imoveis_avancado.py exportar imoveis.jsonl
+# ===========================================
+
+import csv
+import itertools
+import json
+import sqlite3
+import sys
+import time
+
+import banco
+import descricao
+import fila_fotos
+
+LOTE = 1000
+MAX_ERROS_LISTADOS = 50
+
+# Campos do arquivo (entrada e saída)
+CAMPOS = ["id", "codigo", "titulo", "descricao", "descricao_html", "preco", "dormitorios", "banheiros",
+          "vagas", "area", "destaque", "bairro", "cidade", "latitude", "longitude", "fotos", "updated_at"]
+
+# Colunas vindas do arquivo; as derivadas (preco_centavos, area_m2, descricao_*) saem delas
+COLUNAS = ("codigo_externo", "titulo", "descricao", "descricao_html", "preco", "dormitorios", "banheiros",
+           "vagas", "area", "destaque", "bairro", "cidade", "latitude", "longitude")
+VERDADEIRO = {"1", "s", "sim", "true", "x", "y", "yes"}
+
+class LinhaInvalida(ValueError):
+    pass
+
+# ===========================================
+# 📊 Relatório (contagens e vazão)
+# ===========================================
+class Relatorio:
+    def __init__(self, saida=sys.stdout):
+        self.saida = saida
+        self.inicio = time.perf_counter()
+        self.lidas = 0
+        self.inseridos = 0
+        self.atualizados = 0
+        self.inalterados = 0
+        self.fotos = 0
+        self.fotos_na_fila = 0
+        self.rejeitadas = 0
+        self.erros = []   # só as primeiras MAX_ERROS_LISTADOS
+
+    def erro(self, numero, mensagem):
+        self.rejeitadas += 1
+        if len(self.erros) < MAX_ERROS_LISTADOS:
+            self.erros.append((numero, mensagem))
+
+    def segundos(self):
+        return time.perf_counter() - self.inicio
+
+    def vazao(self):
+        return self.lidas / max(self.segundos(), 1e-9)
+
+    def progresso(self):
+        print(f"   … {self.lidas} linhas ({self.vazao():,.0f} linhas/s)", file=self.saida)
+
+    def imprimir(self):
+        print("────────────────────────────────────", file=self.saida)
+        print(f"📥 {self.lidas} linhas em {self.segundos():.1f}s ({self.vazao():,.0f} linhas/s)", file=self.saida)
+        print(f"   ➕ {self.inseridos} novos · ✏️ {self.atualizados} atualizados · "
+              f"⏸️ {self.inalterados} sem mudança · ❌ {self.rejeitadas} rejeitadas", file=self.saida)
+        print(f"   📸 {self.fotos} fotos gravadas · {self.fotos_na_fila} na fila de envio", file=self.saida)
+        for numero, mensagem in sorted(self.erros):
+            print(f"   linha {numero}: {mensagem}", file=self.saida)
+        if self.rejeitadas > len(self.erros):
+            print(f"   … e mais {self.rejeitadas - len(self.erros)} erro(s)", file=self.saida)
+
+# ===========================================
+# 📖 Leitura (gera uma linha por vez)
+# ===========================================
+def detectar_formato(caminho, formato=None):
+    if formato:
+        return formato
+    return "jsonl" if caminho.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+def ler_linhas(arquivo, formato):
+    """Gera (nº da linha, registro). No JSONL o registro ainda é texto (validado depois)."""
+    if formato == "jsonl":
+        for numero, linha in enumerate(arquivo, start=1):
+            if linha.strip():
+                yield numero, linha
+        return
+
+    # Planilha brasileira costuma vir com ";": decide pelo cabeçalho
+    cabecalho = next(arquivo, "")
+    separador = ";" if cabecalho.count(";") > cabecalho.count(",") else ","
+    leitor = csv.DictReader(itertools.chain([cabecalho], arquivo), delimiter=separador)
+    for registro in leitor:
+        yield leitor.line_num, registro
+
+# ===========================================
+# 🧹 Validação e normalização
+# ===========================================
+def _texto(valor):
+    return "" if valor is None else str(valor).strip()
+
+def _numero_br(valor, fixo=False):
+    """250000 → '250.000,00' (fixo); 89.55 → '89,55' e 160.0 → '160' (sem zeros à direita)."""
+    texto = f"{valor:,.2f}"
+    if not fixo:
+        texto = texto.rstrip("0").rstrip(".")
+    return texto.translate(str.maketrans(",.", ".,"))
+
+def _numerico(valor):
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool)
+
+def _preco(valor):
+    if _numerico(valor):
+        return f"R$ {_numero_br(valor, fixo=True)}"
+    return _texto(valor)
+
+def _area(valor):
+    if _numerico(valor):
+        return _numero_br(valor)
+    texto = _texto(valor)
+    for sufixo in ("m²", "m2", "M²", "M2"):
+        if texto.endswith(sufixo):
+            texto = texto[:-len(sufixo)].strip()
+    return texto
+
+def _inteiro(valor, campo):
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    texto = _texto(valor)
+    if not texto:
+        return 0
+    numero = banco.inteiro(texto, None)
+    if numero is None or numero < 0:
+        raise LinhaInvalida(f"{campo} inválido: {texto!r}")
+    return numero
+
+def _fotos(valor):
+    if isinstance(valor, list):
+        return [_texto(f) for f in valor if _texto(f)]
+    texto = _texto(valor)
+    separador = "|" if "|" in texto else ","
+    return [f.strip() for f in texto.split(separador) if f.strip()]
+
+def normalizar(registro):
+    """
+    Registro do arquivo → (imovel, fotos). `imovel` tem as COLUNAS, as derivadas
+    e "id" (ou None). Levanta LinhaInvalida se faltar o essencial.
+    """
+    if isinstance(registro, str):
+        try:
+            registro = json.loads(registro)
+        except ValueError as e:
+            raise LinhaInvalida(f"JSON inválido ({e})")
+        if not isinstance(registro, dict):
+            raise LinhaInvalida("cada linha do JSONL precisa ser um objeto")
+    r = {_texto(k).lower(): v for k, v in registro.items() if k}
+
+    titulo = _texto(r.get("titulo"))
+    if not titulo:
+        raise LinhaInvalida("título vazio")
+    preco = _preco(r.get("preco"))
+    if not preco:
+        raise LinhaInvalida("preço vazio")
+
+    id_texto = _texto(r.get("id"))
+    id_imovel = banco.inteiro(id_texto, None) if id_texto else None
+    if id_texto and (id_imovel is None or id_imovel <= 0):
+        raise LinhaInvalida(f"id inválido: {id_texto!r}")
+
+    area = _area(r.get("area"))
+    destaque = r.get("destaque")
+    # 📍 Coordenadas em graus decimais ("-24.0935" ou "-24,0935"); vazias = sem localização
+    latitude, longitude = banco.coordenadas(r.get("latitude"), r.get("longitude"))
+    if latitude is None and (_texto(r.get("latitude")) or _texto(r.get("longitude"))):
+        raise LinhaInvalida(f"latitude/longitude inválidas: {r.get('latitude')!r}, {r.get('longitude')!r}")
+    imovel = {
+        "id": id_imovel,
+        "codigo_externo": _texto(r.get("codigo")) or None,
+        "titulo": titulo,
+        # Texto livre fica como veio (espaços e quebras de linha fazem parte)
+        "descricao": "" if r.get("descricao") is None else str(r["descricao"]),
+        "descricao_html": "" if r.get("descricao_html") is None else str(r["descricao_html"]),
+        "preco": preco,
+        "dormitorios": _inteiro(r.get("dormitorios"), "dormitorios"),
+        "banheiros": _inteiro(r.get("banheiros"), "banheiros"),
+        "vagas": _inteiro(r.get("vagas"), "vagas"),
+        "area": area,
+        "destaque": 1 if (destaque is True or _texto(destaque).lower() in VERDADEIRO) else 0,
+        "bairro": _texto(r.get("bairro")) or None,
+        "cidade": _texto(r.get("cidade")) or None,
+        "latitude": latitude,
+        "longitude": longitude,
+        "preco_centavos": banco.preco_para_centavos(preco),
+        "area_m2": banco.area_para_m2(area),
+    }
+    return imovel, _fotos(r.get("fotos"))
+
+def validar(linhas, relatorio):
+    """Gera (nº da linha, imovel, fotos) só das linhas válidas; as outras vão para o relatório."""
+    for numero, registro in linhas:
+        relatorio.lidas += 1
+        try:
+            yield (numero, *normalizar(registro))
+        except LinhaInvalida as e:
+            relatorio.erro(numero, str(e))
+
+def em_lotes(itens, tamanho):
+    itens = iter(itens)
+    while lote := list(itertools.islice(itens, tamanho)):
+        yield lote
+
+# ===========================================
+# 💾 Gravação (upsert em lotes)
+# ===========================================
+def _mesmo_valor(a, b):
+    # area é INTEGER no schema antigo: "165" volta do banco como 165
+    return ("" if a is None else str(a)) == ("" if b is None else str(b))
+
+class Gravador:
+    """Comandos montados uma vez; cada lote roda numa transação."""
+
+    def __init__(self, conn, relatorio, substituir_fotos=False):
+        self.conn = conn
+        self.relatorio = relatorio
+        self.substituir_fotos = substituir_fotos
+        derivadas = list(descricao.compilar("").keys())
+        self.colunas = list(COLUNAS) + ["preco_centavos", "area_m2", "updated_at"] + derivadas
+        self.derivadas = derivadas
+        selecionadas = ", ".join(("id",) + COLUNAS)
+        self.sql_por_codigo = f"SELECT {selecionadas} FROM imoveis WHERE codigo_externo = ?"
+        self.sql_por_id = f"SELECT {selecionadas} FROM imoveis WHERE id = ?"
+        # "fotos" é a coluna antiga (NOT NULL): fica vazia, as fotos vão para imovel_fotos
+        self.sql_inserir = (f"INSERT INTO imoveis (id, fotos, {', '.join(self.colunas)}) "
+                            f"VALUES (?, '', {', '.join('?' * len(self.colunas))})")
+        self.sql_atualizar = f"UPDATE imoveis SET {', '.join(f'{c} = ?' for c in self.colunas)} WHERE id = ?"
+
+    def _valores(self, imovel):
+        imovel = {**imovel, "updated_at": banco.agora(), **descricao.compilar(imovel["descricao_html"])}
+        return [imovel[c] for c in self.colunas]
+
+    def _existente(self, imovel):
+        if imovel["codigo_externo"]:
+            return self.conn.execute(self.sql_por_codigo, (imovel["codigo_externo"],)).fetchone()
+        if imovel["id"]:
+            return self.conn.execute(self.sql_por_id, (imovel["id"],)).fetchone()
+        return None
+
+    def _fotos(self, imovel_id, fotos, substituir):
+        diretas = [f for f in fotos if banco.tipo_storage(f) != "externa"]
+        externas = [f for f in fotos if banco.tipo_storage(f) == "externa"]
+        if substituir:
+            banco.substituir_fotos(self.conn, imovel_id, diretas)
+        else:
+            banco.adicionar_fotos(self.conn, imovel_id, diretas)
+        self.relatorio.fotos += len(diretas)
+        if externas:
+            self.relatorio.fotos_na_fila += fila_fotos.enfileirar_urls(self.conn, imovel_id, externas)
+
+    def gravar(self, imovel, fotos):
+        existente = self._existente(imovel)
+        if existente is None:
+            cur = self.conn.execute(self.sql_inserir, [imovel["id"]] + self._valores(imovel))
+            self.relatorio.inseridos += 1
+            self._fotos(cur.lastrowid, fotos, substituir=False)
+            return
+
+        imovel_id = existente["id"]
+        if all(_mesmo_valor(existente[c], imovel[c]) for c in COLUNAS):
+            self.relatorio.inalterados += 1
+        else:
+            self.conn.execute(self.sql_atualizar, self._valores(imovel) + [imovel_id])
+            self.relatorio.atualizados += 1
+        if self.substituir_fotos and fotos:
+            self._fotos(imovel_id, fotos, substituir=True)
+
+    def gravar_lote(self, lote):
+        with self.conn:
+            for numero, imovel, fotos in lote:
+                try:
+                    self.gravar(imovel, fotos)
+                except sqlite3.IntegrityError as e:
+                    # Ex.: id do arquivo já usado por outro imóvel. Só este comando é desfeito, o lote segue
+                    self.relatorio.erro(numero, f"conflito no banco ({e})")
+
+def importar(conn, arquivo, formato, lote=LOTE, substituir_fotos=False, saida=sys.stdout):
+    """Importa de um arquivo texto já aberto. Retorna o Relatorio."""
+    fila_fotos.garantir_tabela(conn)
+    relatorio = Relatorio(saida)
+    gravador = Gravador(conn, relatorio, substituir_fotos)
+    for itens in em_lotes(validar(ler_linhas(arquivo, formato), relatorio), lote):
+        gravador.gravar_lote(itens)
+        relatorio.progresso()
+    return relatorio
+
+# ===========================================
+# 📤 Exportação (cursor lido aos poucos)
+# ===========================================
+SQL_EXPORTAR = """
+    SELECT id, codigo_externo AS codigo, titulo, descricao, descricao_html, preco, dormitorios, banheiros,
+           vagas, area, destaque, bairro, cidade, latitude, longitude, updated_at,
+           (SELECT json_group_array(url) FROM
+               (SELECT url FROM imovel_fotos WHERE imovel_id = imoveis.id ORDER BY ordem)) AS fotos
+    FROM imoveis ORDER BY id
+"""
+
+def linhas_exportacao(conn):
+    """Gera um dict por imóvel (fotos como lista), sem fetchall."""
+    cursor = conn.execute(SQL_EXPORTAR)
+    while linhas := cursor.fetchmany(500):
+        for linha in linhas:
+            registro = dict(linha)
+            registro["fotos"] = json.loads(registro["fotos"])
+            yield registro
+
+def exportar(conn, arquivo, formato, saida=sys.stdout):
+    """Escreve todos os imóveis em `arquivo` (texto já aberto). Retorna quantos."""
+    inicio = time.perf_counter()
+    total = 0
+    if formato == "csv":
+        escritor = csv.DictWriter(arquivo, fieldnames=CAMPOS)
+        escritor.writeheader()
+        for registro in linhas_exportacao(conn):
+            escritor.writerow({**registro, "fotos": "|".join(registro["fotos"])})
+            total += 1
+    else:
+        for registro in linhas_exportacao(conn):
+            arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            total += 1
+    segundos = time.perf_counter() - inicio
+    print(f"📤 {total} imóveis em {segundos:.1f}s ({total / max(segundos, 1e-9):,.0f} linhas/s)", file=saida)
+    return total
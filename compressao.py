@@ -0,0 +1,74 @@
+# ===========================================
+# 🗜️ COMPRESSÃO DAS RESPOSTAS (gzip / Brotli)
+# ===========================================
+# HTML e JSON saem comprimidos quando o navegador aceita (Accept-Encoding):
+# Brotli se o pacote brotli estiver instalado, senão gzip. Os arquivos de
+# /ativos já vêm pré-comprimidos do build (ativos.py) e passam direto.
+# COMPRESSAO=off desliga (ex.: atrás de um proxy/CDN que já comprime).
+# ===========================================
+
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele, só gzip
+    brotli = None
+
+ATIVO = os.getenv("COMPRESSAO", "on").lower() != "off"
+
+TIPOS = {"text/html", "application/json", "text/css", "text/javascript", "application/javascript",
+         "text/plain", "text/csv", "application/xml", "image/svg+xml", "application/manifest+json"}
+MINIMO_BYTES = 500  # menos que isso não compensa o cabeçalho e a CPU
+
+# Níveis para compressão a cada requisição: rápidos, quase o mesmo tamanho
+# dos máximos (o build de ativos.py usa os máximos, uma vez só)
+NIVEL_GZIP = 6
+QUALIDADE_BROTLI = 5
+
+def escolher(aceitas):
+    """Content-Encoding a usar para o Accept-Encoding do navegador (ou None)."""
+    if brotli and aceitas["br"]:
+        return "br"
+    if aceitas["gzip"]:
+        return "gzip"
+    return None
+
+def comprimir(dados, codificacao):
+    if codificacao == "br":
+        return brotli.compress(dados, quality=QUALIDADE_BROTLI)
+    return gzip.compress(dados, NIVEL_GZIP, mtime=0)
+
+def instalar(app):
+    """Registra o hook que comprime as respostas (não faz nada se COMPRESSAO=off)."""
+    if not ATIVO:
+        return
+    from flask import request
+
+    @app.after_request
+    def _comprimir(resposta):
+        codificacao = escolher(request.accept_encodings)
+        etag, fraco = resposta.get_etag()
+
+        ja_comprimida = "Content-Encoding" in resposta.headers
+        if resposta.status_code == 304 or ja_comprimida:
+            # 304 ou comprimida pela própria rota: mesmo validador fraco da resposta comprimida
+            if (codificacao or ja_comprimida) and etag and not fraco:
+                resposta.set_etag(etag, weak=True)
+            return resposta
+
+        if (resposta.direct_passthrough or resposta.is_streamed or resposta.status_code < 200
+                or resposta.status_code in (204, 206) or resposta.mimetype not in TIPOS):
+            return resposta
+
+        resposta.vary.add("Accept-Encoding")
+        dados = resposta.get_data()
+        if not codificacao or len(dados) < MINIMO_BYTES:
+            return resposta
+
+        resposta.set_data(comprimir(dados, codificacao))
+        resposta.headers["Content-Encoding"] = codificacao
+        # Bytes diferentes da versão sem compressão: o ETag passa a ser fraco
+        if etag and not fraco:
+            resposta.set_etag(etag, weak=True)
+        return resposta
@@ -0,0 +1,491 @@
+# ===========================================
+# 🧊 EXPORTAÇÃO ESTÁTICA DO SITE (freeze)
+# ===========================================
+# Renderiza a listagem e todos os detalhes em arquivos HTML prontos para
+# qualquer hospedagem estática/CDN (Cloudflare Pages, Netlify, S3...):
+#   /index.html                         → "/"
+#   /lista/<filtros>/index.html         → "/?ordenar=...&dormitorios=..."
+#   /lista/<filtros>/p2/index.html      → próximas páginas ("Carregar mais"),
+#                                         até CONGELAR_MAX_PAGINAS por combinação
+#   /imovel/<id>/index.html             → "/imovel/<id>"
+#   /ativos/...<hash>.css|png|jpg...    → arquivos de /static com hash no nome
+#                                         (cache "immutable" via _headers)
+# Busca por texto, login e admin continuam no site dinâmico: com --origem
+# (ou CONGELAR_ORIGEM) esses links apontam para ele.
+#
+# Incremental: com a versão do catálogo nova, cada página da listagem ganha
+# uma impressão digital barata, só SQL (cards, contagens dos filtros e
+# cursor da próxima) e só as que mudaram são renderizadas; só os detalhes
+# com updated_at diferente do exportado (do imóvel, da lista de semelhantes ou de
+# um dos semelhantes) são renderizados de novo; imóveis apagados somem.
+# Mudou template/CSS → exporta tudo.
+#
+# Uso:
+#   python congelar.py [--destino site_estatico] [--origem https://...] [--tudo]
+# Automático depois de /add, /edit, /delete e do gerenciador:
+#   CONGELAR_DESTINO=site_estatico (e, opcional, CONGELAR_PUBLICAR="comando de deploy")
+# ===========================================
+
+import argparse
+import datetime
+import hashlib
+import html
+import itertools
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+import ativos
+import banco
+import consultas
+import metricas
+
+DESTINO = os.getenv("CONGELAR_DESTINO", "site_estatico")
+ORIGEM = os.getenv("CONGELAR_ORIGEM", "")
+ESTADO = ".congelar.json"
+TRAVA = ".congelar.lock"
+PENDENTE = ".congelar.pendente"
+# Páginas por combinação de filtros; o "Carregar mais" da última vai para o site dinâmico
+MAX_PAGINAS = int(os.getenv("CONGELAR_MAX_PAGINAS", "10"))
+
+# Combinações do formulário de filtros que viram páginas estáticas (sem busca)
+FILTROS = {
+    "ordenar": ["", "preco_asc", "preco_desc", "area"],
+    "destaque": ["", "1"],
+    "dormitorios": ["", "1", "2", "3"],
+    "banheiros": ["", "1", "2", "3"],
+}
+
+_ATRIBUTO_URL = re.compile(r'\b(href|src|action|srcset|data-full)="([^"]*)"')
+_PROXIMA = re.compile(r'<a href="([^"]*)" id="carregarMais"')
+
+# ===========================================
+# 🗂️ Caminhos
+# ===========================================
+def combinacoes():
+    chaves = sorted(FILTROS)
+    for valores in itertools.product(*(FILTROS[c] for c in chaves)):
+        yield {c: v for c, v in zip(chaves, valores) if v}
+
+def url_listagem(filtros, cursor=None):
+    """A mesma URL que o app gera: filtros em ordem e o cursor no fim (url_for do "Carregar mais")."""
+    itens = sorted(filtros.items()) + ([("cursor", cursor)] if cursor else [])
+    return "/?" + urlencode(itens) if itens else "/"
+
+def pasta_listagem(filtros):
+    if not filtros:
+        return "lista/todos"
+    return "lista/" + "_".join(f"{c}-{v}" for c, v in sorted(filtros.items()))
+
+def _gravar(caminho, conteudo):
+    """Grava num temporário e renomeia: o servidor nunca entrega meio arquivo."""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(conteudo if isinstance(conteudo, bytes) else conteudo.encode("utf-8"))
+    os.replace(temporario, caminho)
+
+# ===========================================
+# 🎨 Arquivos estáticos com hash no nome
+# ===========================================
+class Ativos:
+    def __init__(self, pasta_static, destino):
+        self.pasta_static = pasta_static
+        self.destino = destino
+        self.registro = ativos.Registro(pasta_static)
+        self._cache = {}
+
+    def url(self, caminho_static):
+        """
+        '/static/css/custom.css' ou '/ativos/css/custom.1a2b3c4d5e.css' (do app)
+        → '/ativos/css/custom.1a2b3c4d5e.css' (copia na primeira vez). Mesmos nomes do app (ativos.py).
+        """
+        if caminho_static in self._cache:
+            return self._cache[caminho_static]
+        caminho = urlsplit(caminho_static).path
+        if caminho.startswith("/ativos/"):
+            relativo = self.registro.resolver(caminho[len("/ativos/"):])[0]
+        else:
+            relativo = caminho[len("/static/"):]
+        origem = os.path.join(self.pasta_static, relativo or "")
+        if not relativo or not os.path.isfile(origem):
+            self._cache[caminho_static] = caminho_static
+            return caminho_static
+        with open(origem, "rb") as f:
+            conteudo = f.read()
+        com_hash = ativos.nome_com_hash(relativo, conteudo)
+        alvo = os.path.join(self.destino, "ativos", com_hash)
+        if not os.path.exists(alvo):
+            _gravar(alvo, conteudo)
+        self._cache[caminho_static] = f"/ativos/{com_hash}"
+        return self._cache[caminho_static]
+
+    def copiar_todos(self):
+        """Todos os ativos do manifesto (o service worker baixa alguns sem que as páginas os citem)."""
+        for relativo in self.registro.com_hash:
+            self.url(f"/static/{relativo}")
+
+def assinatura_static(pasta_static, pasta_templates):
+    """Muda quando templates, CSS, JS ou imagens do site mudam (fotos enviadas não contam)."""
+    h = hashlib.sha1()
+    for pasta in (pasta_templates, pasta_static):
+        for raiz, dirs, arquivos in sorted(os.walk(pasta)):
+            dirs[:] = sorted(d for d in dirs if d != "uploads")
+            for nome in sorted(arquivos):
+                caminho = os.path.join(raiz, nome)
+                h.update(caminho.encode())
+                with open(caminho, "rb") as f:
+                    h.update(f.read())
+    return h.hexdigest()[:12]
+
+# ===========================================
+# 🔗 Reescrita dos links
+# ===========================================
+def reescrever(texto, paginas, ativos_site, origem):
+    """
+    Troca URLs do site dinâmico pelos caminhos estáticos:
+    páginas exportadas → /lista/.../, /imovel/<id>/; /static → /ativos com hash;
+    o resto (busca, login, admin) → site dinâmico (origem), se informado.
+    """
+    def trocar(url):
+        if url.startswith(("/static/", "/ativos/")):
+            return ativos_site.url(url)
+        if url in paginas:
+            return paginas[url]
+        caminho = urlsplit(url).path
+        if re.fullmatch(r"/imovel/\d+", caminho):
+            return caminho + "/"
+        if url.startswith("/") and origem:
+            return origem.rstrip("/") + url
+        return url
+
+    def substituir(m):
+        atributo, valor = m.group(1), html.unescape(m.group(2))
+        if atributo == "srcset":
+            partes = []
+            for item in valor.split(","):
+                url, _, largura = item.strip().partition(" ")
+                partes.append(f"{trocar(url)} {largura}".strip())
+            novo = ", ".join(partes)
+        else:
+            novo = trocar(valor)
+        return f'{atributo}="{html.escape(novo, quote=True)}"'
+
+    texto = _ATRIBUTO_URL.sub(substituir, texto)
+    # Sem API no site estático: "Carregar mais" vira um link comum para a próxima página
+    return re.sub(r'\s*data-api="[^"]*"', "", texto)
+
+def script_filtros(paginas_filtros, origem):
+    """O formulário de filtros abre a página estática da combinação; busca por texto vai para o site dinâmico."""
+    return """
+<script>
+(function() {
+    const paginas = %s;
+    const origem = %s;
+    const form = document.querySelector('form[method="GET"]');
+    if (!form) return;
+    form.addEventListener('submit', function(evento) {
+        const dados = new URLSearchParams();
+        new FormData(form).forEach((valor, chave) => { if (valor) dados.append(chave, valor); });
+        dados.sort();
+        const chave = dados.toString();
+        evento.preventDefault();
+        if (!dados.has('busca') && paginas[chave]) {
+            window.location.href = paginas[chave];
+        } else {
+            window.location.href = origem + '/?' + chave;
+        }
+    });
+})();
+</script>
+""" % (json.dumps(paginas_filtros), json.dumps(origem.rstrip("/")))
+
+# ===========================================
+# 🔏 Impressão digital das páginas da listagem
+# ===========================================
+def paginas_da_combinacao(conn, filtros, max_paginas, fts=True, geo=True):
+    """
+    [(url, url da próxima, impressão), ...] das primeiras max_paginas páginas da combinação, só com SQL:
+    uma consulta pelos cards (cortada nos mesmos cursores do app) e uma pelas contagens.
+    A impressão muda sempre que o HTML da página mudaria (fora templates/CSS, que exportam tudo).
+    """
+    filtros_app = consultas.ler_filtros(filtros)
+    linhas, proximo = consultas.buscar_pagina(conn, filtros_app, limite=max_paginas * consultas.POR_PAGINA,
+                                              fts=fts, geo=geo)
+    comum = json.dumps([consultas.facetas(conn, filtros_app, fts=fts, geo=geo), datetime.date.today().year],
+                       sort_keys=True, default=str)
+    paginas, cursor = [], None
+    for comeco in range(0, max(len(linhas), 1), consultas.POR_PAGINA):
+        pagina = linhas[comeco:comeco + consultas.POR_PAGINA]
+        if comeco + consultas.POR_PAGINA < len(linhas):
+            ultima = pagina[-1]
+            seguinte = consultas.codificar_cursor(ultima[f"_k{i}"] for i in range(sum(k.startswith("_k") for k in ultima.keys())))
+        else:
+            seguinte = proximo
+        h = hashlib.sha1(comum.encode())
+        h.update(json.dumps([tuple(linha) for linha in pagina], default=str).encode())
+        h.update((seguinte or "").encode())
+        paginas.append((url_listagem(filtros, cursor), seguinte and url_listagem(filtros, seguinte), h.hexdigest()[:16]))
+        cursor = seguinte
+    return paginas
+
+# ===========================================
+# 🧊 Exportação
+# ===========================================
+def congelar(destino=DESTINO, origem=ORIGEM, tudo=False, max_paginas=MAX_PAGINAS):
+    """Exporta o site (incremental). Retorna um resumo (dict)."""
+    import app as site  # só aqui: quem chama pode ser o próprio app
+
+    os.makedirs(destino, exist_ok=True)
+    cliente = site.app.test_client()
+    # Fora do cache de páginas/facetas e das métricas dos visitantes
+    cliente.environ_base[site.EXPORTACAO] = True
+    conn = banco.conectar(site.DATABASE)
+    inicio = time.perf_counter()
+
+    caminho_estado = os.path.join(destino, ESTADO)
+    try:
+        with open(caminho_estado, encoding="utf-8") as f:
+            estado = json.load(f)
+    except (OSError, ValueError):
+        estado = {}
+
+    pasta_static = os.path.join(site.app.root_path, site.app.static_folder)
+    assinatura = assinatura_static(pasta_static, os.path.join(site.app.root_path, site.app.template_folder))
+    if estado.get("assinatura") != assinatura:
+        tudo = True
+
+    versao = banco.versao_catalogo(conn)
+    imoveis = consultas.detalhes_atualizados_em(conn)
+    # {id: updated_at} da última exportação (um "maior updated_at" só não basta: o
+    # relógio tem resolução de segundo e uma edição no mesmo segundo passaria batido)
+    exportados = estado.get("atualizados", {})
+    ativos_site = Ativos(pasta_static, destino)
+    resumo = {"listagens": 0, "detalhes": 0, "removidos": 0}
+
+    def baixar(url):
+        with metricas.ignorando():
+            resposta = cliente.get(url)
+        if resposta.status_code != 200:
+            raise RuntimeError(f"{url} respondeu {resposta.status_code}")
+        return resposta.get_data(as_text=True)
+
+    # 1️⃣ Listagens: todas as combinações + páginas seguintes (só as que mudaram)
+    paginas = {"/": "/"}
+    paginas_filtros = {}
+    impressoes = {}
+    anteriores = {} if tudo or estado.get("max_paginas") != max_paginas else estado.get("impressoes", {})
+    if tudo or estado.get("versao") != versao:
+        mudaram = []
+        for filtros in combinacoes():
+            pasta = pasta_listagem(filtros)
+            paginas_filtros[urlencode(sorted(filtros.items()))] = f"/{pasta}/"
+            for numero, (url, seguinte, impressao) in enumerate(
+                    paginas_da_combinacao(conn, filtros, max_paginas, site.FTS_DISPONIVEL, site.GEO_DISPONIVEL), 1):
+                paginas[url] = "/" if not filtros and numero == 1 else f"/{pasta}/" + (f"p{numero}/" if numero > 1 else "")
+                impressoes[url] = impressao
+                if anteriores.get(url) != impressao:
+                    mudaram.append((url, seguinte))
+
+        for url, seguinte in mudaram:
+            texto = baixar(url)
+            proxima = _PROXIMA.search(texto)
+            if (html.unescape(proxima.group(1)) if proxima else None) != seguinte:
+                raise RuntimeError(f"{url}: \"Carregar mais\" diferente do esperado ({seguinte})")
+            texto = reescrever(texto, paginas, ativos_site, origem)
+            texto = texto.replace("</body>", script_filtros(paginas_filtros, origem) + "</body>", 1)
+            caminho = "index.html" if paginas[url] == "/" else paginas[url].strip("/") + "/index.html"
+            _gravar(os.path.join(destino, caminho), texto)
+        resumo["listagens"] = len(mudaram)
+
+        # Páginas que deixaram de existir (menos imóveis → menos páginas)
+        validas = {os.path.join(destino, p.strip("/")) for p in paginas.values() if p != "/"}
+        pasta_lista = os.path.join(destino, "lista")
+        for raiz, dirs, _ in os.walk(pasta_lista, topdown=False):
+            if raiz != pasta_lista and raiz not in validas and not any(v.startswith(raiz + os.sep) for v in validas):
+                shutil.rmtree(raiz, ignore_errors=True)
+
+    # 2️⃣ Detalhes: só os que mudaram desde a última exportação
+    atualizados = {}
+    for imovel in imoveis:
+        chave = str(imovel["id"])
+        atualizados[chave] = imovel["updated_at"] or ""
+        if not tudo and exportados.get(chave) == atualizados[chave]:
+            continue
+        texto = reescrever(baixar(f"/imovel/{imovel['id']}"), paginas, ativos_site, origem)
+        _gravar(os.path.join(destino, "imovel", str(imovel["id"]), "index.html"), texto)
+        resumo["detalhes"] += 1
+
+    for id_antigo in (set(exportados) | set(estado.get("ids", []))) - set(atualizados):
+        shutil.rmtree(os.path.join(destino, "imovel", id_antigo), ignore_errors=True)
+        resumo["removidos"] += 1
+
+    # 3️⃣ Página offline, /static original (service worker, manifest) e cabeçalhos
+    if tudo:
+        _gravar(os.path.join(destino, "offline.html"), reescrever(baixar("/offline.html"), paginas, ativos_site, origem))
+        shutil.copytree(pasta_static, os.path.join(destino, "static"), dirs_exist_ok=True)
+        ativos_site.copiar_todos()
+        _gravar(os.path.join(destino, "service-worker.js"), baixar("/service-worker.js"))
+        _gravar(os.path.join(destino, "_headers"),
+                "/ativos/*\n  Cache-Control: public, max-age=31536000, immutable\n"
+                "/*\n  Cache-Control: public, max-age=0, must-revalidate\n")
+
+    estado = {
+        "assinatura": assinatura,
+        "versao": versao,
+        "max_paginas": max_paginas,
+        "impressoes": impressoes or estado.get("impressoes", {}),
+        "atualizados": atualizados,
+        "exportado_em": banco.agora(),
+    }
+    _gravar(caminho_estado, json.dumps(estado, indent=1))
+    conn.close()
+
+    resumo["segundos"] = round(time.perf_counter() - inicio, 2)
+    return resumo
+
+# ===========================================
+# ⏱️ Exportação automática (depois das escritas)
+# ===========================================
+def _processo_vivo(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+def _dono_da_trava(caminho):
+    """PID gravado na trava (None se ela não existe ou não dá para ler)."""
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+def _pegar_trava(destino):
+    """Trava entre processos com o PID do dono; só é tomada de quem já morreu (exportar leva o tempo que for)."""
+    caminho = os.path.join(destino, TRAVA)
+    dono = _dono_da_trava(caminho)
+    if dono is not None and not _processo_vivo(dono):
+        # Trava esquecida por um processo que morreu no meio
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+    elif dono is None and os.path.exists(caminho):
+        # Sem PID (criada agora ou por uma versão antiga): só vale por 10 minutos
+        try:
+            if time.time() - os.path.getmtime(caminho) > 600:
+                os.remove(caminho)
+        except OSError:
+            pass
+    try:
+        fd = os.open(caminho, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(str(os.getpid()))
+    return True
+
+def _soltar_trava(destino):
+    """Apaga a trava só se ela ainda for deste processo."""
+    caminho = os.path.join(destino, TRAVA)
+    if _dono_da_trava(caminho) == os.getpid():
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+
+def _exportar_entre_processos(destino):
+    """
+    Exporta com a trava entre processos. Se outro processo está exportando, deixa
+    o pedido no arquivo pendente para ele; quem tem a trava roda até não sobrar pedido.
+    """
+    pendente = os.path.join(destino, PENDENTE)
+    while True:
+        if not _pegar_trava(destino):
+            open(pendente, "w").close()
+            # O dono pode ter soltado a trava antes de ver o pendente: tenta de novo
+            if os.path.exists(os.path.join(destino, TRAVA)):
+                return
+            continue
+        try:
+            while True:
+                if os.path.exists(pendente):
+                    os.remove(pendente)
+                resumo = congelar(destino)
+                print(f"🧊 Site estático atualizado: {resumo}")
+                comando = os.getenv("CONGELAR_PUBLICAR")
+                if comando:
+                    subprocess.run(comando, shell=True, check=False)
+                if not os.path.exists(pendente):
+                    break
+        except Exception as e:
+            print("⚠️ Erro ao exportar o site estático:", e)
+        finally:
+            _soltar_trava(destino)
+        # Pedido deixado entre a última olhada e a trava ser solta
+        if not os.path.exists(pendente):
+            return
+
+_trabalhador = {"thread": None, "pid": None, "pendente": False}
+_trava = threading.Lock()
+
+def _rodar(destino):
+    """Uma thread por processo: escritas durante a exportação viram uma rodada só."""
+    while True:
+        with _trava:
+            if not _trabalhador["pendente"]:
+                _trabalhador["thread"] = None
+                return
+            _trabalhador["pendente"] = False
+        _exportar_entre_processos(destino)
+
+def agendar():
+    """Reexporta em segundo plano se CONGELAR_DESTINO estiver definido (senão não faz nada)."""
+    destino = os.getenv("CONGELAR_DESTINO")
+    if not destino:
+        return
+    os.makedirs(destino, exist_ok=True)
+    with _trava:
+        _trabalhador["pendente"] = True
+        thread = _trabalhador["thread"]
+        if thread and thread.is_alive() and _trabalhador["pid"] == os.getpid():
+            return
+        # Não é daemon: o gerenciador espera a exportação antes de sair
+        thread = threading.Thread(target=_rodar, args=(destino,), name="congelar")
+        _trabalhador.update(thread=thread, pid=os.getpid())
+        thread.start()
+
+# ===========================================
+# ▶️ EXECUÇÃO
+# ===========================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta o site para arquivos estáticos.")
+    parser.add_argument("--destino", default=DESTINO, help=f"pasta de saída (padrão: {DESTINO})")
+    parser.add_argument("--origem", default=ORIGEM, help="URL do site dinâmico (busca, login, admin)")
+    parser.add_argument("--tudo", action="store_true", help="ignora o incremental e exporta tudo")
+    parser.add_argument("--max-paginas", type=int, default=MAX_PAGINAS,
+                        help=f"páginas por combinação de filtros (padrão: {MAX_PAGINAS})")
+    args = parser.parse_args()
+
+    print("\n🧊 Exportando site estático...\n")
+    os.makedirs(args.destino, exist_ok=True)
+    if not _pegar_trava(args.destino):
+        print("⏳ Outra exportação em andamento, esperando ela terminar...")
+        while not _pegar_trava(args.destino):
+            time.sleep(2)
+    try:
+        resumo = congelar(args.destino, args.origem, args.tudo, max(1, args.max_paginas))
+    finally:
+        _soltar_trava(args.destino)
+    print(f"📄 Listagens: {resumo['listagens']} | 🏠 Detalhes: {resumo['detalhes']} | "
+          f"🗑️ Removidos: {resumo['removidos']} | ⏱️ {resumo['segundos']}s\n")
@@ -0,0 +1,508 @@
+# ===========================================
+# 🔎 CONSULTAS DA LISTAGEM DE IMÓVEIS
+# ===========================================
+# Monta o SQL da página inicial a partir dos filtros da URL.
+# Lê da projeção imoveis_cards (banco.garantir_cards), que tem só as colunas
+# do card; cada filtro/ordenação tem um índice correspondente nela.
+# A paginação é por cursor (keyset): a próxima página começa depois da
+# chave de ordenação do último imóvel, sem OFFSET.
+# Filtros de mapa (bbox/raio) passam pela R*Tree imoveis_geo.
+# ===========================================
+
+import base64
+import json
+import math
+
+import banco
+
+POR_PAGINA = 24
+MAX_POR_PAGINA = 100
+
+# Colunas de ordenação: (coluna, direção). O id desempata e acompanha os índices.
+ORDENACOES = {
+    "preco_asc": [("preco_centavos", "ASC"), ("imoveis_cards.id", "ASC")],
+    "preco_desc": [("preco_centavos", "DESC"), ("imoveis_cards.id", "DESC")],
+    "area": [("area_m2", "DESC"), ("imoveis_cards.id", "DESC")],
+}
+ORDENACAO_PADRAO = [("imoveis_cards.id", "DESC")]
+# Relevância (bm25): título pesa mais que a descrição
+ORDENACAO_RELEVANCIA = [("bm25(imoveis_fts, 10.0, 3.0, 1.0)", "ASC"), ("imoveis_cards.id", "ASC")]
+
+# Tudo o que o card da listagem precisa, capa (primeira foto) incluída
+COLUNAS_CARD = "imoveis_cards.*"
+
+# 💰 Faixas: (valor na URL, rótulo, mínimo, máximo). Mínimo incluso, máximo não;
+# mínimo None = "> 0" (preço/área desconhecidos ficam de fora).
+FAIXAS_PRECO = [
+    ("ate-200mil", "Até R$ 200 mil", None, 200_000_00),
+    ("200-400mil", "R$ 200 a 400 mil", 200_000_00, 400_000_00),
+    ("400-700mil", "R$ 400 a 700 mil", 400_000_00, 700_000_00),
+    ("700mil-1mi", "R$ 700 mil a 1 mi", 700_000_00, 1_000_000_00),
+    ("acima-1mi", "Acima de R$ 1 mi", 1_000_000_00, None),
+]
+FAIXAS_AREA = [
+    ("ate-100", "Até 100 m²", None, 100),
+    ("100-200", "100 a 200 m²", 100, 200),
+    ("200-400", "200 a 400 m²", 200, 400),
+    ("acima-400", "Acima de 400 m²", 400, None),
+]
+FILTROS_FAIXA = {
+    "faixa_preco": ("preco_centavos", {valor: (minimo, maximo) for valor, _, minimo, maximo in FAIXAS_PRECO}),
+    "faixa_area": ("area_m2", {valor: (minimo, maximo) for valor, _, minimo, maximo in FAIXAS_AREA}),
+}
+
+def ler_filtros(args):
+    """Lê os filtros de request.args (ou de qualquer dict)."""
+    return {
+        "busca": args.get("busca", "").strip(),
+        "ordenar": args.get("ordenar", "").strip(),
+        "destaque": args.get("destaque", "").strip(),
+        "dormitorios": args.get("dormitorios", "").strip(),
+        "banheiros": args.get("banheiros", "").strip(),
+        "vagas": args.get("vagas", "").strip(),
+        "faixa_preco": args.get("faixa_preco", "").strip(),
+        "faixa_area": args.get("faixa_area", "").strip(),
+        "bbox": args.get("bbox", "").strip(),
+        "lat": args.get("lat", "").strip(),
+        "lon": args.get("lon", "").strip(),
+        "raio": args.get("raio", "").strip(),
+    }
+
+def tem_filtro_indexado(filtros):
+    condicoes = condicoes_filtros(filtros)
+    return any(nome in condicoes for nome in ("destaque", "dormitorios", "banheiros", "faixa_preco", "faixa_area"))
+
+def condicoes_filtros(filtros):
+    """
+    Filtros de atributo ativos → {nome: (sql, params)}, na ordem de ler_filtros.
+    Valores inválidos são ignorados (como se o filtro não viesse).
+    """
+    condicoes = {}
+    if filtros.get("destaque") == "1":
+        condicoes["destaque"] = ("destaque = 1", [])
+
+    # 🛏️ / 🛁 / 🚗 Filtros "N+"
+    for campo in ("dormitorios", "banheiros", "vagas"):
+        if filtros.get(campo, "").isdigit():
+            condicoes[campo] = (f"{campo} >= ?", [int(filtros[campo])])
+
+    for campo, (coluna, faixas) in FILTROS_FAIXA.items():
+        faixa = faixas.get(filtros.get(campo, ""))
+        if faixa is None:
+            continue
+        minimo, maximo = faixa
+        if minimo is None:
+            partes, params = [f"{coluna} > 0"], []
+        else:
+            partes, params = [f"{coluna} >= ?"], [minimo]
+        if maximo is not None:
+            partes.append(f"{coluna} < ?")
+            params.append(maximo)
+        condicoes[campo] = (" AND ".join(partes), params)
+    return condicoes
+
+# ===========================================
+# 🗺️ Mapa e "perto de mim"
+# ===========================================
+# bbox=oeste,sul,leste,norte (a ordem do toBBoxString() do Leaflet) limita ao
+# retângulo visível do mapa; lat/lon (+ raio em km) limita a um círculo e
+# ordena por distância. A R*Tree recebe sempre um retângulo (o do mapa, o
+# que contém o círculo, ou a interseção dos dois); o círculo é conferido depois.
+# Distância plana (equirretangular): em poucos km o erro é desprezível e o
+# SQL fica só com aritmética, sem depender das funções matemáticas do SQLite.
+KM_POR_GRAU = 111.32
+RAIO_PADRAO_KM = 5
+RAIO_MAXIMO_KM = 50
+
+def area_geografica(filtros):
+    """
+    Filtros de mapa → {"retangulo": (sul, oeste, norte, leste), "centro": (lat, lon) ou None,
+    "raio": km ou None}, ou None se não houver (valores inválidos são ignorados).
+    Centro sem bbox usa RAIO_PADRAO_KM; com bbox, o raio só vale se vier na URL.
+    """
+    retangulo = None
+    partes = filtros.get("bbox", "").split(",")
+    if len(partes) == 4:
+        oeste, leste = banco.coordenada(partes[0], 180), banco.coordenada(partes[2], 180)
+        sul, norte = banco.coordenada(partes[1], 90), banco.coordenada(partes[3], 90)
+        if None not in (oeste, sul, leste, norte) and sul <= norte and oeste <= leste:
+            retangulo = (sul, oeste, norte, leste)
+
+    lat, lon = banco.coordenadas(filtros.get("lat"), filtros.get("lon"))
+    centro = (lat, lon) if lat is not None else None
+    raio = None
+    if centro:
+        raio = banco.coordenada(filtros.get("raio"), RAIO_MAXIMO_KM)
+        if raio is None or raio <= 0:
+            raio = None if retangulo else RAIO_PADRAO_KM
+    if raio:
+        graus_lat = raio / KM_POR_GRAU
+        graus_lon = raio / (KM_POR_GRAU * max(math.cos(math.radians(lat)), 0.01))
+        circulo = (lat - graus_lat, lon - graus_lon, lat + graus_lat, lon + graus_lon)
+        retangulo = circulo if retangulo is None else (
+            max(retangulo[0], circulo[0]), max(retangulo[1], circulo[1]),
+            min(retangulo[2], circulo[2]), min(retangulo[3], circulo[3]),
+        )
+
+    if retangulo is None:
+        return None
+    return {"retangulo": retangulo, "centro": centro, "raio": raio}
+
+def distancia_sql(centro):
+    """
+    Quadrado da distância ao centro, em graus de latitude (a raiz vezes
+    KM_POR_GRAU dá km). Os números vão literais no SQL: a expressão se
+    repete no SELECT, no ORDER BY e no cursor, e são floats já validados.
+    """
+    lat, lon = centro
+    escala_lon = math.cos(math.radians(lat)) ** 2
+    return (f"((imoveis_cards.latitude - ({lat!r})) * (imoveis_cards.latitude - ({lat!r}))"
+            f" + (imoveis_cards.longitude - ({lon!r})) * (imoveis_cards.longitude - ({lon!r})) * {escala_lon!r})")
+
+def distancia_km(imovel):
+    """Distância do card ao centro da busca (coluna distancia2), ou None sem centro."""
+    if "distancia2" not in imovel.keys() or imovel["distancia2"] is None:
+        return None
+    return math.sqrt(imovel["distancia2"]) * KM_POR_GRAU
+
+# Quando vale passar pela R*Tree (conta-se os pontos do retângulo, parando no limite):
+# - página na ordem de um índice (mais novos, preço, área): só com menos de
+#   LIMITE_RTREE pontos; com mais (mapa afastado), seguir o índice conferindo
+#   as coordenadas do card acha a página antes de a R*Tree ler todos e ordenar;
+# - consulta que visita a área inteira (facetas, distância, busca textual,
+#   filtros "N+"): enquanto a área tiver menos de 1/3 do catálogo.
+LIMITE_RTREE = 2000
+
+def retangulo_seletivo(conn, filtros, limite=LIMITE_RTREE):
+    """True se a área do mapa tem menos de `limite` imóveis."""
+    area = area_geografica(filtros)
+    if area is None:
+        return False
+    sul, oeste, norte, leste = area["retangulo"]
+    n = conn.execute("""
+        SELECT COUNT(*) FROM (SELECT 1 FROM imoveis_geo
+                              WHERE min_lat <= ? AND max_lat >= ? AND min_lon <= ? AND max_lon >= ? LIMIT ?)
+    """, (norte, sul, leste, oeste, limite)).fetchone()[0]
+    return n < limite
+
+def usar_rtree(conn, filtros, geo=True, area_inteira=False):
+    """
+    geo: a R*Tree existe. area_inteira: a consulta precisa de todos os imóveis
+    da área, não só dos primeiros de um índice (ver acima).
+    """
+    if not geo or area_geografica(filtros) is None:
+        return False
+    if not area_inteira:
+        return retangulo_seletivo(conn, filtros)
+    catalogo = conn.execute("SELECT MAX(id) FROM imoveis_cards").fetchone()[0] or 0
+    return retangulo_seletivo(conn, filtros, max(LIMITE_RTREE, catalogo // 3))
+
+def _visita_area_inteira(filtros):
+    """A listagem ordena todos os resultados (não segue um índice até encher a página)?"""
+    if filtros.get("busca") or tem_filtro_indexado(filtros):
+        return True
+    area = area_geografica(filtros)
+    return bool(area and area["centro"]) and filtros.get("ordenar") not in ORDENACOES
+
+def _geo_sql(area, geo, usar_fts):
+    """Parte geográfica da consulta → (join_sql, where_clauses, params)."""
+    if area is None:
+        return "", [], []
+    sul, oeste, norte, leste = area["retangulo"]
+    join_sql, where_clauses, params = "", [], []
+    # Pontos: min = max, então "o ponto está no retângulo" = "as caixas se cruzam"
+    no_retangulo = "imoveis_geo.min_lat <= ? AND imoveis_geo.max_lat >= ? AND imoveis_geo.min_lon <= ? AND imoveis_geo.max_lon >= ?"
+    if geo and usar_fts:
+        # Com FTS, o JOIN faria o SQLite rodar o MATCH uma vez por ponto: a lista de ids sai antes
+        where_clauses.append(f"imoveis_cards.id IN (SELECT id FROM imoveis_geo WHERE {no_retangulo})")
+        params += [norte, sul, leste, oeste]
+    elif geo:
+        join_sql = "JOIN imoveis_geo ON imoveis_geo.id = imoveis_cards.id"
+        where_clauses.append(no_retangulo)
+        params += [norte, sul, leste, oeste]
+    where_clauses.append("imoveis_cards.latitude BETWEEN ? AND ? AND imoveis_cards.longitude BETWEEN ? AND ?")
+    params += [sul, norte, oeste, leste]
+    if area["raio"]:
+        where_clauses.append(f"{distancia_sql(area['centro'])} <= ?")
+        params.append((area["raio"] / KM_POR_GRAU) ** 2)
+    return join_sql, where_clauses, params
+
+# ===========================================
+# 🧭 Cursor
+# ===========================================
+def codificar_cursor(valores):
+    texto = json.dumps(list(valores), separators=(",", ":"))
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip("=")
+
+def decodificar_cursor(cursor):
+    """Retorna a lista de valores do cursor, ou None se vazio/inválido."""
+    if not cursor:
+        return None
+    try:
+        texto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valores = json.loads(texto)
+    except ValueError:
+        return None
+    if not isinstance(valores, list) or not all(_valor_de_cursor(v) for v in valores):
+        return None
+    return valores
+
+def _valor_de_cursor(valor):
+    """Só números que o SQLite aceita: inteiro de 64 bits (sem bool) ou float finito."""
+    if isinstance(valor, bool):
+        return False
+    if isinstance(valor, int):
+        return -2 ** 63 <= valor < 2 ** 63
+    return isinstance(valor, float) and math.isfinite(valor)
+
+# ===========================================
+# 🧱 SQL
+# ===========================================
+def _busca_sql(filtros, fts):
+    """Parte textual da busca → (join_sql, where_clauses, params, usar_fts)."""
+    busca = filtros.get("busca", "")
+    consulta = banco.consulta_fts(busca) if busca else ""
+    usar_fts = bool(consulta) and fts
+    if usar_fts:
+        return ("JOIN imoveis_fts ON imoveis_fts.rowid = imoveis_cards.id",
+                ["imoveis_fts MATCH ?"], [consulta], True)
+    if busca:
+        # A descrição não está na projeção: o LIKE (sem FTS5) consulta imoveis
+        return ("", ["imoveis_cards.id IN (SELECT id FROM imoveis WHERE titulo LIKE ? OR descricao LIKE ?)"],
+                [f"%{busca}%", f"%{busca}%"], False)
+    return "", [], [], False
+
+def montar_consulta(filtros, fts=True, cursor=None, limite=None, colunas=COLUNAS_CARD, geo=True):
+    """
+    Retorna (sql, params) da listagem para os filtros informados.
+    As chaves de ordenação vêm nas últimas colunas (_k0, _k1...) para gerar o cursor.
+    Com centro (lat/lon), vem também distancia2 (ver distancia_km).
+    """
+    join_sql, where_clauses, params, usar_fts = _busca_sql(filtros, fts)
+    area = area_geografica(filtros)
+    join_geo, where_geo, params_geo = _geo_sql(area, geo, usar_fts)
+    join_sql = f"{join_sql} {join_geo}"
+    where_clauses += where_geo
+    params += params_geo
+
+    for sql_condicao, params_condicao in condicoes_filtros(filtros).values():
+        where_clauses.append(sql_condicao)
+        params.extend(params_condicao)
+
+    ordenar = filtros.get("ordenar", "")
+    centro = area["centro"] if area else None
+    if ordenar in ORDENACOES:
+        ordem = ORDENACOES[ordenar]
+    elif centro:
+        # 📍 Mais perto primeiro (ordenar=distancia ou sem ordenação escolhida)
+        ordem = [(distancia_sql(centro), "ASC"), ("imoveis_cards.id", "ASC")]
+    elif usar_fts:
+        ordem = ORDENACAO_RELEVANCIA
+    else:
+        ordem = ORDENACAO_PADRAO
+
+    # Com filtros de índice, o "+" impede o SQLite de varrer a tabela inteira
+    # só para aproveitar a ordem; ele usa a busca por faixa (ou a R*Tree) e ordena o resultado.
+    prefixo = "+" if ((tem_filtro_indexado(filtros) or (area and geo)) and not usar_fts) else ""
+    chaves = [f"{prefixo}{col}" for col, _ in ordem]
+
+    # ⏩ Keyset: continua depois da chave (ordem, id) do último imóvel da página anterior
+    if cursor is not None and len(cursor) == len(ordem):
+        operador = ">" if ordem[0][1] == "ASC" else "<"
+        marcadores = ", ".join("?" * len(ordem))
+        where_clauses.append(f"({', '.join(chaves)}) {operador} ({marcadores})")
+        params.extend(cursor)
+
+    where_sql = ("WHERE " + " AND ".join(where_clauses)) if where_clauses else ""
+    order_sql = "ORDER BY " + ", ".join(f"{chave} {direcao}" for chave, (_, direcao) in zip(chaves, ordem))
+    chaves_sql = ", ".join(f"{col} AS _k{i}" for i, (col, _) in enumerate(ordem))
+    if centro:
+        chaves_sql += f", {distancia_sql(centro)} AS distancia2"
+
+    sql = f"SELECT {colunas}, {chaves_sql} FROM imoveis_cards {join_sql} {where_sql} {order_sql}"
+    if limite is not None:
+        sql += " LIMIT ?"
+        params.append(limite)
+    return sql, params
+
+def limite_pagina(valor):
+    """?limite= da API: ausente/inválido → POR_PAGINA; sempre entre 1 e MAX_POR_PAGINA (LIMIT -1 seria sem limite)."""
+    return max(1, min(banco.inteiro(valor, POR_PAGINA), MAX_POR_PAGINA))
+
+def buscar_pagina(conn, filtros, cursor=None, limite=POR_PAGINA, fts=True, colunas=COLUNAS_CARD, geo=True):
+    """
+    Busca uma página da listagem (lê só limite + 1 linhas).
+    Retorna (imoveis, proximo_cursor); proximo_cursor é None na última página.
+    """
+    valores = decodificar_cursor(cursor)
+    geo = usar_rtree(conn, filtros, geo, area_inteira=_visita_area_inteira(filtros))
+    sql, params = montar_consulta(filtros, fts=fts, cursor=valores, limite=limite + 1, colunas=colunas, geo=geo)
+    linhas = conn.execute(sql, params).fetchall()
+
+    proximo = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        ultima = linhas[-1]
+        n_chaves = sum(1 for k in ultima.keys() if k.startswith("_k"))
+        proximo = codificar_cursor(ultima[f"_k{i}"] for i in range(n_chaves))
+    return linhas, proximo
+
+# ===========================================
+# 📊 Facetas (contagens da barra de filtros)
+# ===========================================
+# Todas as opções numa única consulta agregada, um COUNT(*) FILTER por limiar.
+# Cada dimensão conta sem o próprio filtro (com "2+" marcado, "3+" ainda
+# mostra quantos há), mas com todos os outros e com a busca.
+# Faixas saem por diferença de limiares: [200, 400) = (>= 200) - (>= 400),
+# metade das comparações por linha de um "BETWEEN" por faixa.
+OPCOES_N_MAIS = [("1", "1+"), ("2", "2+"), ("3", "3+")]
+DIMENSOES_N_MAIS = ("dormitorios", "banheiros", "vagas")
+DIMENSOES_FACETAS = DIMENSOES_N_MAIS + ("faixa_preco", "faixa_area", "destaque")
+
+def chave_facetas(filtros):
+    """Só o que muda as contagens (a ordenação não muda)."""
+    return "&".join(f"{k}={filtros[k]}" for k in sorted(filtros) if filtros[k] and k != "ordenar")
+
+def facetas(conn, filtros, fts=True, geo=True):
+    """
+    Retorna {"total": n, dimensão: [{"valor", "rotulo", "total", "ativo"}, ...]}
+    para a busca/filtros atuais (dimensões: DIMENSOES_FACETAS).
+    A busca e a área do mapa valem para todas as contagens (ficam no WHERE).
+    """
+    join_sql, where_clauses, params_busca, usar_fts = _busca_sql(filtros, fts)
+    geo = usar_rtree(conn, filtros, geo, area_inteira=True)
+    join_geo, where_geo, params_geo = _geo_sql(area_geografica(filtros), geo, usar_fts)
+    join_sql = f"{join_sql} {join_geo}"
+    where_clauses += where_geo
+    params_busca += params_geo
+    ativas = condicoes_filtros(filtros)
+    contagens, params, indices = [], [], {}
+
+    def contar(dimensao, sql=None, valor=None):
+        """Registra COUNT(*) FILTER (condição + filtros das outras dimensões); retorna a posição."""
+        chave = (dimensao, sql, valor)
+        if chave not in indices:
+            condicoes = [c for nome, c in ativas.items() if nome != dimensao]
+            if sql:
+                condicoes.append((sql, [] if valor is None else [valor]))
+            if condicoes:
+                contagens.append("COUNT(*) FILTER (WHERE " + " AND ".join(f"({c})" for c, _ in condicoes) + ")")
+                for _, params_condicao in condicoes:
+                    params.extend(params_condicao)
+            else:
+                contagens.append("COUNT(*)")
+            indices[chave] = len(contagens) - 1
+        return indices[chave]
+
+    # Receita de cada opção: (dimensão, valor, rótulo, soma, subtrai)
+    receitas = [(None, None, None, contar(None), None)]
+    for dimensao in DIMENSOES_N_MAIS:
+        for valor, rotulo in OPCOES_N_MAIS:
+            receitas.append((dimensao, valor, rotulo, contar(dimensao, f"{dimensao} >= ?", int(valor)), None))
+    for dimensao, faixas in (("faixa_preco", FAIXAS_PRECO), ("faixa_area", FAIXAS_AREA)):
+        coluna = FILTROS_FAIXA[dimensao][0]
+        for valor, rotulo, minimo, maximo in faixas:
+            soma = contar(dimensao, f"{coluna} > 0") if minimo is None else contar(dimensao, f"{coluna} >= ?", minimo)
+            subtrai = None if maximo is None else contar(dimensao, f"{coluna} >= ?", maximo)
+            receitas.append((dimensao, valor, rotulo, soma, subtrai))
+    receitas.append(("destaque", "1", "Somente destaques", contar("destaque", "destaque = 1"), None))
+
+    where_sql = ("WHERE " + " AND ".join(where_clauses)) if where_clauses else ""
+    sql = f"SELECT {', '.join(contagens)} FROM imoveis_cards {join_sql} {where_sql}"
+    linha = conn.execute(sql, params + params_busca).fetchone()
+
+    resultado = {"total": 0, **{dimensao: [] for dimensao in DIMENSOES_FACETAS}}
+    for dimensao, valor, rotulo, soma, subtrai in receitas:
+        total = linha[soma] - (linha[subtrai] if subtrai is not None else 0)
+        if dimensao is None:
+            resultado["total"] = total
+            continue
+        resultado[dimensao].append({
+            "valor": valor,
+            "rotulo": rotulo,
+            "total": total,
+            "ativo": filtros.get(dimensao) == valor,
+        })
+    return resultado
+
+# ===========================================
+# 🧭 Imóveis semelhantes (página de detalhes)
+# ===========================================
+# As listas vêm prontas de semelhantes.py: o detalhe lê pela chave
+# (imovel_id, posicao) e junta o card de cada vizinho, sem calcular nada.
+SQL_SEMELHANTES = f"""
+    SELECT {COLUNAS_CARD} FROM imoveis_semelhantes
+    JOIN imoveis_cards ON imoveis_cards.id = imoveis_semelhantes.semelhante_id
+    WHERE imoveis_semelhantes.imovel_id = ?
+    ORDER BY imoveis_semelhantes.posicao
+"""
+
+# Última mudança da página de detalhes: o imóvel, a lista de semelhantes
+# ou o card de um deles (preço, capa...). Vira ETag/Last-Modified e guia
+# a exportação incremental (congelar.py).
+_DETALHE_ATUALIZADO_EM = """
+    max(coalesce(imoveis.updated_at, ''),
+        coalesce((SELECT lista_em FROM imoveis_vetores WHERE imoveis_vetores.id = imoveis.id), ''),
+        coalesce((SELECT max(vizinho.updated_at) FROM imoveis_semelhantes
+                  JOIN imoveis AS vizinho ON vizinho.id = imoveis_semelhantes.semelhante_id
+                  WHERE imoveis_semelhantes.imovel_id = imoveis.id), ''))
+"""
+
+def semelhantes(conn, imovel_id):
+    """Cards dos imóveis semelhantes, do mais parecido para o menos."""
+    return conn.execute(SQL_SEMELHANTES, (imovel_id,)).fetchall()
+
+def detalhe_atualizado_em(conn, imovel_id):
+    """Última mudança da página de detalhes ("" se nunca anotada), ou None se o imóvel não existe."""
+    linha = conn.execute(f"SELECT {_DETALHE_ATUALIZADO_EM} FROM imoveis WHERE id = ?", (imovel_id,)).fetchone()
+    return linha[0] if linha else None
+
+def detalhes_atualizados_em(conn):
+    """(id, updated_at) de todas as páginas de detalhes, com updated_at como em detalhe_atualizado_em."""
+    return conn.execute(f"SELECT id, {_DETALHE_ATUALIZADO_EM} AS updated_at FROM imoveis ORDER BY id").fetchall()
+
+# ===========================================
+# 🔄 Sincronização do catálogo (PWA offline)
+# ===========================================
+# O service worker guarda o catálogo no IndexedDB: baixa o snapshot uma vez
+# e depois só o que mudou desde a versão que já tem (imoveis_mudancas, ver
+# banco.garantir_versao_catalogo). Cada imóvel vai como lista, na ordem de
+# CAMPOS_SINCRONIZACAO, para o JSON não repetir os nomes em toda linha.
+CAMPOS_SINCRONIZACAO = ("id", "titulo", "preco", "preco_centavos", "dormitorios", "banheiros", "vagas",
+                        "area", "area_m2", "destaque", "bairro", "cidade", "latitude", "longitude", "capa")
+
+_SQL_SINCRONIZACAO = "SELECT " + ", ".join(f"imoveis_cards.{c}" for c in CAMPOS_SINCRONIZACAO) + " FROM imoveis_cards"
+
+def _em_uma_leitura(conn, ler):
+    """Roda ler() numa transação de leitura: versão e linhas do mesmo instante do banco."""
+    conn.execute("BEGIN")
+    try:
+        return ler()
+    finally:
+        conn.execute("COMMIT")
+
+def snapshot(conn):
+    """(versao, linhas) do catálogo inteiro, em ordem de id."""
+    def ler():
+        return banco.versao_catalogo(conn), conn.execute(f"{_SQL_SINCRONIZACAO} ORDER BY imoveis_cards.id").fetchall()
+    return _em_uma_leitura(conn, ler)
+
+def mudancas(conn, desde):
+    """
+    (versao, linhas novas/alteradas, ids removidos) depois da versão `desde`,
+    ou None se o histórico não cobre `desde` (o cliente recomeça pelo snapshot).
+    """
+    def ler():
+        versao = banco.versao_catalogo(conn)
+        if desde < banco.historico_desde(conn) or desde > versao:
+            return None
+        linhas = conn.execute(f"""
+            {_SQL_SINCRONIZACAO} JOIN imoveis_mudancas ON imoveis_mudancas.id = imoveis_cards.id
+            WHERE imoveis_mudancas.versao > ? AND imoveis_mudancas.removido = 0
+            ORDER BY imoveis_cards.id
+        """, (desde,)).fetchall()
+        removidos = [r[0] for r in conn.execute(
+            "SELECT id FROM imoveis_mudancas WHERE versao > ? AND removido = 1 ORDER BY id", (desde,)
+        )]
+        return versao, linhas, removidos
+    return _em_uma_leitura(conn, ler)
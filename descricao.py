@@ -0,0 +1,173 @@
+# ===========================================
+# 📝 DESCRIÇÃO RICA (descricao_html) - SANITIZAÇÃO E CACHE
+# ===========================================
+# O descricao_html é colado pelo admin (gerenciador) e pode trazer qualquer
+# marcação. Na gravação ele passa por aqui uma única vez:
+#   - descricao_render: HTML limpo (só tags de texto, links seguros)
+#   - descricao_texto:  texto puro (busca FTS)
+#   - descricao_resumo: até 160 caracteres (meta description)
+#   - descricao_hash:   hash do original + versão das regras; se não mudou, não refaz
+# A página de detalhes só imprime descricao_render, sem processar nada.
+#
+# Refazer tudo (ex.: depois de mudar as regras): python descricao.py --todos
+# ===========================================
+
+import hashlib
+import html
+import re
+import sys
+from html.parser import HTMLParser
+
+import banco
+
+# Suba quando mudar as regras abaixo: todos os hashes ficam diferentes
+VERSAO = "1"
+
+TAGS_PERMITIDAS = {
+    "b", "strong", "i", "em", "u", "s", "small", "mark", "br", "p", "div", "span",
+    "ul", "ol", "li", "h3", "h4", "h5", "h6", "blockquote", "hr", "a",
+}
+TAGS_VAZIAS = {"br", "hr"}
+# Conteúdo descartado por inteiro (não só a tag)
+TAGS_DESCARTADAS = {"script", "style", "iframe", "object", "embed", "template", "noscript", "svg", "math"}
+ESQUEMAS_LINK = ("http://", "https://", "mailto:", "tel:")
+TAMANHO_RESUMO = 160
+
+# ===========================================
+# 🧼 Sanitizador (só biblioteca padrão)
+# ===========================================
+class _Sanitizador(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.saida = []
+        self.abertas = []
+        self.descartando = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in TAGS_DESCARTADAS:
+            self.descartando += 1
+            return
+        if self.descartando or tag not in TAGS_PERMITIDAS:
+            return
+        if tag == "a":
+            href = (dict(attrs).get("href") or "").strip()
+            if not href.lower().startswith(ESQUEMAS_LINK):
+                self.abertas.append("a-ignorado")
+                return
+            self.saida.append(f'<a href="{html.escape(href, quote=True)}" target="_blank" rel="noopener nofollow">')
+        else:
+            self.saida.append(f"<{tag}>")
+        if tag not in TAGS_VAZIAS:
+            self.abertas.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in TAGS_VAZIAS and not self.descartando:
+            self.saida.append(f"<{tag}>")
+
+    def handle_endtag(self, tag):
+        if tag in TAGS_DESCARTADAS:
+            self.descartando = max(0, self.descartando - 1)
+            return
+        if self.descartando or tag in TAGS_VAZIAS:
+            return
+        alvo = "a-ignorado" if tag == "a" and "a-ignorado" in self.abertas[-1:] else tag
+        if alvo not in self.abertas:
+            return  # fechamento sem abertura: ignora
+        # Fecha também o que ficou aberto dentro (HTML colado costuma vir torto)
+        while self.abertas:
+            aberta = self.abertas.pop()
+            if aberta != "a-ignorado":
+                self.saida.append(f"</{aberta}>")
+            if aberta == alvo:
+                break
+
+    def handle_data(self, data):
+        if not self.descartando:
+            self.saida.append(html.escape(data, quote=False))
+
+    def resultado(self):
+        self.close()
+        fechamentos = [f"</{t}>" for t in reversed(self.abertas) if t != "a-ignorado"]
+        return "".join(self.saida + fechamentos)
+
+def sanitizar(descricao_html):
+    """HTML colado → HTML seguro e normalizado."""
+    if not descricao_html:
+        return ""
+    sanitizador = _Sanitizador()
+    sanitizador.feed(descricao_html.replace("\r\n", "\n"))
+    limpo = sanitizador.resultado()
+    # O template usa white-space: pre-line: espaços no fim da linha e
+    # sequências de linhas em branco só atrapalham
+    limpo = re.sub(r"[ \t]+\n", "\n", limpo)
+    limpo = re.sub(r"\n{3,}", "\n\n", limpo)
+    return limpo.strip()
+
+def resumo(texto, limite=TAMANHO_RESUMO):
+    """Corta no último espaço antes do limite."""
+    if len(texto) <= limite:
+        return texto
+    corte = texto[:limite].rsplit(" ", 1)[0]
+    return corte.rstrip(" ,.;:-") + "…"
+
+def hash_descricao(descricao_html):
+    return hashlib.sha256(f"{VERSAO}\0{descricao_html or ''}".encode()).hexdigest()
+
+def compilar(descricao_html):
+    """Campos derivados do descricao_html, prontos para o UPDATE/INSERT."""
+    texto = banco.html_para_texto(descricao_html)
+    return {
+        "descricao_render": sanitizar(descricao_html),
+        "descricao_texto": texto,
+        "descricao_resumo": resumo(texto),
+        "descricao_hash": hash_descricao(descricao_html),
+    }
+
+# ===========================================
+# 🔁 Reprocessamento em lote
+# ===========================================
+def recompilar(conn, todos=False):
+    """
+    Recompila as descrições cujo hash não bate (novas, antigas ou regras mudaram).
+    Com todos=True refaz todas. Retorna quantas mudaram.
+
+    Roda a cada subida do app: só confere os imóveis que mudaram desde a última
+    conferência (imoveis_mudancas); tudo só se VERSAO mudou ou o histórico não cobre.
+    """
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")  # ninguém escreve entre a conferência e a marca
+        estado = conn.execute("""SELECT historico_desde, descricoes_conferidas, descricoes_versao
+                                 FROM catalogo WHERE id = 1""").fetchone()
+        if todos or estado["descricoes_versao"] != VERSAO or estado["descricoes_conferidas"] < estado["historico_desde"]:
+            linhas = conn.execute("SELECT id, descricao_html, descricao_hash FROM imoveis").fetchall()
+        else:
+            linhas = conn.execute("""
+                SELECT imoveis.id, imoveis.descricao_html, imoveis.descricao_hash
+                FROM imoveis_mudancas JOIN imoveis ON imoveis.id = imoveis_mudancas.id
+                WHERE imoveis_mudancas.versao > ?
+            """, (estado["descricoes_conferidas"],)).fetchall()
+
+        agora = banco.agora()
+        atualizacoes = []
+        for linha in linhas:
+            if not todos and linha["descricao_hash"] == hash_descricao(linha["descricao_html"]):
+                continue
+            campos = compilar(linha["descricao_html"])
+            atualizacoes.append((campos["descricao_render"], campos["descricao_texto"],
+                                 campos["descricao_resumo"], campos["descricao_hash"], agora, linha["id"]))
+        # updated_at muda junto: o HTML da página muda, então o ETag também
+        conn.executemany("""
+            UPDATE imoveis
+            SET descricao_render=?, descricao_texto=?, descricao_resumo=?, descricao_hash=?, updated_at=?
+            WHERE id=?
+        """, atualizacoes)
+        conn.execute("UPDATE catalogo SET descricoes_conferidas = versao, descricoes_versao = ? WHERE id = 1",
+                     (VERSAO,))
+    return len(atualizacoes)
+
+if __name__ == "__main__":
+    conn = banco.conectar()
+    banco.garantir_schema(conn)
+    total = recompilar(conn, todos="--todos" in sys.argv)
+    conn.close()
+    print(f"📝 Descrições recompiladas: {total}")
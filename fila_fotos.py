@@ -0,0 +1,279 @@
+# ===========================================
+# 📸 FILA DE UPLOAD DE FOTOS (em segundo plano)
+# ===========================================
+# O /add e o /edit só gravam os arquivos em disco (uploads_pendentes/) e
+# registram um job por foto na tabela fotos_fila. Um trabalhador em segundo
+# plano envia para o Cloudinary (várias ao mesmo tempo) e, quando todas as
+# fotos do lote terminam, anexa as URLs ao imóvel na ordem original.
+# Se o Cloudinary falhar em todas as tentativas, a foto fica local
+# (static/uploads), como o site já fazia.
+# A importação em massa (carga_imoveis.py) enfileira URLs externas: o
+# Cloudinary baixa direto da URL e, se falhar, a foto fica apontando para ela.
+#
+# Drenar a fila manualmente: python fila_fotos.py
+# ===========================================
+
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import banco
+import congelar
+import imagens
+
+PASTA_PENDENTES = "uploads_pendentes"
+UPLOAD_FOLDER = "static/uploads"
+CONCORRENCIA = int(os.getenv("FOTOS_CONCORRENCIA", "4"))
+TENTATIVAS = 3
+ESPERA_OCIOSA = 60  # segundos entre olhadas na fila vazia (sem enfileiramento neste processo)
+
+# ===========================================
+# 🧱 Tabela
+# ===========================================
+def garantir_tabela(conn):
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS fotos_fila (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            imovel_id INTEGER NOT NULL,
+            lote TEXT NOT NULL,
+            ordem INTEGER NOT NULL,
+            nome_original TEXT NOT NULL,
+            arquivo TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pendente',   -- pendente | enviando | ok | local | externa | erro
+            url TEXT,
+            erro TEXT,
+            tentativas INTEGER NOT NULL DEFAULT 0,
+            criado_em TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            atualizado_em TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_fotos_fila_status ON fotos_fila (status, id);
+        CREATE INDEX IF NOT EXISTS idx_fotos_fila_lote ON fotos_fila (lote, ordem);
+    """)
+    # Metadados do arquivo, copiados para imovel_fotos quando o lote termina
+    for coluna in ("width", "height", "bytes"):
+        banco._add_column(conn, "fotos_fila", coluna, "INTEGER")
+    banco._add_column(conn, "fotos_fila", "hash", "TEXT")
+    conn.commit()
+
+# ===========================================
+# ➕ Enfileirar (dentro da requisição: só disco + INSERT)
+# ===========================================
+def enfileirar(conn, imovel_id, arquivos):
+    """
+    Salva os arquivos enviados (FileStorage do Flask) em uploads_pendentes/
+    e cria um job por foto. Não faz commit: vai junto com a transação da rota.
+    Retorna quantas fotos entraram na fila.
+    """
+    os.makedirs(PASTA_PENDENTES, exist_ok=True)
+    lote = uuid.uuid4().hex
+    total = 0
+    for ordem, arquivo in enumerate(a for a in arquivos if a.filename):
+        destino = os.path.join(PASTA_PENDENTES, f"{lote}_{ordem}_{os.path.basename(arquivo.filename)}")
+        arquivo.save(destino)
+        conn.execute(
+            "INSERT INTO fotos_fila (imovel_id, lote, ordem, nome_original, arquivo) VALUES (?, ?, ?, ?, ?)",
+            (imovel_id, lote, ordem, os.path.basename(arquivo.filename), destino),
+        )
+        total += 1
+    return total
+
+def enfileirar_urls(conn, imovel_id, urls):
+    """Cria um job por URL externa (importação em massa). Sem commit. Retorna quantas entraram."""
+    lote = uuid.uuid4().hex
+    conn.executemany(
+        "INSERT INTO fotos_fila (imovel_id, lote, ordem, nome_original, arquivo) VALUES (?, ?, ?, ?, ?)",
+        [(imovel_id, lote, ordem, os.path.basename(url.split("?")[0]) or url, url) for ordem, url in enumerate(urls)],
+    )
+    return len(urls)
+
+def descartar(conn, imovel_id):
+    """Imóvel apagado: tira da fila as fotos que ainda nem começaram (sem commit). Retorna quantas."""
+    jobs = conn.execute(
+        "SELECT id, arquivo FROM fotos_fila WHERE imovel_id=? AND status='pendente'", (imovel_id,)
+    ).fetchall()
+    conn.executemany("DELETE FROM fotos_fila WHERE id=?", [(job["id"],) for job in jobs])
+    for job in jobs:
+        if not _remota(job):
+            try:
+                os.remove(job["arquivo"])
+            except OSError:
+                pass
+    return len(jobs)
+
+def _remota(job):
+    return job["arquivo"].startswith(("http://", "https://"))
+
+def status_recentes(conn, limite=50):
+    """Jobs ainda em andamento ou com problema + os últimos concluídos (para o admin)."""
+    return conn.execute("""
+        SELECT f.*, i.titulo FROM fotos_fila f LEFT JOIN imoveis i ON i.id = f.imovel_id
+        WHERE f.status IN ('pendente', 'enviando', 'erro')
+           OR f.atualizado_em >= datetime('now', '-1 day')
+        ORDER BY f.id DESC LIMIT ?
+    """, (limite,)).fetchall()
+
+# ===========================================
+# ⚙️ Processamento
+# ===========================================
+def _pegar_job(conn):
+    """Reserva o próximo job pendente (BEGIN IMMEDIATE: dois workers nunca pegam o mesmo)."""
+    # Olha antes sem travar: fila vazia não disputa a trava de escrita com o site
+    if not conn.execute("SELECT 1 FROM fotos_fila WHERE status='pendente' LIMIT 1").fetchone():
+        return None
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        job = conn.execute(
+            "SELECT * FROM fotos_fila WHERE status='pendente' ORDER BY id LIMIT 1"
+        ).fetchone()
+        if job:
+            conn.execute(
+                "UPDATE fotos_fila SET status='enviando', tentativas=tentativas+1, atualizado_em=? WHERE id=?",
+                (banco.agora(), job["id"]),
+            )
+        conn.execute("COMMIT")
+        return job
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def _enviar(job, uploader):
+    """Envia uma foto. Retorna (status, url, erro)."""
+    ultimo_erro = None
+    for tentativa in range(TENTATIVAS):
+        try:
+            return "ok", uploader(job["arquivo"]), None
+        except Exception as e:
+            ultimo_erro = str(e)
+            if tentativa + 1 < TENTATIVAS:
+                time.sleep(2 ** tentativa)
+
+    if _remota(job):
+        # Não há arquivo para guardar: a foto continua na URL original
+        print("⚠️ Erro no upload Cloudinary (URL externa):", ultimo_erro)
+        return "externa", job["arquivo"], ultimo_erro
+
+    # Fallback local, como antes (nome único: duas "foto1.jpg" não se sobrescrevem)
+    print("⚠️ Erro no upload Cloudinary:", ultimo_erro)
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    nome = f"{uuid.uuid4().hex[:12]}_{job['nome_original']}"
+    shutil.copyfile(job["arquivo"], os.path.join(UPLOAD_FOLDER, nome))
+    try:
+        imagens.gerar_derivadas(nome, UPLOAD_FOLDER)
+    except Exception as e:
+        print("⚠️ Erro ao gerar miniaturas:", e)
+    return "local", nome, ultimo_erro
+
+def _concluir(conn, job, status, url, erro, meta=None):
+    """
+    Marca o job e, se o lote inteiro terminou, anexa as fotos ao imóvel na ordem.
+    Fotos com erro ficam de fora (aparecem no admin); as demais entram mesmo assim.
+    Imóvel apagado no meio do envio: o lote termina sem anexar nada.
+    """
+    meta = meta or {}
+    with conn:
+        conn.execute("""
+            UPDATE fotos_fila SET status=?, url=?, erro=?, atualizado_em=?,
+                                  width=?, height=?, bytes=?, hash=?
+            WHERE id=?
+        """, (status, url, erro, banco.agora(),
+              meta.get("width"), meta.get("height"), meta.get("bytes"), meta.get("hash"), job["id"]))
+        lote = conn.execute(
+            "SELECT * FROM fotos_fila WHERE lote=? ORDER BY ordem", (job["lote"],)
+        ).fetchall()
+        lote_completo = all(f["status"] in ("ok", "local", "externa", "erro") for f in lote)
+        if lote_completo and not conn.execute("SELECT 1 FROM imoveis WHERE id=?", (job["imovel_id"],)).fetchone():
+            lote_completo = False
+        if lote_completo:
+            banco.adicionar_fotos(conn, job["imovel_id"], [
+                {k: f[k] for k in ("url", "width", "height", "bytes", "hash")}
+                for f in lote if f["status"] in ("ok", "local", "externa")
+            ])
+    if lote_completo:
+        congelar.agendar()
+
+    if status != "erro" and not _remota(job):
+        try:
+            os.remove(job["arquivo"])
+        except OSError:
+            pass
+
+def processar_job(job, uploader, database=None):
+    conn = banco.conectar(database)
+    try:
+        meta = {} if _remota(job) else imagens.metadados(job["arquivo"])
+        status, url, erro = _enviar(job, uploader)
+        _concluir(conn, job, status, url, erro, meta)
+    except Exception as e:
+        # Nem o fallback funcionou (arquivo sumiu, disco cheio...)
+        _concluir(conn, job, "erro", None, str(e))
+    finally:
+        conn.close()
+
+def _devolver_presos(conn):
+    """Jobs presos em 'enviando' há muito tempo (processo morreu no meio) voltam para a fila."""
+    if not conn.execute("""SELECT 1 FROM fotos_fila
+                           WHERE status='enviando' AND atualizado_em < datetime('now', '-10 minutes')
+                           LIMIT 1""").fetchone():
+        return
+    with conn:
+        conn.execute("""UPDATE fotos_fila SET status='pendente'
+                        WHERE status='enviando' AND atualizado_em < datetime('now', '-10 minutes')""")
+
+def processar_fila(uploader, database=None, concorrencia=CONCORRENCIA, parar_quando_vazia=True):
+    """Processa os jobs pendentes com `concorrencia` envios simultâneos."""
+    conn = banco.conectar(database)
+    garantir_tabela(conn)
+    _devolver_presos(conn)
+
+    with ThreadPoolExecutor(max_workers=max(1, concorrencia)) as executor:
+        em_andamento = set()
+        while True:
+            em_andamento = {f for f in em_andamento if not f.done()}
+            if len(em_andamento) >= concorrencia:
+                time.sleep(0.1)
+                continue
+            job = _pegar_job(conn)
+            if job:
+                em_andamento.add(executor.submit(processar_job, job, uploader, database))
+            elif em_andamento:
+                time.sleep(0.1)
+            elif parar_quando_vazia:
+                break
+            else:
+                # Dorme até um enfileiramento neste processo (iniciar_trabalhador) ou, de vez
+                # em quando, olha a fila (jobs deixados por outro worker ou por um reinício)
+                _acordar.wait(ESPERA_OCIOSA)
+                _acordar.clear()
+                _devolver_presos(conn)
+    conn.close()
+
+# ===========================================
+# 🧵 Trabalhador em segundo plano (um por processo)
+# ===========================================
+_trabalhador = {"thread": None, "pid": None}
+_trava = threading.Lock()
+_acordar = threading.Event()
+
+def iniciar_trabalhador(uploader, database=None):
+    """Garante uma thread processando a fila neste processo (idempotente) e a acorda."""
+    with _trava:
+        _acordar.set()
+        thread = _trabalhador["thread"]
+        if thread and thread.is_alive() and _trabalhador["pid"] == os.getpid():
+            return
+        thread = threading.Thread(
+            target=processar_fila, args=(uploader, database),
+            kwargs={"parar_quando_vazia": False}, daemon=True, name="fila-fotos",
+        )
+        thread.start()
+        _trabalhador.update(thread=thread, pid=os.getpid())
+
+if __name__ == "__main__":
+    from migrar_imagens_cloudinary import uploader_cloudinary
+
+    print("\n📸 Processando fila de fotos...\n")
+    processar_fila(uploader_cloudinary())
+    print("✅ Fila vazia.\n")
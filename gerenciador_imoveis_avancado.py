@@ -1,16 +1,21 @@
 # gerenciador_imoveis_avancado.py
-import sqlite3
 import sys  # necessário para encerrar o programa
+import argparse
+import banco
+import carga_imoveis
+import congelar
+import consultas
+import descricao
+import fila_fotos
+import semelhantes
 
-DATABASE = "database.db"
+DATABASE = banco.DATABASE
 
 # ==============================
 # 🔧 Conexão com o Banco
 # ==============================
 def get_db_connection():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return banco.conectar(DATABASE)
 
 # ==============================
 # ⚙️ Funções Utilitárias
@@ -35,9 +40,6 @@ def parse_fotos(fotos_str):
         return []
     return [f.strip() for f in fotos_str.split(",") if f.strip()]
 
-def join_fotos(fotos_list):
-    return ",".join([f for f in fotos_list if f])
-
 def input_multilinha(prompt):
     print(prompt)
     print("Dica: cole seu texto completo e digite 'fim' em uma linha nova para encerrar.")
@@ -53,41 +55,105 @@ def input_multilinha(prompt):
     return "\n".join(linhas)
 
 # ==============================
-# 📋 Listar Imóveis
+# 📋 Listar / Buscar Imóveis
 # ==============================
-def listar_imoveis(conn):
-    imoveis = conn.execute("SELECT * FROM imoveis ORDER BY id").fetchall()
-    if not imoveis:
-        print("\nNenhum imóvel cadastrado.\n")
-        return imoveis
+# Nada de imprimir a tabela inteira: a lista é paginada (mesmas consultas e
+# índices da página inicial, lendo de imoveis_cards) e os detalhes completos
+# aparecem só para o imóvel escolhido.
+POR_PAGINA = 20
 
+def imprimir_detalhes(conn, imovel):
     tem_html = has_column(conn, "imoveis", "descricao_html")
+    print(f"\nID: {imovel['id']}")
+    print(f"Título: {imovel['titulo']}")
+    print(f"Descrição curta: {imovel['descricao']}")
+    if tem_html:
+        tem = "Sim" if (imovel['descricao_html'] or '').strip() else "Não"
+        print(f"Descrição rica (descricao_html): {tem}")
+    print(f"Preço: {imovel['preco']}")
+    print(f"Dormitórios: {imovel['dormitorios']}")
+    print(f"Banheiros: {imovel['banheiros']}")
+    print(f"Vagas: {imovel['vagas']}")
+    print(f"Área: {imovel['area']}")
+    print(f"Destaque: {'Sim' if imovel['destaque'] else 'Não'}")
+    local = ", ".join(v for v in (imovel["bairro"], imovel["cidade"]) if v)
+    print(f"Localização: {local or '-'}"
+          + (f" ({imovel['latitude']}, {imovel['longitude']})" if imovel["latitude"] is not None else ""))
+
+    fotos = banco.fotos_do_imovel(conn, imovel["id"])
+    if fotos:
+        print("Fotos:")
+        for idx, foto in enumerate(fotos, start=1):
+            print(f"  {idx}. {foto['url']}")
+    else:
+        print("Fotos: Nenhuma cadastrada")
+    print("-" * 40)
 
-    print("\n=== Lista de Imóveis (detalhes completos) ===")
+def imprimir_resumo(imoveis):
     for imovel in imoveis:
-        print(f"\nID: {imovel['id']}")
-        print(f"Título: {imovel['titulo']}")
-        print(f"Descrição curta: {imovel['descricao']}")
-        if tem_html:
-            tem = "Sim" if (imovel['descricao_html'] or '').strip() else "Não"
-            print(f"Descrição rica (descricao_html): {tem}")
-        print(f"Preço: {imovel['preco']}")
-        print(f"Dormitórios: {imovel['dormitorios']}")
-        print(f"Banheiros: {imovel['banheiros']}")
-        print(f"Vagas: {imovel['vagas']}")
-        print(f"Área: {imovel['area']}")
-        print(f"Destaque: {'Sim' if imovel['destaque'] else 'Não'}")
-
-        fotos = parse_fotos(imovel["fotos"])
-        if fotos:
-            print("Fotos:")
-            for idx, foto in enumerate(fotos, start=1):
-                print(f"  {idx}. {foto}")
-        else:
-            print("Fotos: Nenhuma cadastrada")
-        print("-" * 40)
+        destaque = "⭐" if imovel["destaque"] else "  "
+        print(f"{imovel['id']:>7} {destaque} {imovel['titulo'][:50]:<50} {imovel['preco']:>16}  "
+              f"🛏 {imovel['dormitorios']} 🛁 {imovel['banheiros']}")
+
+def paginas_de_imoveis(conn, busca=""):
+    """Gera páginas de POR_PAGINA imóveis (colunas do card), ordem da listagem do site."""
+    cursor = None
+    while True:
+        imoveis, cursor = consultas.buscar_pagina(conn, {"busca": busca}, cursor=cursor, limite=POR_PAGINA,
+                                                  fts=banco.tem_fts(conn))
+        yield imoveis
+        if not cursor:
+            return
+
+def buscar_por_id(conn, texto):
+    """'15' ou '#15' → linha completa do imóvel (ou None)."""
+    return conn.execute("SELECT * FROM imoveis WHERE id=?", (int(texto.strip().lstrip("#")),)).fetchone()
+
+def eh_id(texto):
+    return texto.strip().lstrip("#").isdigit()
+
+def navegar(conn, busca, pergunta):
+    """
+    Mostra os resultados página a página. Retorna o imóvel cujo ID for digitado,
+    ou None (Enter na última página ou '0').
+    """
+    total = 0
+    for imoveis in paginas_de_imoveis(conn, busca):
+        if not imoveis:
+            break
+        total += len(imoveis)
+        imprimir_resumo(imoveis)
+        resposta = safe_input(f"\n[{total} mostrados] {pergunta}").strip()
+        if resposta == "0":
+            return None
+        if eh_id(resposta):
+            imovel = buscar_por_id(conn, resposta)
+            if not imovel:
+                print("❌ Imóvel não encontrado.\n")
+            return imovel
+        if resposta:
+            # Outro termo: recomeça a busca com ele
+            return navegar(conn, resposta, pergunta)
+    if not total:
+        print("\nNenhum imóvel encontrado.\n")
+    return None
+
+def escolher_imovel(conn):
+    """ID direto ou termo de busca (com a lista paginada dos resultados). Retorna a linha ou None."""
+    texto = safe_input("ID do imóvel ou termo de busca (Enter = todos): ").strip()
+    if eh_id(texto):
+        imovel = buscar_por_id(conn, texto)
+        if not imovel:
+            print("❌ Imóvel não encontrado.\n")
+        return imovel
+    return navegar(conn, texto, "Digite o ID, outro termo, Enter para mais ou 0 para cancelar: ")
+
+def listar_imoveis(conn):
+    print("\n=== Lista de Imóveis ===")
+    imovel = escolher_imovel(conn)
+    if imovel:
+        imprimir_detalhes(conn, imovel)
     print()
-    return imoveis
 
 # ==============================
 # ➕ Adicionar Imóvel
@@ -95,7 +161,7 @@ def listar_imoveis(conn):
 def adicionar_imovel(conn):
     print("\n=== Adicionar Imóvel ===")
     titulo = safe_input("Título: ")
-    descricao = safe_input("Descrição curta (resumo): ")
+    descricao_curta = safe_input("Descrição curta (resumo): ")
 
     tem_html = has_column(conn, "imoveis", "descricao_html")
     descricao_html = ""
@@ -103,46 +169,80 @@ def adicionar_imovel(conn):
         descricao_html = input_multilinha("\nAgora cole a descrição completa com formatação (emojis, <br>, etc).")
 
     preco = safe_input("Preço (ex: R$ 250.000): ")
-    dormitorios = safe_input("Dormitórios: ")
-    banheiros = safe_input("Banheiros: ")
-    vagas = safe_input("Vagas: ")
+    dormitorios = banco.inteiro(safe_input("Dormitórios: "))
+    banheiros = banco.inteiro(safe_input("Banheiros: "))
+    vagas = banco.inteiro(safe_input("Vagas: "))
     area = safe_input("Área (m²): ")
     destaque = safe_input("Destaque? (s/n): ").lower()
     destaque_val = 1 if destaque == "s" else 0
+    latitude, longitude, bairro, cidade = ler_localizacao()
     fotos = safe_input("Nomes das fotos (separados por vírgula, ex: casa1.jpg,casa2.jpg): ")
 
-    cols = ["titulo", "descricao", "preco", "dormitorios", "banheiros", "vagas", "area", "destaque", "fotos"]
-    vals = [titulo, descricao, preco, dormitorios, banheiros, vagas, area, destaque_val, fotos]
+    # "fotos" é a coluna antiga (NOT NULL): fica vazia, as fotos vão para imovel_fotos
+    cols = ["titulo", "descricao", "preco", "dormitorios", "banheiros", "vagas", "area", "destaque", "fotos",
+            "preco_centavos", "area_m2", "latitude", "longitude", "bairro", "cidade", "updated_at"]
+    vals = [titulo, descricao_curta, preco, dormitorios, banheiros, vagas, area, destaque_val, "",
+            banco.preco_para_centavos(preco), banco.area_para_m2(area), latitude, longitude, bairro, cidade,
+            banco.agora()]
 
     if tem_html:
         cols.insert(2, "descricao_html")
         vals.insert(2, descricao_html)
+        # Sanitiza e extrai o texto uma vez só, aqui na gravação
+        for coluna, valor in descricao.compilar(descricao_html).items():
+            cols.append(coluna)
+            vals.append(valor)
 
     placeholders = ",".join(["?"] * len(cols))
     sql = f"INSERT INTO imoveis ({','.join(cols)}) VALUES ({placeholders})"
-    conn.execute(sql, vals)
+    cur = conn.execute(sql, vals)
+    banco.adicionar_fotos(conn, cur.lastrowid, parse_fotos(fotos))
     conn.commit()
+    semelhantes.apos_escrita(conn)
+    congelar.agendar()
     print("✅ Imóvel adicionado com sucesso!\n")
 
+def ler_localizacao(atual=None):
+    """
+    Pergunta bairro, cidade e coordenadas → (latitude, longitude, bairro, cidade).
+    Na edição, Enter mantém o valor atual e "-" apaga.
+    """
+    def perguntar(rotulo, campo):
+        valor_atual = atual[campo] if atual is not None else None
+        sufixo = f" [{valor_atual}]" if valor_atual is not None else ""
+        resposta = safe_input(f"{rotulo}{sufixo}: ").strip()
+        if resposta == "-":
+            return None
+        return resposta or valor_atual
+
+    bairro = perguntar("Bairro", "bairro") or None
+    cidade = perguntar("Cidade", "cidade") or None
+    while True:
+        latitude = perguntar("Latitude (ex: -24.0935, vazio = sem)", "latitude")
+        longitude = perguntar("Longitude (ex: -46.6206)", "longitude") if latitude is not None else None
+        if latitude is None and longitude is None:
+            return None, None, bairro, cidade
+        lat, lon = banco.coordenadas(latitude, longitude)
+        if lat is not None:
+            return lat, lon, bairro, cidade
+        print("❌ Coordenadas inválidas: latitude entre -90 e 90, longitude entre -180 e 180.")
+
 # ==============================
 # ✏️ Editar Imóvel
 # ==============================
 def editar_imovel(conn):
     print("\n=== Editar Imóvel ===")
-    imoveis = listar_imoveis(conn)
-    if not imoveis: return
-
-    id_escolhido = safe_input("Digite o ID do imóvel: ")
-    imovel = conn.execute("SELECT * FROM imoveis WHERE id=?", (id_escolhido,)).fetchone()
+    imovel = escolher_imovel(conn)
     if not imovel:
-        print("❌ Imóvel não encontrado.\n")
         return
+    imprimir_detalhes(conn, imovel)
+    id_escolhido = imovel["id"]
 
     tem_html = has_column(conn, "imoveis", "descricao_html")
 
     print("\nDeixe em branco para manter o valor atual.")
     titulo = safe_input(f"Título [{imovel['titulo']}]: ") or imovel['titulo']
-    descricao = safe_input(f"Descrição curta [{imovel['descricao']}]: ") or imovel['descricao']
+    descricao_curta = safe_input(f"Descrição curta [{imovel['descricao']}]: ") or imovel['descricao']
 
     if tem_html:
         print("Atualizar descrição completa (descricao_html)? (s/n)")
@@ -154,26 +254,37 @@ def editar_imovel(conn):
         descricao_html = None
 
     preco = safe_input(f"Preço [{imovel['preco']}]: ") or imovel['preco']
-    dormitorios = safe_input(f"Dormitórios [{imovel['dormitorios']}]: ") or imovel['dormitorios']
-    banheiros = safe_input(f"Banheiros [{imovel['banheiros']}]: ") or imovel['banheiros']
-    vagas = safe_input(f"Vagas [{imovel['vagas']}]: ") or imovel['vagas']
+    dormitorios = banco.inteiro(safe_input(f"Dormitórios [{imovel['dormitorios']}]: ") or imovel['dormitorios'])
+    banheiros = banco.inteiro(safe_input(f"Banheiros [{imovel['banheiros']}]: ") or imovel['banheiros'])
+    vagas = banco.inteiro(safe_input(f"Vagas [{imovel['vagas']}]: ") or imovel['vagas'])
     area = safe_input(f"Área [{imovel['area']}]: ") or imovel['area']
     destaque = safe_input(f"Destaque (s/n) [{'s' if imovel['destaque'] else 'n'}]: ").lower()
     destaque_val = 1 if destaque == "s" else 0
+    print('Localização (Enter mantém, "-" apaga):')
+    latitude, longitude, bairro, cidade = ler_localizacao(imovel)
     novas_fotos = safe_input("Fotos (deixe vazio para manter as atuais): ").strip()
-    fotos_final = novas_fotos if novas_fotos else imovel['fotos']
 
-    sets = ["titulo=?", "descricao=?", "preco=?", "dormitorios=?", "banheiros=?", "vagas=?", "area=?", "destaque=?", "fotos=?"]
-    vals = [titulo, descricao, preco, dormitorios, banheiros, vagas, area, destaque_val, fotos_final]
+    sets = ["titulo=?", "descricao=?", "preco=?", "dormitorios=?", "banheiros=?", "vagas=?", "area=?", "destaque=?",
+            "preco_centavos=?", "area_m2=?", "latitude=?", "longitude=?", "bairro=?", "cidade=?", "updated_at=?"]
+    vals = [titulo, descricao_curta, preco, dormitorios, banheiros, vagas, area, destaque_val,
+            banco.preco_para_centavos(preco), banco.area_para_m2(area), latitude, longitude, bairro, cidade,
+            banco.agora()]
 
     if tem_html:
         sets.insert(2, "descricao_html=?")
         vals.insert(2, descricao_html)
+        for coluna, valor in descricao.compilar(descricao_html).items():
+            sets.append(f"{coluna}=?")
+            vals.append(valor)
 
     sql = f"UPDATE imoveis SET {', '.join(sets)} WHERE id=?"
     vals.append(id_escolhido)
     conn.execute(sql, vals)
+    if novas_fotos:
+        banco.substituir_fotos(conn, id_escolhido, parse_fotos(novas_fotos))
     conn.commit()
+    semelhantes.apos_escrita(conn)
+    congelar.agendar()
     print("✅ Imóvel atualizado com sucesso!\n")
 
 # ==============================
@@ -181,20 +292,17 @@ def editar_imovel(conn):
 # ==============================
 def gerenciar_fotos(conn):
     print("\n=== Atualizar / Remover Fotos ===")
-    imoveis = listar_imoveis(conn)
-    if not imoveis: return
-
-    id_escolhido = safe_input("Digite o ID do imóvel: ")
-    imovel = conn.execute("SELECT * FROM imoveis WHERE id=?", (id_escolhido,)).fetchone()
+    imovel = escolher_imovel(conn)
     if not imovel:
-        print("❌ Imóvel não encontrado.\n")
         return
+    print(f"\nImóvel {imovel['id']} - {imovel['titulo']}")
+    id_escolhido = imovel["id"]
 
-    fotos = parse_fotos(imovel["fotos"])
+    fotos = banco.fotos_do_imovel(conn, id_escolhido)
     print("\nFotos atuais:")
     if fotos:
         for idx, foto in enumerate(fotos, start=1):
-            print(f"{idx}. {foto}")
+            print(f"{idx}. {foto['url']}")
     else:
         print("Nenhuma foto cadastrada.")
 
@@ -205,9 +313,8 @@ def gerenciar_fotos(conn):
 
     if escolha == "1":
         novas = safe_input("Digite os nomes das novas fotos (separados por vírgula): ")
-        for f in parse_fotos(novas):
-            if f not in fotos:
-                fotos.append(f)
+        atuais = {f["url"] for f in fotos}
+        banco.adicionar_fotos(conn, id_escolhido, [f for f in dict.fromkeys(parse_fotos(novas)) if f not in atuais])
         print("✅ Fotos adicionadas.")
     elif escolha == "2":
         if not fotos:
@@ -215,10 +322,8 @@ def gerenciar_fotos(conn):
             return
         alvos = safe_input("Digite o(s) número(s) da(s) foto(s) para remover (ex: 1,3,4): ")
         try:
-            indices = sorted({int(n.strip()) for n in alvos.split(',') if n.strip()}, reverse=True)
-            for idx in indices:
-                if 1 <= idx <= len(fotos):
-                    fotos.pop(idx - 1)
+            indices = {int(n.strip()) for n in alvos.split(',') if n.strip()}
+            banco.remover_fotos(conn, [fotos[idx - 1]["id"] for idx in indices if 1 <= idx <= len(fotos)])
             print("✅ Remoção concluída.")
         except ValueError:
             print("❌ Entrada inválida.")
@@ -227,8 +332,9 @@ def gerenciar_fotos(conn):
         print("Operação cancelada.\n")
         return
 
-    conn.execute("UPDATE imoveis SET fotos=? WHERE id=?", (join_fotos(fotos), id_escolhido))
+    # updated_at do imóvel é atualizado pelos triggers de imovel_fotos
     conn.commit()
+    congelar.agendar()
     print("✅ Fotos atualizadas com sucesso!\n")
 
 # ==============================
@@ -236,36 +342,115 @@ def gerenciar_fotos(conn):
 # ==============================
 def deletar_imovel(conn):
     print("\n=== Deletar Imóvel ===")
-    imoveis = listar_imoveis(conn)
-    if not imoveis: return
-
-    id_escolhido = safe_input("Digite o ID do imóvel: ")
-    imovel = conn.execute("SELECT * FROM imoveis WHERE id=?", (id_escolhido,)).fetchone()
+    imovel = escolher_imovel(conn)
     if not imovel:
-        print("❌ Imóvel não encontrado.\n")
         return
+    imprimir_detalhes(conn, imovel)
+    id_escolhido = imovel["id"]
 
     confirm = safe_input(f"Tem certeza que deseja deletar o imóvel {imovel['id']} - {imovel['titulo']}? (s/n): ")
     if confirm.lower() == "s":
         conn.execute("DELETE FROM imoveis WHERE id=?", (id_escolhido,))
+        fila_fotos.descartar(conn, id_escolhido)
         conn.commit()
+        semelhantes.apos_escrita(conn)
+        congelar.agendar()
         print("✅ Imóvel deletado com sucesso!\n")
     else:
         print("Operação cancelada.\n")
 
+# ==============================
+# 📦 Importar / Exportar (CSV ou JSONL)
+# ==============================
+def importar_arquivo(conn, caminho, formato=None, lote=carga_imoveis.LOTE, substituir_fotos=False,
+                     processar_fotos=False):
+    formato = carga_imoveis.detectar_formato(caminho, formato)
+    print(f"\n=== Importar {caminho} ({formato}) ===")
+    if caminho == "-":
+        relatorio = carga_imoveis.importar(conn, sys.stdin, formato, lote, substituir_fotos)
+    else:
+        # utf-8-sig: aceita o BOM das planilhas salvas pelo Excel
+        with open(caminho, encoding="utf-8-sig", newline="") as arquivo:
+            relatorio = carga_imoveis.importar(conn, arquivo, formato, lote, substituir_fotos)
+    relatorio.imprimir()
+
+    if relatorio.inseridos or relatorio.atualizados or relatorio.fotos:
+        semelhantes.apos_escrita(conn)
+        congelar.agendar()
+    if relatorio.fotos_na_fila:
+        if processar_fotos:
+            from migrar_imagens_cloudinary import uploader_cloudinary
+            print("\n📸 Enviando as fotos da fila para o Cloudinary...")
+            fila_fotos.processar_fila(uploader_cloudinary(), DATABASE)
+            print("✅ Fila vazia.")
+        else:
+            print("💡 Para enviar as fotos da fila: python fila_fotos.py")
+    print()
+    return relatorio
+
+def exportar_arquivo(conn, caminho, formato=None):
+    formato = carga_imoveis.detectar_formato(caminho, formato)
+    if caminho == "-":
+        carga_imoveis.exportar(conn, sys.stdout, formato, saida=sys.stderr)
+        return
+    with open(caminho, "w", encoding="utf-8", newline="") as arquivo:
+        carga_imoveis.exportar(conn, arquivo, formato)
+    print(f"✅ Exportado para {caminho}\n")
+
+def linha_de_comando(argv):
+    """Subcomandos sem menu: importar / exportar."""
+    parser = argparse.ArgumentParser(description="Gerenciador de imóveis (sem argumentos abre o menu).")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_importar = sub.add_parser("importar", help="importa imóveis de um CSV/JSONL (upsert em lotes)")
+    p_importar.add_argument("arquivo", help='caminho do arquivo, ou "-" para stdin')
+    p_importar.add_argument("--formato", choices=["csv", "jsonl"], help="padrão: pela extensão")
+    p_importar.add_argument("--lote", type=int, default=carga_imoveis.LOTE, help="imóveis por transação")
+    p_importar.add_argument("--substituir-fotos", action="store_true",
+                            help="troca as fotos dos imóveis que já existiam")
+    p_importar.add_argument("--processar-fotos", action="store_true",
+                            help="envia as fotos externas ao Cloudinary logo depois")
+
+    p_exportar = sub.add_parser("exportar", help="exporta todos os imóveis para CSV/JSONL")
+    p_exportar.add_argument("arquivo", help='caminho do arquivo, ou "-" para stdout')
+    p_exportar.add_argument("--formato", choices=["csv", "jsonl"], help="padrão: pela extensão")
+
+    args = parser.parse_args(argv)
+    conn = get_db_connection()
+    banco.garantir_schema(conn)
+    try:
+        if args.comando == "importar":
+            relatorio = importar_arquivo(conn, args.arquivo, args.formato, max(1, args.lote),
+                                         args.substituir_fotos, args.processar_fotos)
+            return 1 if relatorio.rejeitadas else 0
+        exportar_arquivo(conn, args.arquivo, args.formato)
+        return 0
+    except OSError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+
 # ==============================
 # 🏠 Menu Principal
 # ==============================
 def main():
+    if len(sys.argv) > 1:
+        sys.exit(linha_de_comando(sys.argv[1:]))
+
     conn = get_db_connection()
+    banco.garantir_schema(conn)
+    fila_fotos.garantir_tabela(conn)
     print("💡 Dica: digite 'quit' em qualquer momento para sair do sistema.")
     while True:
         print("\n=== GERENCIADOR AVANÇADO DE IMÓVEIS ===")
-        print("1. Listar imóveis (detalhes completos)")
+        print("1. Buscar / listar imóveis")
         print("2. Adicionar imóvel")
         print("3. Editar imóvel")
         print("4. Atualizar / Remover fotos")
         print("5. Deletar imóvel")
+        print("6. Importar imóveis (CSV/JSONL)")
+        print("7. Exportar imóveis (CSV/JSONL)")
         print("0. Sair")
         escolha = safe_input("Escolha uma opção: ")
 
@@ -279,6 +464,14 @@ def main():
             gerenciar_fotos(conn)
         elif escolha == "5":
             deletar_imovel(conn)
+        elif escolha in ("6", "7"):
+            try:
+                if escolha == "6":
+                    importar_arquivo(conn, safe_input("Arquivo (.csv ou .jsonl): ").strip())
+                else:
+                    exportar_arquivo(conn, safe_input("Salvar em (.csv ou .jsonl): ").strip())
+            except OSError as e:
+                print(f"❌ {e}\n")
         elif escolha == "0":
             print("Saindo...")
             break
@@ -0,0 +1,84 @@
+# ===========================================
+# 🦄 CONFIGURAÇÃO DO GUNICORN (lida pelo start.sh)
+# ===========================================
+# SERVIDOR escolhe o modo:
+#   - "sync" (padrão): um request por worker, como sempre foi
+#   - "gthread": THREADS requests por worker (threads do gunicorn)
+#   - "asgi": workers uvicorn com o app em asgi.py (corpo das requisições
+#     lido de forma assíncrona, Flask num pool de THREADS threads)
+# WEB_CONCURRENCY fixa o nº de workers; sem ela, o nº sai das CPUs e da
+# memória do container (no Render o plano Starter tem 512 MB e 0,5 CPU).
+# PRELOAD_APP (padrão 1): o app é importado e aquecido uma vez no processo
+# pai e os workers nascem prontos por fork (mudou código → reinicie o
+# gunicorn inteiro, um HUP não recarrega). PRELOAD_APP=0 volta ao antigo:
+# cada worker importa e aquece o seu.
+# ===========================================
+
+import os
+
+SERVIDOR = os.getenv("SERVIDOR", "sync").lower()
+MB_POR_WORKER = 96  # app + cache de páginas + cache do SQLite por worker
+
+def _cpus():
+    """CPUs do container (cgroup v2), senão as do sistema."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            cota, periodo = f.read().split()
+        if cota != "max":
+            return max(1, round(int(cota) / int(periodo)))
+    except (OSError, ValueError):
+        pass
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+
+def _memoria_mb():
+    """Limite de memória do container (cgroup v2), senão a RAM da máquina."""
+    try:
+        with open("/sys/fs/cgroup/memory.max") as f:
+            valor = f.read().strip()
+        if valor != "max":
+            return int(valor) // (1024 * 1024)
+    except (OSError, ValueError):
+        pass
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    except (ValueError, OSError):
+        return 512
+
+def workers_padrao():
+    # Clássico 2×CPU+1, limitado pela memória (sempre pelo menos 2)
+    return max(2, min(2 * _cpus() + 1, _memoria_mb() // MB_POR_WORKER))
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY") or workers_padrao())
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+
+if SERVIDOR == "asgi":
+    # asgi.py lê THREADS ao ser importado pelo worker
+    os.environ.setdefault("THREADS", "8")
+    worker_class = "uvicorn.workers.UvicornWorker"
+    wsgi_app = "asgi:app"
+elif SERVIDOR == "gthread":
+    worker_class = "gthread"
+    threads = int(os.getenv("THREADS", "4"))
+    wsgi_app = "app:app"
+else:
+    worker_class = "sync"
+    wsgi_app = "app:app"
+
+# ===========================================
+# 🔥 Aquecimento (templates compilados, página inicial no cache)
+# ===========================================
+preload_app = os.getenv("PRELOAD_APP", "1") != "0"
+
+def _aquecer(log):
+    import app
+    log.info("🔥 App aquecido em %.0f ms", app.aquecer() * 1000)
+
+def when_ready(server):
+    # Com preload_app o app já foi importado aqui, antes do fork dos workers
+    if preload_app:
+        _aquecer(server.log)
+
+def post_worker_init(worker):
+    if not preload_app:
+        _aquecer(worker.log)
@@ -0,0 +1,225 @@
+# ===========================================
+# 🖼️ DERIVADAS DE IMAGENS (miniaturas, WebP/AVIF, srcset)
+# ===========================================
+# - Fotos no Cloudinary: nada é gerado, a URL recebe a transformação
+#   (w_640,c_limit,f_auto,q_auto) e o Cloudinary entrega o formato certo.
+# - Fotos locais (static/uploads): o Pillow gera larguras fixas em JPEG,
+#   WebP e AVIF (se o Pillow tiver suporte) em static/uploads/derivadas/,
+#   registradas em manifesto.json (nomes com um hash do nome original:
+#   casa.jpg e casa.png não dividem derivadas).
+#
+# Gerar para as fotos que já existem: python imagens.py
+# ===========================================
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem gunicorn há um processo só, a trava da thread basta
+    fcntl = None
+
+UPLOAD_FOLDER = "static/uploads"
+PASTA_DERIVADAS = os.path.join(UPLOAD_FOLDER, "derivadas")
+MANIFESTO = os.path.join(PASTA_DERIVADAS, "manifesto.json")
+
+LARGURAS = (320, 640, 1024, 1600)
+LARGURA_PADRAO = 640  # src do card e fallback do srcset
+
+# Formatos locais, do mais leve para o mais compatível
+FORMATOS = {
+    "avif": {"extensao": "avif", "mime": "image/avif", "opcoes": {"quality": 50}},
+    "webp": {"extensao": "webp", "mime": "image/webp", "opcoes": {"quality": 75, "method": 4}},
+    "jpeg": {"extensao": "jpg", "mime": "image/jpeg", "opcoes": {"quality": 80, "optimize": True, "progressive": True}},
+}
+
+_trava = threading.Lock()
+_manifesto = {"mtime": None, "dados": {}}
+
+# ===========================================
+# ☁️ Cloudinary: transformação na URL
+# ===========================================
+_UPLOAD_CLOUDINARY = re.compile(r"^(https?://res\.cloudinary\.com/[^/]+/image/upload/)(.*)$")
+
+def url_cloudinary(url, largura):
+    """Mesma imagem, redimensionada e no melhor formato que o navegador aceitar."""
+    m = _UPLOAD_CLOUDINARY.match(url)
+    if not m:
+        return url
+    return f"{m.group(1)}w_{largura},c_limit,f_auto,q_auto/{m.group(2)}"
+
+def eh_cloudinary(url):
+    return bool(_UPLOAD_CLOUDINARY.match(url))
+
+# ===========================================
+# 📒 Manifesto das derivadas locais
+# ===========================================
+def carregar_manifesto():
+    """Lê manifesto.json (relido só quando o arquivo muda)."""
+    try:
+        mtime = os.path.getmtime(MANIFESTO)
+    except OSError:
+        return {}
+    if _manifesto["mtime"] != mtime:
+        try:
+            with open(MANIFESTO, encoding="utf-8") as f:
+                dados = json.load(f)
+        except ValueError:
+            dados = {}
+        _manifesto.update(mtime=mtime, dados=dados)
+    return _manifesto["dados"]
+
+@contextmanager
+def _trava_manifesto():
+    """Trava entre threads e entre processos (cada worker do gunicorn tem a sua fila de fotos)."""
+    with _trava:
+        if fcntl is None:
+            yield
+            return
+        with open(MANIFESTO + ".lock", "a") as arquivo_trava:
+            fcntl.flock(arquivo_trava, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(arquivo_trava, fcntl.LOCK_UN)
+
+def _registrar(foto, entrada):
+    # Relê, atualiza só esta foto e troca o arquivo de uma vez (nunca meio escrito)
+    with _trava_manifesto():
+        try:
+            with open(MANIFESTO, encoding="utf-8") as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            dados = {}
+        dados[foto] = entrada
+        fd, temporario = tempfile.mkstemp(dir=PASTA_DERIVADAS, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(dados, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(temporario, MANIFESTO)
+
+# ===========================================
+# 📏 Metadados (para imovel_fotos)
+# ===========================================
+def metadados(caminho):
+    """{"bytes", "hash", "width", "height"} de um arquivo local (dimensões só com Pillow)."""
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloco)
+    dados = {"bytes": os.path.getsize(caminho), "hash": h.hexdigest(), "width": None, "height": None}
+    try:
+        from PIL import Image
+        with Image.open(caminho) as imagem:
+            dados["width"], dados["height"] = imagem.size
+    except Exception:  # sem Pillow ou arquivo que não é imagem
+        pass
+    return dados
+
+# ===========================================
+# 🏭 Geração (Pillow)
+# ===========================================
+def formatos_disponiveis():
+    from PIL import features
+    return [nome for nome in FORMATOS if nome == "jpeg" or features.check(nome)]
+
+def gerar_derivadas(foto, upload_folder=UPLOAD_FOLDER):
+    """
+    Gera as larguras/formatos de uma foto local e registra no manifesto.
+    Retorna a entrada do manifesto, ou None se o Pillow não estiver instalado.
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        print("⚠️ Pillow não instalado: derivadas não geradas para", foto)
+        return None
+
+    os.makedirs(PASTA_DERIVADAS, exist_ok=True)
+    # O hash do nome inteiro separa casa.jpg de casa.png (mesma base, derivadas diferentes)
+    base = f"{os.path.splitext(foto)[0]}-{hashlib.sha1(foto.encode()).hexdigest()[:8]}"
+
+    with Image.open(os.path.join(upload_folder, foto)) as original:
+        imagem = ImageOps.exif_transpose(original).convert("RGB")
+
+    entrada = {"largura": imagem.width, "altura": imagem.height, "variantes": {}}
+    # Nunca amplia: larguras maiores que o original ficam de fora
+    larguras = [l for l in LARGURAS if l < imagem.width] or [imagem.width]
+    for largura in larguras:
+        altura = round(imagem.height * largura / imagem.width)
+        reduzida = imagem.resize((largura, altura), Image.LANCZOS)
+        for nome in formatos_disponiveis():
+            formato = FORMATOS[nome]
+            arquivo = f"{base}-{largura}.{formato['extensao']}"
+            reduzida.save(os.path.join(PASTA_DERIVADAS, arquivo), nome.upper(), **formato["opcoes"])
+            entrada["variantes"].setdefault(nome, {})[str(largura)] = arquivo
+
+    _registrar(foto, entrada)
+    return entrada
+
+# ===========================================
+# 🧩 Para os templates
+# ===========================================
+def variantes(foto, url_original, url_derivada):
+    """
+    Monta o que o <picture>/<img> precisa para uma foto:
+      {"src": ..., "srcset": ..., "fontes": [(mime, srcset), ...]}
+    url_original(foto) e url_derivada(arquivo) vêm do Flask (url_for).
+    """
+    if foto.startswith("http"):
+        if not eh_cloudinary(foto):
+            return {"src": foto, "srcset": "", "fontes": []}
+        return {
+            "src": url_cloudinary(foto, LARGURA_PADRAO),
+            "srcset": ", ".join(f"{url_cloudinary(foto, l)} {l}w" for l in LARGURAS),
+            "fontes": [],
+        }
+
+    entrada = carregar_manifesto().get(foto)
+    if not entrada:
+        return {"src": url_original(foto), "srcset": "", "fontes": []}
+
+    def srcset(nome):
+        return ", ".join(f"{url_derivada(arquivo)} {largura}w"
+                         for largura, arquivo in sorted(entrada["variantes"][nome].items(), key=lambda x: int(x[0])))
+
+    jpegs = entrada["variantes"].get("jpeg", {})
+    if jpegs:
+        src = url_derivada(jpegs.get(str(LARGURA_PADRAO)) or jpegs[max(jpegs, key=int)])
+    else:
+        src = url_original(foto)
+    return {
+        "src": src,
+        "srcset": srcset("jpeg") if jpegs else "",
+        "fontes": [(FORMATOS[nome]["mime"], srcset(nome))
+                   for nome in ("avif", "webp") if nome in entrada["variantes"]],
+    }
+
+# ===========================================
+# ▶️ Backfill das fotos locais
+# ===========================================
+def gerar_todas(upload_folder=UPLOAD_FOLDER, refazer=False):
+    manifesto = carregar_manifesto()
+    geradas = puladas = falhas = 0
+    for nome in sorted(os.listdir(upload_folder)):
+        if not os.path.isfile(os.path.join(upload_folder, nome)):
+            continue
+        if nome in manifesto and not refazer:
+            puladas += 1
+            continue
+        try:
+            if gerar_derivadas(nome, upload_folder) is None:
+                break
+            geradas += 1
+            print(f"✅ {nome}")
+        except Exception as e:  # arquivo que não é imagem, corrompido...
+            falhas += 1
+            print(f"⚠️ {nome}: {e}")
+    print(f"\n🖼️ Geradas: {geradas} | Já existentes: {puladas} | Falhas: {falhas}\n")
+
+if __name__ == "__main__":
+    import sys
+    gerar_todas(refazer="--refazer" in sys.argv)
@@ -0,0 +1,385 @@
+# ===========================================
+# 📊 MÉTRICAS DE DESEMPENHO (latência, SQL, templates)
+# ===========================================
+# Mede cada requisição (tempo total, nº de queries, tempo de SQL e de
+# template), operações externas (upload no Cloudinary) e guarda as queries
+# lentas. Cada worker do gunicorn grava um retrato em METRICAS_DIR a cada
+# poucos segundos; /admin/metrics e /metrics somam os workers vivos.
+#
+# Variáveis de ambiente:
+#   METRICAS=off              desliga tudo (sem hooks e sem wrapper de SQL)
+#   METRICAS_DIR              pasta dos retratos (padrão: <tmp>/celo_metricas)
+#   METRICAS_SQL_LENTA_MS     limite de query lenta (padrão: 100 ms)
+#   METRICAS_TOKEN            token Bearer para o Prometheus ler /metrics
+# ===========================================
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+ATIVO = os.getenv("METRICAS", "on").lower() not in ("0", "off", "false", "nao", "não")
+DIRETORIO = os.getenv("METRICAS_DIR", os.path.join(tempfile.gettempdir(), "celo_metricas"))
+SQL_LENTA_MS = float(os.getenv("METRICAS_SQL_LENTA_MS", "100"))
+INTERVALO_GRAVACAO = 5  # segundos entre retratos de um worker
+
+# Limites dos baldes do histograma (ms); o último balde é "+Inf"
+BALDES_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_trava = threading.Lock()
+_requisicao = threading.local()
+_dados = {"rotas": {}, "operacoes": {}, "sql_lentas": deque(maxlen=50)}
+_estado = {"instalado": False, "ultima_gravacao": 0.0}
+
+# ===========================================
+# 📈 Histogramas
+# ===========================================
+def _nova_serie():
+    return {"contagem": 0, "soma_ms": 0.0, "baldes": [0] * (len(BALDES_MS) + 1),
+            "erros": 0, "queries": 0, "sql_ms": 0.0, "template_ms": 0.0}
+
+def _observar(serie, ms):
+    serie["contagem"] += 1
+    serie["soma_ms"] += ms
+    for i, limite in enumerate(BALDES_MS):
+        if ms <= limite:
+            serie["baldes"][i] += 1
+            return
+    serie["baldes"][-1] += 1
+
+def percentil(serie, p):
+    """Estimativa pelo histograma (interpolação linear dentro do balde), em ms."""
+    total = serie["contagem"]
+    if not total:
+        return None
+    alvo = total * p / 100
+    acumulado, inferior = 0, 0.0
+    for i, quantidade in enumerate(serie["baldes"]):
+        superior = BALDES_MS[i] if i < len(BALDES_MS) else BALDES_MS[-1]
+        if quantidade and acumulado + quantidade >= alvo:
+            return round(inferior + (superior - inferior) * (alvo - acumulado) / quantidade, 2)
+        acumulado += quantidade
+        inferior = superior
+    return float(BALDES_MS[-1])
+
+def _juntar(destino, serie):
+    for campo in ("contagem", "soma_ms", "erros", "queries", "sql_ms", "template_ms"):
+        destino[campo] += serie.get(campo, 0)
+    destino["baldes"] = [a + b for a, b in zip(destino["baldes"], serie["baldes"])]
+
+# ===========================================
+# 🗄️ SQL (fábrica de conexão usada por banco.conectar)
+# ===========================================
+def _contar_sql(ms, queries=1):
+    if getattr(_requisicao, "ativa", False):
+        _requisicao.queries += queries
+        _requisicao.sql_ms += ms
+
+def _registrar_lenta(sql, ms):
+    if getattr(_requisicao, "ignorar", False):
+        return
+    with _trava:
+        _dados["sql_lentas"].append({
+            "sql": " ".join(sql.split())[:500],
+            "ms": round(ms, 2),
+            "rota": getattr(_requisicao, "rota", None) if getattr(_requisicao, "ativa", False) else None,
+            "quando": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "pid": os.getpid(),
+        })
+
+class CursorMedido(sqlite3.Cursor):
+    """Mede execute + fetch* de cada query (iteração linha a linha não entra)."""
+    _sql = ""
+    _ms = 0.0
+
+    def execute(self, sql, parametros=()):
+        inicio = time.perf_counter()
+        try:
+            return super().execute(sql, parametros)
+        finally:
+            self._sql, self._ms = sql, (time.perf_counter() - inicio) * 1000
+            _contar_sql(self._ms)
+            if self._ms >= SQL_LENTA_MS:
+                _registrar_lenta(sql, self._ms)
+
+    def executemany(self, sql, parametros):
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, parametros)
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+            _contar_sql(ms)
+            if ms >= SQL_LENTA_MS:
+                _registrar_lenta(sql, ms)
+
+    def _medir_busca(self, funcao, *args):
+        inicio = time.perf_counter()
+        try:
+            return funcao(*args)
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+            _contar_sql(ms, queries=0)
+            # Só vira "lenta" aqui se o execute sozinho não passou do limite
+            if self._ms < SQL_LENTA_MS <= self._ms + ms:
+                _registrar_lenta(self._sql, self._ms + ms)
+            self._ms += ms
+
+    def fetchone(self):
+        return self._medir_busca(super().fetchone)
+
+    def fetchall(self):
+        return self._medir_busca(super().fetchall)
+
+    def fetchmany(self, *args):
+        return self._medir_busca(super().fetchmany, *args)
+
+class ConexaoMedida(sqlite3.Connection):
+    def cursor(self, factory=CursorMedido):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, parametros):
+        return self.cursor().executemany(sql, parametros)
+
+def fabrica_conexao():
+    return ConexaoMedida if ATIVO else sqlite3.Connection
+
+# ===========================================
+# ⏱️ Operações (uploads, chamadas externas)
+# ===========================================
+@contextmanager
+def cronometro(nome):
+    """with metricas.cronometro("cloudinary_upload"): ..."""
+    if not ATIVO or getattr(_requisicao, "ignorar", False):
+        yield
+        return
+    inicio = time.perf_counter()
+    erro = False
+    try:
+        yield
+    except Exception:
+        erro = True
+        raise
+    finally:
+        ms = (time.perf_counter() - inicio) * 1000
+        with _trava:
+            serie = _dados["operacoes"].setdefault(nome, _nova_serie())
+            _observar(serie, ms)
+            serie["erros"] += erro
+        _talvez_gravar()
+
+@contextmanager
+def ignorando():
+    """
+    Requisições internas desta thread (aquecimento, exportação estática) não
+    entram nas séries nem nas queries lentas, e não gravam retrato.
+    """
+    anterior = getattr(_requisicao, "ignorar", False)
+    _requisicao.ignorar = True
+    try:
+        yield
+    finally:
+        _requisicao.ignorar = anterior
+
+# ===========================================
+# 🌐 Hooks do Flask
+# ===========================================
+def instalar(app):
+    """Registra os hooks de requisição e de template (não faz nada se METRICAS=off)."""
+    if not ATIVO:
+        return
+    from flask import request, before_render_template, template_rendered
+
+    @app.before_request
+    def _inicio():
+        if getattr(_requisicao, "ignorar", False):
+            _requisicao.ativa = False
+            return
+        _requisicao.ativa = True
+        _requisicao.inicio = time.perf_counter()
+        _requisicao.queries = 0
+        _requisicao.sql_ms = 0.0
+        _requisicao.template_ms = 0.0
+        _requisicao.erro = False
+        regra = request.url_rule.rule if request.url_rule else "<sem rota>"
+        _requisicao.rota = f"{request.method} {regra}"
+
+    @app.after_request
+    def _status(resposta):
+        if resposta.status_code >= 500:
+            _requisicao.erro = True
+        return resposta
+
+    @app.teardown_request
+    def _fim(exc):
+        if not getattr(_requisicao, "ativa", False):
+            return
+        _requisicao.ativa = False
+        ms = (time.perf_counter() - _requisicao.inicio) * 1000
+        with _trava:
+            serie = _dados["rotas"].setdefault(_requisicao.rota, _nova_serie())
+            _observar(serie, ms)
+            serie["queries"] += _requisicao.queries
+            serie["sql_ms"] += _requisicao.sql_ms
+            serie["template_ms"] += _requisicao.template_ms
+            serie["erros"] += bool(exc is not None or _requisicao.erro)
+        _talvez_gravar()
+
+    def _antes_template(sender, template, context, **extra):
+        _requisicao.inicio_template = time.perf_counter()
+
+    def _depois_template(sender, template, context, **extra):
+        inicio = getattr(_requisicao, "inicio_template", None)
+        if inicio is not None and getattr(_requisicao, "ativa", False):
+            _requisicao.template_ms += (time.perf_counter() - inicio) * 1000
+            _requisicao.inicio_template = None
+
+    before_render_template.connect(_antes_template, app, weak=False)
+    template_rendered.connect(_depois_template, app, weak=False)
+    _estado["instalado"] = True
+
+# ===========================================
+# 💾 Retratos por worker e agregação
+# ===========================================
+def _retrato():
+    with _trava:
+        return {
+            "pid": os.getpid(),
+            "gravado_em": time.time(),
+            "rotas": json.loads(json.dumps(_dados["rotas"])),
+            "operacoes": json.loads(json.dumps(_dados["operacoes"])),
+            "sql_lentas": list(_dados["sql_lentas"]),
+        }
+
+def gravar():
+    """Grava o retrato deste worker (troca o arquivo de uma vez)."""
+    os.makedirs(DIRETORIO, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=DIRETORIO, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(_retrato(), f)
+    os.replace(temporario, os.path.join(DIRETORIO, f"{os.getpid()}.json"))
+    _estado["ultima_gravacao"] = time.monotonic()
+
+def _talvez_gravar():
+    if _estado["instalado"] and time.monotonic() - _estado["ultima_gravacao"] >= INTERVALO_GRAVACAO:
+        try:
+            gravar()
+        except OSError as e:
+            print("⚠️ Erro ao gravar métricas:", e)
+
+def _processo_vivo(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+def agregado():
+    """Soma os retratos dos workers vivos (os de workers mortos são apagados)."""
+    if ATIVO:
+        gravar()
+    total = {"workers": 0, "rotas": {}, "operacoes": {}, "sql_lentas": []}
+    try:
+        nomes = os.listdir(DIRETORIO)
+    except OSError:
+        return total
+    for nome in nomes:
+        if not nome.endswith(".json"):
+            continue
+        caminho = os.path.join(DIRETORIO, nome)
+        pid = int(nome[:-5]) if nome[:-5].isdigit() else None
+        if pid is None or not _processo_vivo(pid):
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+            continue
+        try:
+            with open(caminho, encoding="utf-8") as f:
+                retrato = json.load(f)
+        except (OSError, ValueError):
+            continue
+        total["workers"] += 1
+        for grupo in ("rotas", "operacoes"):
+            for chave, serie in retrato[grupo].items():
+                _juntar(total[grupo].setdefault(chave, _nova_serie()), serie)
+        total["sql_lentas"].extend(retrato["sql_lentas"])
+    total["sql_lentas"].sort(key=lambda q: q["ms"], reverse=True)
+    return total
+
+def resumo(series):
+    """Linhas prontas para a tabela do /admin/metrics (mais lentas primeiro)."""
+    linhas = []
+    for chave, serie in series.items():
+        n = serie["contagem"] or 1
+        linhas.append({
+            "nome": chave,
+            "contagem": serie["contagem"],
+            "p50": percentil(serie, 50),
+            "p95": percentil(serie, 95),
+            "p99": percentil(serie, 99),
+            "media_ms": round(serie["soma_ms"] / n, 2),
+            "queries_media": round(serie["queries"] / n, 1),
+            "sql_media_ms": round(serie["sql_ms"] / n, 2),
+            "template_media_ms": round(serie["template_ms"] / n, 2),
+            "erros": serie["erros"],
+        })
+    return sorted(linhas, key=lambda l: l["p95"] or 0, reverse=True)
+
+# ===========================================
+# 📟 Formato texto do Prometheus
+# ===========================================
+def _rotulo(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+def prometheus(dados):
+    linhas = []
+
+    def histograma(nome, ajuda, series, rotulos):
+        linhas.append(f"# HELP {nome} {ajuda}")
+        linhas.append(f"# TYPE {nome} histogram")
+        for chave, serie in sorted(series.items()):
+            base = rotulos(chave)
+            acumulado = 0
+            for limite, quantidade in zip(list(BALDES_MS) + ["+Inf"], serie["baldes"]):
+                acumulado += quantidade
+                le = "+Inf" if limite == "+Inf" else repr(limite / 1000)
+                linhas.append(f'{nome}_bucket{{{base},le="{le}"}} {acumulado}')
+            linhas.append(f"{nome}_sum{{{base}}} {serie['soma_ms'] / 1000:.6f}")
+            linhas.append(f"{nome}_count{{{base}}} {serie['contagem']}")
+
+    def contador(nome, ajuda, series, campo, rotulos, escala=1):
+        linhas.append(f"# HELP {nome} {ajuda}")
+        linhas.append(f"# TYPE {nome} counter")
+        for chave, serie in sorted(series.items()):
+            valor = serie[campo] * escala
+            linhas.append(f"{nome}{{{rotulos(chave)}}} {valor:.6f}" if isinstance(valor, float)
+                          else f"{nome}{{{rotulos(chave)}}} {valor}")
+
+    def rotulos_rota(chave):
+        metodo, _, rota = chave.partition(" ")
+        return f'metodo="{_rotulo(metodo)}",rota="{_rotulo(rota)}"'
+
+    def rotulos_operacao(chave):
+        return f'operacao="{_rotulo(chave)}"'
+
+    rotas, operacoes = dados["rotas"], dados["operacoes"]
+    histograma("celo_http_request_duration_seconds", "Latência das requisições por rota.", rotas, rotulos_rota)
+    contador("celo_http_request_errors_total", "Requisições com exceção ou status 5xx.", rotas, "erros", rotulos_rota)
+    contador("celo_sql_queries_total", "Queries SQL executadas pelas requisições.", rotas, "queries", rotulos_rota)
+    contador("celo_sql_seconds_total", "Tempo gasto em SQL pelas requisições.", rotas, "sql_ms", rotulos_rota, 1 / 1000)
+    contador("celo_template_seconds_total", "Tempo gasto renderizando templates.", rotas, "template_ms", rotulos_rota, 1 / 1000)
+    histograma("celo_operacao_duration_seconds", "Duração de operações externas (uploads).", operacoes, rotulos_operacao)
+    contador("celo_operacao_errors_total", "Operações externas que falharam.", operacoes, "erros", rotulos_operacao)
+    linhas.append("# HELP celo_workers Workers do gunicorn com métricas.")
+    linhas.append("# TYPE celo_workers gauge")
+    linhas.append(f"celo_workers {dados['workers']}")
+    return "\n".join(linhas) + "\n"
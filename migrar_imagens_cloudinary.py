@@ -1,117 +1,229 @@
+
 # ===========================================
 # ☁️ MIGRAÇÃO AUTOMÁTICA DE IMAGENS PARA CLOUDINARY (com relatório)
 # ===========================================
 # Autor: Adilan (Celo Imóveis)
 # Descrição:
 #   - Envia automaticamente todas as imagens locais (static/uploads)
-#     para o Cloudinary e atualiza o banco de dados SQLite.
+#     para o Cloudinary e atualiza a tabela imovel_fotos.
+#   - Envios em paralelo (--concorrencia), com novas tentativas e espera
+#     crescente quando o Cloudinary falha.
+#   - Diário de progresso (migracao_cloudinary.jsonl): se cair no meio,
+#     rodar de novo pula o que já foi enviado.
+#   - A mesma imagem usada em vários imóveis (mesmo conteúdo) sobe uma vez só.
+#   - Atualiza o banco numa única transação no final.
 #   - Gera um relatório com totais, sucessos e falhas.
+#
+# Uso:
+#   python migrar_imagens_cloudinary.py [--concorrencia 8] [--tentativas 4] [--dry-run]
 # ===========================================
 
+import argparse
+import hashlib
+import json
 import os
-import sqlite3
-import cloudinary
-import cloudinary.uploader
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from dotenv import load_dotenv
+import banco
 
 # ===========================================
 # ⚙️ CONFIGURAÇÕES INICIAIS
 # ===========================================
 load_dotenv()
-DATABASE = "database.db"
+DATABASE = banco.DATABASE
 UPLOAD_FOLDER = "static/uploads"
-
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
-    secure=True
-)
+DIARIO = "migracao_cloudinary.jsonl"
 
 # ===========================================
 # 🧩 FUNÇÕES AUXILIARES
 # ===========================================
 def get_db_connection():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def upload_image_to_cloudinary(file_path, folder="celoimoveis"):
-    """Envia imagem para o Cloudinary e retorna a URL segura"""
-    try:
-        result = cloudinary.uploader.upload(file_path, folder=folder)
-        return result["secure_url"]
-    except Exception as e:
-        print(f"❌ Erro ao enviar {file_path}: {e}")
-        return None
+    return banco.conectar(DATABASE)
+
+def uploader_cloudinary(folder="celoimoveis"):
+    """Cria a função de envio real (o SDK só é carregado aqui)."""
+    import cloudinary
+    import cloudinary.uploader
+
+    cloudinary.config(
+        cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+        api_key=os.getenv("CLOUDINARY_API_KEY"),
+        api_secret=os.getenv("CLOUDINARY_API_SECRET"),
+        secure=True
+    )
+
+    def enviar(file_path):
+        return cloudinary.uploader.upload(file_path, folder=folder)["secure_url"]
+    return enviar
+
+def upload_image_to_cloudinary(file_path, uploader, tentativas=4, espera_inicial=1.0):
+    """
+    Envia a imagem e retorna a URL segura.
+    Em caso de erro tenta de novo esperando 1s, 2s, 4s... Retorna None se todas falharem.
+    """
+    for tentativa in range(1, tentativas + 1):
+        try:
+            return uploader(file_path)
+        except Exception as e:
+            if tentativa == tentativas:
+                print(f"❌ Erro ao enviar {file_path}: {e}")
+                return None
+            espera = espera_inicial * 2 ** (tentativa - 1)
+            print(f"🔁 Falha ao enviar {file_path} ({e}); nova tentativa em {espera:.0f}s...")
+            time.sleep(espera)
+
+def hash_arquivo(caminho):
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+def carregar_diario(caminho):
+    """Lê o diário de envios anteriores: {hash do conteúdo: url}."""
+    enviados = {}
+    if not os.path.exists(caminho):
+        return enviados
+    with open(caminho, encoding="utf-8") as f:
+        for linha in f:
+            try:
+                registro = json.loads(linha)
+                enviados[registro["hash"]] = registro["url"]
+            except (ValueError, KeyError):
+                continue  # linha incompleta (processo interrompido no meio da escrita)
+    return enviados
 
 # ===========================================
 # 🚀 FUNÇÃO PRINCIPAL
 # ===========================================
-def migrar_imagens():
+def migrar_imagens(uploader=None, concorrencia=4, tentativas=4, espera_inicial=1.0,
+                   dry_run=False, diario=DIARIO, upload_folder=UPLOAD_FOLDER, conn=None):
+    """
+    Migra as fotos locais para o Cloudinary e devolve o relatório (dict).
+    `uploader(caminho) -> url` pode ser trocado (ex.: um fake local para testes).
+    """
     print("\n📤 Iniciando migração de imagens para Cloudinary...\n")
 
-    conn = get_db_connection()
-    imoveis = conn.execute("SELECT id, fotos FROM imoveis").fetchall()
-
-    total_imoveis = len(imoveis)
-    total_fotos = 0
-    ja_em_cloudinary = 0
-    enviadas = 0
-    falhas = 0
-
-    for imovel in imoveis:
-        if not imovel["fotos"]:
+    fechar_conn = conn is None
+    conn = conn or get_db_connection()
+    banco.garantir_fotos(conn)
+    fotos = conn.execute("SELECT id, imovel_id, url, storage FROM imovel_fotos ORDER BY id").fetchall()
+
+    relatorio = {
+        "imoveis": len({f["imovel_id"] for f in fotos}),
+        "fotos": len(fotos),
+        "ja_em_cloudinary": 0,
+        "enviadas": 0,
+        "reaproveitadas": 0,
+        "falhas": 0,
+        "imoveis_atualizados": 0,
+    }
+
+    # 1️⃣ Levanta as fotos locais e o hash de cada arquivo
+    locais = []
+    hash_por_arquivo = {}
+    caminho_por_hash = {}
+    for foto in fotos:
+        # Mantém URLs que já estão no Cloudinary (ou em outro endereço externo)
+        if foto["storage"] != "local":
+            relatorio["ja_em_cloudinary"] += 1
+            continue
+        locais.append(foto)
+        if foto["url"] in hash_por_arquivo:
             continue
 
-        fotos = [f.strip() for f in imovel["fotos"].split(",") if f.strip()]
-        novas_fotos = []
-
-        for foto in fotos:
-            total_fotos += 1
-
-            # Mantém URLs que já estão no Cloudinary
-            if foto.startswith("http"):
-                ja_em_cloudinary += 1
-                novas_fotos.append(foto)
-                continue
+        local_path = os.path.join(upload_folder, foto["url"])
+        if not os.path.exists(local_path):
+            print(f"⚠️ Imagem não encontrada: {local_path}")
+            relatorio["falhas"] += 1
+            continue
 
-            local_path = os.path.join(UPLOAD_FOLDER, foto)
-            if not os.path.exists(local_path):
-                print(f"⚠️ Imagem não encontrada: {local_path}")
-                falhas += 1
+        conteudo = hash_arquivo(local_path)
+        hash_por_arquivo[foto["url"]] = conteudo
+        caminho_por_hash.setdefault(conteudo, local_path)
+
+    # 2️⃣ O que já foi enviado (diário de execuções anteriores) não sobe de novo
+    url_por_hash = carregar_diario(diario)
+    pendentes = {h: p for h, p in caminho_por_hash.items() if h not in url_por_hash}
+    relatorio["reaproveitadas"] = len(caminho_por_hash) - len(pendentes)
+
+    if dry_run:
+        print(f"🧪 Simulação: {len(pendentes)} arquivo(s) seriam enviados "
+              f"({len(hash_por_arquivo)} fotos locais, {len(caminho_por_hash)} conteúdos distintos).")
+        for caminho in sorted(pendentes.values()):
+            print(f"   ⬆️ {caminho}")
+        if fechar_conn:
+            conn.close()
+        return relatorio
+
+    # 3️⃣ Envia em paralelo, registrando cada sucesso no diário na hora
+    uploader = uploader or uploader_cloudinary()
+    trava_diario = threading.Lock()
+    with open(diario, "a", encoding="utf-8") as arquivo_diario, \
+            ThreadPoolExecutor(max_workers=max(1, concorrencia)) as executor:
+        futuros = {}
+        for conteudo, caminho in pendentes.items():
+            print(f"⬆️ Enviando {caminho} ...")
+            futuros[executor.submit(upload_image_to_cloudinary, caminho, uploader,
+                                    tentativas, espera_inicial)] = (conteudo, caminho)
+
+        for futuro in as_completed(futuros):
+            conteudo, caminho = futuros[futuro]
+            url = futuro.result()
+            if not url:
+                relatorio["falhas"] += 1
                 continue
-
-            print(f"⬆️ Enviando {foto} ...")
-            url = upload_image_to_cloudinary(local_path)
-            if url:
-                enviadas += 1
-                novas_fotos.append(url)
-            else:
-                falhas += 1
-                novas_fotos.append(foto)
-
-        # Atualiza banco
-        conn.execute("UPDATE imoveis SET fotos=? WHERE id=?", (",".join(novas_fotos), imovel["id"]))
-        conn.commit()
-
-    conn.close()
+            relatorio["enviadas"] += 1
+            url_por_hash[conteudo] = url
+            with trava_diario:
+                arquivo_diario.write(json.dumps({"hash": conteudo, "arquivo": caminho, "url": url}) + "\n")
+                arquivo_diario.flush()
+
+    # 4️⃣ Atualiza o banco de uma vez só (só as linhas das fotos que mudaram)
+    atualizacoes = []
+    imoveis_atualizados = set()
+    for foto in locais:
+        conteudo = hash_por_arquivo.get(foto["url"])
+        if conteudo in url_por_hash:
+            atualizacoes.append((url_por_hash[conteudo], conteudo, foto["id"]))
+            imoveis_atualizados.add(foto["imovel_id"])
+
+    with conn:
+        conn.executemany("UPDATE imovel_fotos SET url=?, storage='cloudinary', hash=? WHERE id=?", atualizacoes)
+    relatorio["imoveis_atualizados"] = len(imoveis_atualizados)
+
+    if fechar_conn:
+        conn.close()
 
     # ===========================================
     # 🧾 RELATÓRIO FINAL
     # ===========================================
     print("\n📊 RELATÓRIO DE MIGRAÇÃO")
     print("────────────────────────────────────")
-    print(f"🏠 Imóveis processados: {total_imoveis}")
-    print(f"🖼️ Total de fotos analisadas: {total_fotos}")
-    print(f"☁️ Já no Cloudinary: {ja_em_cloudinary}")
-    print(f"🚀 Enviadas agora: {enviadas}")
-    print(f"⚠️ Falhas ou ausentes: {falhas}")
+    print(f"🏠 Imóveis processados: {relatorio['imoveis']}")
+    print(f"🖼️ Total de fotos analisadas: {relatorio['fotos']}")
+    print(f"☁️ Já no Cloudinary: {relatorio['ja_em_cloudinary']}")
+    print(f"🚀 Enviadas agora: {relatorio['enviadas']}")
+    print(f"♻️ Reaproveitadas (diário): {relatorio['reaproveitadas']}")
+    print(f"⚠️ Falhas ou ausentes: {relatorio['falhas']}")
+    print(f"📝 Imóveis atualizados no banco: {relatorio['imoveis_atualizados']}")
     print("────────────────────────────────────")
     print("\n🌎 Migração concluída com sucesso!\n")
+    return relatorio
 
 # ===========================================
 # ▶️ EXECUÇÃO
 # ===========================================
 if __name__ == "__main__":
-    migrar_imagens()
+    parser = argparse.ArgumentParser(description="Migra as fotos locais para o Cloudinary.")
+    parser.add_argument("--concorrencia", type=int, default=4, help="envios simultâneos (padrão: 4)")
+    parser.add_argument("--tentativas", type=int, default=4, help="tentativas por arquivo (padrão: 4)")
+    parser.add_argument("--diario", default=DIARIO, help=f"arquivo de progresso (padrão: {DIARIO})")
+    parser.add_argument("--dry-run", action="store_true", help="só mostra o que seria enviado")
+    args = parser.parse_args()
+
+    migrar_imagens(concorrencia=args.concorrencia, tentativas=args.tentativas,
+                   dry_run=args.dry_run, diario=args.diario)
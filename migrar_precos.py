@@ -0,0 +1,41 @@
+# ===========================================
+# 🔢 MIGRAÇÃO: PREÇO E ÁREA NUMÉRICOS
+# ===========================================
+# Descrição:
+#   - Cria as colunas preco_centavos / area_m2 e seus índices.
+#   - Preenche as colunas a partir dos textos de preço e área já cadastrados.
+#   - Rode uma vez após atualizar o site (pode rodar de novo sem problemas).
+# ===========================================
+
+import banco
+
+def migrar_precos():
+    print("\n🔢 Convertendo preços e áreas para colunas numéricas...\n")
+
+    conn = banco.conectar()
+    banco.garantir_schema(conn)
+
+    imoveis = conn.execute("SELECT id, preco, area FROM imoveis").fetchall()
+    atualizacoes = []
+    sem_preco = 0
+
+    for id_, preco, area in imoveis:
+        centavos = banco.preco_para_centavos(preco)
+        if not centavos:
+            print(f"⚠️ Imóvel {id_}: preço não reconhecido ({preco!r})")
+            sem_preco += 1
+        atualizacoes.append((centavos, banco.area_para_m2(area), id_))
+
+    # Uma única transação para todos os imóveis
+    with conn:
+        conn.executemany("UPDATE imoveis SET preco_centavos=?, area_m2=? WHERE id=?", atualizacoes)
+    conn.close()
+
+    print("📊 RELATÓRIO")
+    print("────────────────────────────────────")
+    print(f"🏠 Imóveis atualizados: {len(atualizacoes)}")
+    print(f"⚠️ Preços não reconhecidos: {sem_preco}")
+    print("────────────────────────────────────\n")
+
+if __name__ == "__main__":
+    migrar_precos()
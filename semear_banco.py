@@ -0,0 +1,175 @@
+# ===========================================
+# 🌱 BANCO SINTÉTICO PARA BENCHMARKS
+# ===========================================
+# Gera um database.db com N imóveis inventados (títulos, bairros e
+# descrições em português, preços "R$ 250.000", 3 a 12 fotos no Cloudinary
+# por imóvel, coordenadas no litoral sul de SP), já no schema atual
+# (índices, FTS, imovel_fotos, imoveis_geo...).
+# Mesma semente → mesmo banco: os resultados dos benchmarks são comparáveis.
+#
+# Uso: python semear_banco.py --imoveis 10000 --destino bench_dados/imoveis_10000.db
+# ===========================================
+
+import argparse
+import os
+import random
+import time
+
+import banco
+import descricao
+
+TIPOS = ["Casa", "Sobrado", "Apartamento", "Casa térrea", "Sobrado de Condomínio", "Chácara",
+         "Terreno", "Kitnet", "Casa com piscina", "Cobertura"]
+CIDADES = {
+    "Mongaguá": ["Vera Cruz", "Centro", "Agenor de Campos", "Jardim Praiamar", "Balneário Itaóca", "Flórida Mirim"],
+    "Itanhaém": ["Suarão", "Cibratel", "Gaivota", "Centro", "Jardim Regina", "Belas Artes"],
+    "Praia Grande": ["Boqueirão", "Guilhermina", "Aviação", "Tupi", "Ocian", "Caiçara"],
+    "Peruíbe": ["Centro", "Oásis", "Stella Maris", "Ruínas", "Jardim Brasil"],
+    "São Vicente": ["Itararé", "Gonzaguinha", "Parque Bitaru"],
+}
+CARACTERISTICAS = [
+    "lado praia", "lado serra", "a 150 metros do mar", "rua asfaltada", "quintal amplo",
+    "churrasqueira", "piscina", "edícula nos fundos", "portão eletrônico", "documentação em dia",
+    "aceita financiamento bancário", "próximo ao comércio", "área de lazer completa", "vista para o mar",
+]
+# Centro aproximado de cada cidade (lat, lon); os bairros ficam a até ~4 km dele
+CENTROS = {
+    "Mongaguá": (-24.0935, -46.6206),
+    "Itanhaém": (-24.1830, -46.7889),
+    "Praia Grande": (-24.0058, -46.4028),
+    "Peruíbe": (-24.3200, -46.9983),
+    "São Vicente": (-23.9631, -46.3919),
+}
+PROXIMIDADES = ["Igreja", "Farmácia", "Supermercado", "Escola", "Padaria", "Posto de saúde", "Ponto de ônibus"]
+PALAVRAS_BUSCA = ["praia", "piscina", "sobrado", "mongagua", "financiamento", "churrasqueira",
+                  "itanhaem", "apartamento", "vista mar", "condominio"]
+
+def _preco(aleatorio):
+    valor = aleatorio.randrange(120, 1800) * 1000
+    texto = f"{valor:,}".replace(",", ".")
+    return f"R$ {texto},00" if aleatorio.random() < 0.5 else f"R$ {texto}"
+
+def _descricoes(aleatorio, quantidade=60):
+    """Modelos de descrição já compilados (compilar 100 mil vezes só deixaria a geração lenta)."""
+    modelos = []
+    for _ in range(quantidade):
+        itens = "".join(f"<li>✅ {p}</li>" for p in aleatorio.sample(PROXIMIDADES, 3))
+        destaques = ", ".join(aleatorio.sample(CARACTERISTICAS, 4))
+        area_total = f"{aleatorio.randrange(120, 600)},{aleatorio.randrange(10)}"
+        html = (f"📍 Localizada no <strong>{aleatorio.choice(['lado praia', 'lado serra'])}</strong>.\n"
+                f"📐 Área total: {area_total} m²\n<ul>{itens}</ul>\n"
+                f"<p>Imóvel com {destaques}. Agende sua visita!</p>")
+        modelos.append((html, descricao.compilar(html)))
+    return modelos
+
+def _localizacao(aleatorio, cidade, bairro):
+    """(latitude, longitude) perto do centro do bairro; ~10% dos imóveis ficam sem."""
+    if aleatorio.random() < 0.1:
+        return None, None
+    lat, lon = CENTROS[cidade]
+    deslocamento = random.Random(f"{cidade}|{bairro}")  # mesmo centro de bairro em toda geração
+    lat += deslocamento.uniform(-0.035, 0.035)
+    lon += deslocamento.uniform(-0.035, 0.035)
+    return round(lat + aleatorio.gauss(0, 0.006), 6), round(lon + aleatorio.gauss(0, 0.006), 6)
+
+def gerar_imoveis(quantidade, semente=42):
+    """Gera (imovel, fotos) com dados determinísticos para a semente."""
+    aleatorio = random.Random(semente)
+    # Sequência própria para a localização: o resto do banco sai igual ao de antes dela
+    aleatorio_geo = random.Random(f"geo-{semente}")
+    modelos = _descricoes(aleatorio)
+    for numero in range(1, quantidade + 1):
+        cidade = aleatorio.choice(list(CIDADES))
+        bairro = aleatorio.choice(CIDADES[cidade])
+        tipo = aleatorio.choice(TIPOS)
+        dormitorios = aleatorio.choice([0, 1, 2, 2, 3, 3, 4, 5])
+        area = f"{aleatorio.randrange(30, 500)},{aleatorio.randrange(10)}" if aleatorio.random() < 0.5 \
+            else str(aleatorio.randrange(30, 500))
+        preco = _preco(aleatorio)
+        html, campos = aleatorio.choice(modelos)
+        latitude, longitude = _localizacao(aleatorio_geo, cidade, bairro)
+        imovel = {
+            "titulo": f"{tipo} - {cidade} | {bairro} #{numero}",
+            "descricao": f"{tipo} com {dormitorios} dormitório(s), {', '.join(aleatorio.sample(CARACTERISTICAS, 2))}.",
+            "preco": preco,
+            "fotos": "",
+            "dormitorios": dormitorios,
+            "banheiros": aleatorio.choice([1, 1, 2, 2, 3]),
+            "vagas": aleatorio.choice([0, 1, 1, 2, 3]),
+            "area": area,
+            "destaque": 1 if aleatorio.random() < 0.1 else 0,
+            "descricao_html": html,
+            "preco_centavos": banco.preco_para_centavos(preco),
+            "area_m2": banco.area_para_m2(area),
+            "bairro": bairro,
+            "cidade": cidade,
+            "latitude": latitude,
+            "longitude": longitude,
+            **campos,
+        }
+        fotos = [
+            f"https://res.cloudinary.com/bench/image/upload/v1/celoimoveis/{aleatorio.getrandbits(64):016x}.jpg"
+            for _ in range(aleatorio.randrange(3, 13))
+        ]
+        yield imovel, fotos
+
+def semear(destino, quantidade, semente=42, lote=2000):
+    """Cria `destino` do zero com `quantidade` imóveis. Retorna o tempo gasto (s)."""
+    inicio = time.perf_counter()
+    for sufixo in ("", "-wal", "-shm"):
+        if os.path.exists(destino + sufixo):
+            os.remove(destino + sufixo)
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+
+    conn = banco.conectar(destino)
+    # Mesmo CREATE TABLE do banco original; o resto do schema vem de garantir_schema
+    conn.execute("""
+        CREATE TABLE imoveis (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            titulo TEXT NOT NULL,
+            descricao TEXT NOT NULL,
+            preco TEXT NOT NULL,
+            fotos TEXT NOT NULL,
+            dormitorios INTEGER DEFAULT 0, banheiros INTEGER DEFAULT 0, vagas INTEGER DEFAULT 0,
+            area INTEGER DEFAULT 0, destaque INTEGER DEFAULT 0, descricao_html TEXT DEFAULT ''
+        )
+    """)
+    banco.garantir_schema(conn)
+
+    agora = banco.agora()
+    pendentes = []
+
+    def gravar():
+        with conn:
+            for imovel, fotos in pendentes:
+                imovel["updated_at"] = agora
+                colunas = ", ".join(imovel)
+                cur = conn.execute(f"INSERT INTO imoveis ({colunas}) VALUES ({', '.join('?' * len(imovel))})",
+                                   list(imovel.values()))
+                conn.executemany(
+                    "INSERT INTO imovel_fotos (imovel_id, ordem, url, storage) VALUES (?, ?, ?, 'cloudinary')",
+                    [(cur.lastrowid, ordem, url) for ordem, url in enumerate(fotos)],
+                )
+        pendentes.clear()
+
+    for item in gerar_imoveis(quantidade, semente):
+        pendentes.append(item)
+        if len(pendentes) >= lote:
+            gravar()
+    gravar()
+
+    conn.execute("PRAGMA optimize")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return time.perf_counter() - inicio
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera um banco sintético para benchmarks.")
+    parser.add_argument("--imoveis", type=int, default=10000)
+    parser.add_argument("--destino", default=None, help="padrão: bench_dados/imoveis_<N>.db")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    destino = args.destino or os.path.join("bench_dados", f"imoveis_{args.imoveis}.db")
+    segundos = semear(destino, args.imoveis, args.semente)
+    print(f"🌱 {args.imoveis} imóveis em {destino} ({segundos:.1f}s)")
@@ -0,0 +1,530 @@
+# ===========================================
+# 🧭 IMÓVEIS SEMELHANTES (vizinhos mais próximos)
+# ===========================================
+# Cada imóvel vira um vetor (NumPy):
+#   - preço e área (log), dormitórios, banheiros e vagas, padronizados
+#   - localização: latitude/longitude em km (sem coordenadas: centro da cidade)
+#   - texto: TF-IDF do título, da descricao e do descricao_texto (o texto do
+#     descricao_html), reduzido a DIMENSOES_TEXTO por projeção aleatória
+# e os VIZINHOS mais próximos (distância euclidiana) ficam gravados em
+# imoveis_semelhantes. A página de detalhes só lê essa tabela pela chave.
+#
+# Incremental: atualizar() refaz só as listas que as escritas desde a última
+# vez (imoveis_mudancas) podem ter mudado: a dos imóveis alterados, a de quem
+# os tinha como vizinhos e a de quem agora os tem mais perto que o último
+# vizinho guardado (raio). Os vetores novos usam a normalização e o vocabulário
+# do último cálculo completo (tabela semelhantes_modelo).
+#
+# No site, agendar() faz isso numa thread depois de /add, /edit e /delete:
+# a rota não espera (um recálculo completo leva segundos).
+#
+# Uso:
+#   python semelhantes.py          → incremental (completo se nunca rodou)
+#   python semelhantes.py --tudo   → recalcula tudo (vocabulário e normalização novos)
+# Sem NumPy (opcional) nada é calculado e o detalhe não mostra semelhantes.
+# ===========================================
+
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # opcional: sem ele não há imóveis semelhantes
+    np = None
+
+import banco
+import congelar
+
+# Suba quando mudar as features ou os pesos abaixo: força o cálculo completo
+VERSAO = "1"
+
+VIZINHOS = 6
+DIMENSOES_TEXTO = 64
+MAX_VOCABULARIO = 5000
+MIN_IMOVEIS_PALAVRA = 2       # palavra de um imóvel só não aproxima ninguém...
+MAX_FRACAO_PALAVRA = 0.5      # ...e a que está em mais da metade deles também não
+SEMENTE = 42                  # da projeção aleatória (a mesma no completo e no incremental)
+
+# Peso de cada parte do vetor: diferença de 1 desvio-padrão de preço pesa 1,5;
+# ESCALA_KM de distância pesa PESO_LOCAL; textos sem nada em comum pesam ~1,4
+PESOS = (("preco", 1.5), ("area", 1.0), ("dormitorios", 1.0), ("banheiros", 0.5), ("vagas", 0.5))
+PESO_LOCAL = 1.0
+ESCALA_KM = 3.0
+PESO_TEXTO = 1.0
+MAX_COMODOS = 10              # 12 dormitórios não são "mais diferentes" que 10
+
+# Mudou mais que essa fração do catálogo (ex.: importação): recalcular tudo sai mais barato
+FRACAO_INCREMENTAL = 0.2
+BLOCO = 256                   # linhas por multiplicação (BLOCO × nº de candidatos floats na memória)
+GRUPO = 128                   # colunas por grupo na seleção dos k menores (ver _menores)
+THREADS = min(4, os.cpu_count() or 1)
+
+_LOCAL = slice(len(PESOS), len(PESOS) + 2)  # colunas da localização no vetor
+
+COLUNAS = ("id, preco_centavos, area_m2, dormitorios, banheiros, vagas, latitude, longitude, "
+           "bairro, cidade, titulo, descricao, descricao_texto")
+
+# ===========================================
+# 🔤 Texto
+# ===========================================
+_PALAVRA = re.compile(r"[a-z0-9]{3,}")
+
+def _normalizar(texto):
+    """Minúsculas sem acentos (e sem emojis): "Mongaguá" → "mongagua"."""
+    return unicodedata.normalize("NFKD", (texto or "").lower()).encode("ascii", "ignore").decode()
+
+def palavras(imovel):
+    """Palavras do título e das descrições, mais o bairro e a cidade como termos próprios."""
+    texto = _normalizar(" ".join(filter(None, (imovel["titulo"], imovel["descricao"], imovel["descricao_texto"]))))
+    termos = _PALAVRA.findall(texto)
+    cidade = _normalizar(imovel["cidade"]).strip()
+    if cidade:
+        termos.append(f"cidade:{cidade}")
+        bairro = _normalizar(imovel["bairro"]).strip()
+        if bairro:
+            termos.append(f"bairro:{cidade}/{bairro}")
+    return termos
+
+def _contagens(textos, indice, acrescentar=False):
+    """
+    (imóvel, termo, contagem) de cada par distinto, agrupados por imóvel.
+    Termo = número da palavra em `indice`; com acrescentar=True palavras novas entram nele.
+    """
+    if acrescentar:
+        termos = [indice.setdefault(p, len(indice)) for t in textos for p in t]
+    else:
+        termos = [indice.get(p, -1) for t in textos for p in t]
+    termos = np.array(termos, dtype=np.int64)
+    imoveis = np.repeat(np.arange(len(textos), dtype=np.int64), [len(t) for t in textos])
+    conhecidos = termos >= 0
+    chaves, contagem = np.unique(imoveis[conhecidos] * max(len(indice), 1) + termos[conhecidos],
+                                 return_counts=True)
+    return chaves // max(len(indice), 1), chaves % max(len(indice), 1), contagem
+
+def _projecao(modelo):
+    """Matriz aleatória (vocabulário × DIMENSOES_TEXTO), refeita igual a partir da semente."""
+    gerador = np.random.default_rng(modelo["semente"])
+    return gerador.standard_normal((len(modelo["vocabulario"]), DIMENSOES_TEXTO), dtype=np.float32)
+
+def _texto(textos, modelo):
+    """TF-IDF (tf sublinear, norma 1) de cada imóvel projetado em DIMENSOES_TEXTO, norma 1 de novo."""
+    resultado = np.zeros((len(textos), DIMENSOES_TEXTO), dtype=np.float32)
+    if not modelo["vocabulario"] or not textos:
+        return resultado
+    indice = {p: i for i, p in enumerate(modelo["vocabulario"])}
+    imoveis, termos, contagem = _contagens(textos, indice)
+    if not len(termos):
+        return resultado
+    pesos = ((1 + np.log(contagem)) * np.asarray(modelo["idf"], dtype=np.float64)[termos]).astype(np.float32)
+
+    # Pares agrupados por imóvel: reduceat soma cada grupo de uma vez
+    inicios = np.flatnonzero(np.r_[True, imoveis[1:] != imoveis[:-1]])
+    com_texto = imoveis[inicios]
+    grupo = np.repeat(np.arange(len(inicios)), np.diff(np.r_[inicios, len(pesos)]))
+    pesos /= np.sqrt(np.add.reduceat(pesos * pesos, inicios))[grupo]
+
+    projecao = _projecao(modelo)
+    # Em fatias de ~200 mil pares (fatia × DIMENSOES_TEXTO floats na memória), sem cortar um imóvel ao meio
+    for comeco in range(0, len(inicios), 4096):
+        grupos = inicios[comeco:comeco + 4096]
+        fim = inicios[comeco + 4096] if comeco + 4096 < len(inicios) else len(pesos)
+        parcelas = pesos[grupos[0]:fim, None] * projecao[termos[grupos[0]:fim]]
+        resultado[com_texto[comeco:comeco + 4096]] = np.add.reduceat(parcelas, grupos - grupos[0])
+
+    normas = np.linalg.norm(resultado, axis=1)
+    resultado[normas > 0] /= normas[normas > 0, None]
+    return resultado
+
+# ===========================================
+# 📐 Vetores
+# ===========================================
+def _brutos(linhas):
+    """Matriz (n × 5): log do preço e da área (NaN se não informados), dormitórios, banheiros, vagas."""
+    brutos = np.array([[imovel["preco_centavos"] or 0, imovel["area_m2"] or 0,
+                        imovel["dormitorios"] or 0, imovel["banheiros"] or 0, imovel["vagas"] or 0]
+                       for imovel in linhas], dtype=np.float64).reshape(-1, len(PESOS))
+    with np.errstate(divide="ignore"):
+        brutos[:, :2] = np.where(brutos[:, :2] > 0, np.log(np.maximum(brutos[:, :2], 1)), np.nan)
+    brutos[:, 2:] = np.clip(brutos[:, 2:], 0, MAX_COMODOS)
+    return brutos
+
+def _coordenadas(linhas, modelo=None):
+    """(latitude, longitude) de cada imóvel; sem elas, o centro da cidade (ou de tudo) do modelo."""
+    coordenadas = np.array([[imovel["latitude"], imovel["longitude"]] for imovel in linhas],
+                           dtype=np.float64).reshape(-1, 2)
+    if modelo is not None:
+        for i in np.flatnonzero(np.isnan(coordenadas).any(axis=1)):
+            coordenadas[i] = modelo["centros"].get(_normalizar(linhas[i]["cidade"]).strip(), modelo["centro"])
+    return coordenadas
+
+def ajustar(linhas, textos):
+    """Normalização, centros e vocabulário (com idf) calculados sobre o catálogo inteiro."""
+    brutos = _brutos(linhas)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # coluna sem nenhum valor: mediana 0
+        medianas = np.nan_to_num(np.nanmedian(brutos, axis=0) if len(brutos) else np.zeros(len(PESOS)))
+    preenchidos = np.where(np.isnan(brutos), medianas, brutos)
+    medias = preenchidos.mean(axis=0) if len(brutos) else np.zeros(len(PESOS))
+    desvios = preenchidos.std(axis=0) if len(brutos) else np.ones(len(PESOS))
+    desvios[desvios < 1e-9] = 1.0
+
+    coordenadas = _coordenadas(linhas)
+    com_local = ~np.isnan(coordenadas).any(axis=1)
+    centro = coordenadas[com_local].mean(axis=0).tolist() if com_local.any() else [0.0, 0.0]
+    por_cidade = {}
+    for i in np.flatnonzero(com_local):
+        por_cidade.setdefault(_normalizar(linhas[i]["cidade"]).strip(), []).append(coordenadas[i])
+    centros = {cidade: np.mean(lista, axis=0).tolist() for cidade, lista in por_cidade.items() if cidade}
+
+    indice = {}
+    _, termos, _ = _contagens(textos, indice, acrescentar=True)
+    frequencia = np.bincount(termos, minlength=len(indice))
+    palavras_indice = np.array(list(indice), dtype=object)
+    validas = (frequencia >= MIN_IMOVEIS_PALAVRA) & (frequencia <= max(MAX_FRACAO_PALAVRA * len(textos), 1))
+    escolhidas = np.flatnonzero(validas)
+    # As mais frequentes primeiro (desempate pela palavra: o mesmo catálogo dá o mesmo vocabulário)
+    escolhidas = escolhidas[np.lexsort((palavras_indice[escolhidas], -frequencia[escolhidas]))][:MAX_VOCABULARIO]
+
+    return {
+        "versao": VERSAO,
+        "semente": SEMENTE,
+        "medianas": medianas.tolist(),
+        "medias": medias.tolist(),
+        "desvios": desvios.tolist(),
+        "centro": centro,
+        "centros": centros,
+        "vocabulario": palavras_indice[escolhidas].tolist(),
+        "idf": (np.log((1 + len(textos)) / (1 + frequencia[escolhidas])) + 1).tolist(),
+    }
+
+def vetores(linhas, textos, modelo):
+    """Matriz float32 (n × (5 + 2 + DIMENSOES_TEXTO)): a distância entre linhas é a semelhança."""
+    brutos = _brutos(linhas)
+    brutos = np.where(np.isnan(brutos), modelo["medianas"], brutos)
+    numericos = (brutos - modelo["medias"]) / modelo["desvios"] * [peso for _, peso in PESOS]
+
+    # Graus → km (aproximação plana: as distâncias que importam são de poucos km)
+    lat0 = modelo["centro"][0]
+    coordenadas = _coordenadas(linhas, modelo) - modelo["centro"]
+    local = coordenadas * [110.57, 111.32 * math.cos(math.radians(lat0))] / ESCALA_KM * PESO_LOCAL
+
+    return np.hstack([numericos, local, _texto(textos, modelo) * PESO_TEXTO]).astype(np.float32)
+
+# ===========================================
+# 🔎 Vizinhos mais próximos
+# ===========================================
+def _menores(distancias, k):
+    """
+    Colunas (e valores) dos k menores de cada linha, em ordem crescente.
+    Linha larga: só os k grupos de GRUPO colunas com os menores mínimos podem
+    conter os k menores, então a seleção fina roda em k × GRUPO colunas, não em todas.
+    """
+    linhas = np.arange(len(distancias))[:, None]
+    if distancias.shape[1] >= 4 * k * GRUPO:
+        grupos = distancias.shape[1] // GRUPO
+        minimos = distancias[:, :grupos * GRUPO].reshape(len(distancias), grupos, GRUPO).min(axis=2)
+        escolhidos = np.argpartition(minimos, k - 1, axis=1)[:, :k]
+        colunas = (escolhidos[:, :, None] * GRUPO + np.arange(GRUPO)).reshape(len(distancias), -1)
+        # Sobra que não fechou um grupo entra sempre
+        colunas = np.hstack([colunas, np.broadcast_to(np.arange(grupos * GRUPO, distancias.shape[1]),
+                                                      (len(distancias), distancias.shape[1] - grupos * GRUPO))])
+    else:
+        colunas = np.broadcast_to(np.arange(distancias.shape[1]), distancias.shape)
+    valores = distancias[linhas, colunas]
+    melhores = np.argpartition(valores, k - 1, axis=1)[:, :k]
+    valores = np.take_along_axis(valores, melhores, axis=1)
+    ordem = np.argsort(valores, axis=1, kind="stable")
+    return (np.take_along_axis(np.take_along_axis(colunas, melhores, axis=1), ordem, axis=1),
+            np.take_along_axis(valores, ordem, axis=1))
+
+def _mais_proximos(base, normas, consulta, candidatos, proprias, k):
+    """
+    Os k de base[candidatos] mais perto de cada base[consulta]; proprias = coluna de cada
+    consulta entre os candidatos (ela não é vizinha de si mesma). (posições, distâncias).
+    """
+    # |a - b|² = |a|² + |b|² - 2 a·b; |a|² não muda a ordem da linha, só entra no fim
+    distancias = (base[consulta] * -2) @ base[candidatos].T
+    distancias += normas[candidatos]
+    distancias[np.arange(len(consulta)), proprias] = np.inf
+    colunas, valores = _menores(distancias, k)
+    return candidatos[colunas], np.sqrt(np.maximum(valores + normas[consulta, None], 0))
+
+def _k(base, k):
+    return min(k, len(base) - 1)
+
+def vizinhos(base, posicoes, k=VIZINHOS):
+    """
+    Os k mais próximos de cada base[posicoes] entre todas as linhas de base (menos ela mesma),
+    do mais perto para o mais longe: (posições, distâncias), matrizes len(posicoes) × k.
+    Força bruta: para as poucas listas da atualização incremental.
+    """
+    k = _k(base, k)
+    if k <= 0 or not len(posicoes):
+        return np.zeros((len(posicoes), 0), dtype=np.int64), np.zeros((len(posicoes), 0), dtype=np.float32)
+    normas = np.einsum("ij,ij->i", base, base)
+    todos = np.arange(len(base))
+    partes = [_mais_proximos(base, normas, posicoes[comeco:comeco + BLOCO], todos, posicoes[comeco:comeco + BLOCO], k)
+              for comeco in range(0, len(posicoes), BLOCO)]
+    return np.vstack([p[0] for p in partes]), np.vstack([p[1] for p in partes])
+
+def _folhas(pontos, tamanho=BLOCO):
+    """Índices agrupados em folhas de até `tamanho` pontos vizinhos (árvore k-d, corte na mediana)."""
+    pendentes, folhas = [np.arange(len(pontos))], []
+    while pendentes:
+        grupo = pendentes.pop()
+        if len(grupo) <= tamanho:
+            folhas.append(grupo)
+            continue
+        trecho = pontos[grupo]
+        eixo = np.argmax(trecho.max(axis=0) - trecho.min(axis=0))
+        ordem = np.argsort(trecho[:, eixo], kind="stable")
+        pendentes += [grupo[ordem[:len(grupo) // 2]], grupo[ordem[len(grupo) // 2:]]]
+    return folhas
+
+def todos_os_vizinhos(base, k=VIZINHOS):
+    """
+    vizinhos() de todas as linhas, sem comparar todos com todos: as linhas são
+    agrupadas pela localização (folhas da árvore k-d) e uma folha só é comparada
+    com as folhas cuja caixa fica mais perto que o k-ésimo vizinho já achado (a
+    diferença de localização sozinha já é um piso para a distância). O resultado
+    é o mesmo da força bruta. Folhas em paralelo (o NumPy solta o GIL).
+    """
+    k = _k(base, k)
+    if k <= 0:
+        return np.zeros((len(base), 0), dtype=np.int64), np.zeros((len(base), 0), dtype=np.float32)
+    normas = np.einsum("ij,ij->i", base, base)
+    pontos = base[:, _LOCAL]
+    folhas = _folhas(pontos)
+    minimos = np.array([pontos[f].min(axis=0) for f in folhas])
+    maximos = np.array([pontos[f].max(axis=0) for f in folhas])
+    tamanhos = np.array([len(f) for f in folhas])
+    posicoes = np.zeros((len(base), k), dtype=np.int64)
+    distancias = np.zeros((len(base), k), dtype=np.float32)
+
+    def folha(i):
+        consulta = folhas[i]
+        vao = np.maximum(0, np.maximum(minimos - maximos[i], minimos[i] - maximos))
+        piso = np.sqrt((vao * vao).sum(axis=1))
+        piso[i] = -1  # a própria folha primeiro: as colunas 0..n-1 são as próprias consultas
+        ordem = np.argsort(piso, kind="stable")
+        # 1ª rodada: as folhas mais próximas até juntar alguns candidatos; dá um raio
+        primeiras = np.searchsorted(np.cumsum(tamanhos[ordem]), max(4 * BLOCO, k + 1)) + 1
+        candidatos = np.concatenate([folhas[j] for j in ordem[:primeiras]])
+        proprias = np.arange(len(consulta))
+        achados, raio = _mais_proximos(base, normas, consulta, candidatos, proprias, min(k, len(candidatos) - 1))
+        # 2ª rodada: toda folha cujo piso fica dentro do maior raio da folha
+        alcance = np.searchsorted(piso[ordem], raio[:, -1].max() if raio.shape[1] == k else np.inf, "right")
+        if alcance > primeiras:
+            candidatos = np.concatenate([folhas[j] for j in ordem[:alcance]])
+            achados, raio = _mais_proximos(base, normas, consulta, candidatos, proprias, k)
+        posicoes[consulta], distancias[consulta] = achados, raio
+
+    if THREADS > 1:
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            list(executor.map(folha, range(len(folhas))))
+    else:
+        for i in range(len(folhas)):
+            folha(i)
+    return posicoes, distancias
+
+# ===========================================
+# 💾 Leitura e gravação
+# ===========================================
+def _ler(conn, ler):
+    """Roda ler() numa transação de leitura: versão e linhas do mesmo instante do banco."""
+    conn.execute("BEGIN")
+    try:
+        return ler()
+    finally:
+        conn.execute("COMMIT")
+
+def _em_fatias(conn, sql, valores, tamanho=500):
+    """Roda sql (com "{}" no lugar da lista do IN) em fatias de valores; junta as linhas."""
+    valores = list(valores)
+    for comeco in range(0, len(valores), tamanho):
+        fatia = valores[comeco:comeco + tamanho]
+        yield from conn.execute(sql.format(",".join("?" * len(fatia))), fatia)
+
+def carregar_modelo(conn):
+    linha = conn.execute("SELECT parametros FROM semelhantes_modelo WHERE id = 1").fetchone()
+    return json.loads(linha[0]) if linha else None
+
+def _gravar_listas(conn, ids, afetados, posicoes, distancias, agora, antigas=None):
+    """Troca as listas de ids[afetados]; lista_em só muda se os vizinhos mudaram (ETag do detalhe)."""
+    apagar, novas, raios = [], [], []
+    for linha, vizinhos_linha, distancias_linha in zip(afetados, posicoes, distancias):
+        imovel_id = int(ids[linha])
+        lista = [int(ids[p]) for p in vizinhos_linha]
+        apagar.append((imovel_id,))
+        novas.extend((imovel_id, ordem, vizinho, float(d))
+                     for ordem, (vizinho, d) in enumerate(zip(lista, distancias_linha)))
+        raio = float(distancias_linha[-1]) if len(lista) == VIZINHOS else None
+        mudou = antigas is None or antigas.get(imovel_id) != lista
+        raios.append((raio, agora if mudou else None, imovel_id))
+    conn.executemany("DELETE FROM imoveis_semelhantes WHERE imovel_id = ?", apagar)
+    conn.executemany("""INSERT INTO imoveis_semelhantes (imovel_id, posicao, semelhante_id, distancia)
+                        VALUES (?, ?, ?, ?)""", novas)
+    conn.executemany("UPDATE imoveis_vetores SET raio = ?, lista_em = coalesce(?, lista_em) WHERE id = ?", raios)
+
+def recalcular(conn):
+    """Refaz vocabulário, normalização, vetores e todas as listas. Retorna quantas listas."""
+    def ler():
+        return banco.versao_catalogo(conn), conn.execute(f"SELECT {COLUNAS} FROM imoveis ORDER BY id").fetchall()
+    versao, linhas = _ler(conn, ler)
+
+    # Cálculo fora de qualquer trava: o site e o admin continuam escrevendo
+    textos = [palavras(imovel) for imovel in linhas]
+    modelo = ajustar(linhas, textos)
+    matriz = vetores(linhas, textos, modelo)
+    ids = np.array([imovel["id"] for imovel in linhas], dtype=np.int64)
+    posicoes, distancias = todos_os_vizinhos(matriz)
+
+    agora = banco.agora()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM imoveis_semelhantes")
+        conn.execute("DELETE FROM imoveis_vetores")
+        conn.execute("INSERT OR REPLACE INTO semelhantes_modelo (id, parametros, criado_em) VALUES (1, ?, ?)",
+                     (json.dumps(modelo), agora))
+        conn.executemany("INSERT INTO imoveis_vetores (id, vetor) VALUES (?, ?)",
+                         zip(ids.tolist(), map(bytes, matriz)))
+        _gravar_listas(conn, ids, range(len(ids)), posicoes, distancias, agora)
+        # Escritas durante o cálculo têm versão maior: a próxima atualização pega
+        conn.execute("UPDATE catalogo SET semelhantes_conferidas = ? WHERE id = 1", (versao,))
+    return len(ids)
+
+def _incremental(conn, conferidas, modelo):
+    def ler():
+        mudancas = conn.execute(f"""
+            SELECT imoveis_mudancas.id AS mudado, {", ".join(f"imoveis.{c}" for c in COLUNAS.split(", "))}
+            FROM imoveis_mudancas LEFT JOIN imoveis ON imoveis.id = imoveis_mudancas.id
+            WHERE imoveis_mudancas.versao > ?
+        """, (conferidas,)).fetchall()
+        guardados = conn.execute("SELECT id, vetor, raio FROM imoveis_vetores ORDER BY id").fetchall()
+        return banco.versao_catalogo(conn), mudancas, guardados
+    versao, mudancas, guardados = _ler(conn, ler)
+    if len(mudancas) > FRACAO_INCREMENTAL * max(len(guardados), VIZINHOS * 10):
+        return recalcular(conn)
+
+    # Base atual: vetores guardados, sem os apagados e com os alterados trocados
+    alterados = [m for m in mudancas if m["id"] is not None]
+    mudados = {m["mudado"] for m in mudancas}
+    guardados = [g for g in guardados if g["id"] not in mudados]
+    textos = [palavras(imovel) for imovel in alterados]
+    novos = vetores(alterados, textos, modelo)
+    dimensao = novos.shape[1]
+    ids = np.array([g["id"] for g in guardados] + [m["id"] for m in alterados], dtype=np.int64)
+    base = np.vstack([np.frombuffer(b"".join(g["vetor"] for g in guardados), dtype=np.float32).reshape(-1, dimensao),
+                      novos])
+    raios = np.array([g["raio"] if g["raio"] is not None else np.inf for g in guardados] + [np.inf] * len(alterados))
+    posicao_de = {int(i): p for p, i in enumerate(ids)}
+
+    # Listas que podem ter mudado:
+    afetados = set(range(len(guardados), len(ids)))                    # 1) as dos alterados/novos
+    afetados.update(posicao_de[linha[0]] for linha in _em_fatias(   # 2) quem tinha um mudado na lista
+        conn, "SELECT DISTINCT imovel_id FROM imoveis_semelhantes WHERE semelhante_id IN ({})", mudados
+    ) if linha[0] in posicao_de)
+    if len(novos):                                                      # 3) quem ficou com um alterado mais perto que o raio
+        distancias = np.sqrt(np.maximum(
+            np.einsum("ij,ij->i", base, base)[None, :] - 2 * (novos @ base.T) + np.einsum("ij,ij->i", novos, novos)[:, None], 0))
+        afetados.update(np.flatnonzero((distancias < raios).any(axis=0)).tolist())
+    afetados = np.array(sorted(afetados), dtype=np.int64)
+    posicoes, distancias = vizinhos(base, afetados)
+
+    agora = banco.agora()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("SELECT semelhantes_conferidas FROM catalogo WHERE id = 1").fetchone()[0] != conferidas:
+            return 0  # outro processo atualizou enquanto calculávamos: a próxima chamada continua dali
+        antigas = {}
+        for imovel_id, vizinho in _em_fatias(conn, """
+            SELECT imovel_id, semelhante_id FROM imoveis_semelhantes
+            WHERE imovel_id IN ({}) ORDER BY imovel_id, posicao
+        """, ids[afetados].tolist()):
+            antigas.setdefault(imovel_id, []).append(vizinho)
+        conn.executemany("DELETE FROM imoveis_vetores WHERE id = ?", [(i,) for i in mudados])
+        conn.executemany("INSERT INTO imoveis_vetores (id, vetor) VALUES (?, ?)",
+                         zip(ids[len(guardados):].tolist(), map(bytes, novos)))
+        _gravar_listas(conn, ids, afetados, posicoes, distancias, agora, antigas)
+        conn.execute("UPDATE catalogo SET semelhantes_conferidas = ? WHERE id = 1", (versao,))
+    return len(afetados)
+
+def atualizar(conn, tudo=False):
+    """
+    Põe os semelhantes em dia com as escritas desde a última vez (tudo=True recalcula tudo).
+    Chamado depois de /add, /edit, /delete e das escritas do gerenciador.
+    Retorna quantas listas foram refeitas (None sem NumPy).
+    """
+    if np is None:
+        return None
+    estado = conn.execute("""SELECT versao, historico_desde, semelhantes_conferidas
+                             FROM catalogo WHERE id = 1""").fetchone()
+    modelo = carregar_modelo(conn)
+    if (tudo or modelo is None or modelo.get("versao") != VERSAO
+            or estado["semelhantes_conferidas"] < estado["historico_desde"]):
+        return recalcular(conn)
+    if estado["semelhantes_conferidas"] >= estado["versao"]:
+        return 0
+    return _incremental(conn, estado["semelhantes_conferidas"], modelo)
+
+def apos_escrita(conn):
+    """atualizar() depois de uma escrita já gravada: um erro aqui não derruba a rota nem o gerenciador."""
+    try:
+        return atualizar(conn)
+    except Exception as e:
+        print("⚠️ Erro ao atualizar os imóveis semelhantes:", e)
+        return None
+
+# ===========================================
+# 🧵 Em segundo plano (uma thread por processo)
+# ===========================================
+_trabalhador = {"thread": None, "pid": None, "pendente": False}
+_trava = threading.Lock()
+
+def _rodar(database):
+    """Roda até não haver pedidos novos; os que chegam durante o cálculo viram uma rodada só."""
+    while True:
+        with _trava:
+            if not _trabalhador["pendente"]:
+                _trabalhador["thread"] = None
+                return
+            _trabalhador["pendente"] = False
+        conn = banco.conectar(database)
+        try:
+            if apos_escrita(conn):
+                # Listas novas mudam o detalhe: exporta de novo (se houver exportação)
+                congelar.agendar()
+        finally:
+            conn.close()
+
+def agendar(database=None):
+    """Atualiza as listas numa thread deste processo depois de uma escrita (idempotente)."""
+    if np is None:
+        return
+    with _trava:
+        _trabalhador["pendente"] = True
+        thread = _trabalhador["thread"]
+        if thread and thread.is_alive() and _trabalhador["pid"] == os.getpid():
+            return
+        thread = threading.Thread(target=_rodar, args=(database,), daemon=True, name="semelhantes")
+        _trabalhador.update(thread=thread, pid=os.getpid())
+        thread.start()
+
+if __name__ == "__main__":
+    if np is None:
+        print("⚠️ NumPy não instalado (pip install numpy): imóveis semelhantes desligados.")
+        sys.exit(0)
+    conn = banco.conectar()
+    banco.garantir_schema(conn)
+    inicio = time.perf_counter()
+    total = atualizar(conn, tudo="--tudo" in sys.argv)
+    conn.close()
+    print(f"🧭 Imóveis semelhantes: {total} lista(s) refeita(s) em {time.perf_counter() - inicio:.1f}s")
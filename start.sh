@@ -8,6 +8,20 @@
 export FLASK_APP=app.py
 export FLASK_ENV=production
 
+# Gera miniaturas das fotos locais que ainda não têm (rápido se já existem)
+python imagens.py
+
+# CSS/JS/imagens com hash no nome (cache immutable) e versões .gz/.br pré-comprimidas
+python ativos.py
+
+# Imóveis semelhantes: só o que mudou desde a última vez (tudo, na primeira)
+python semelhantes.py
+
+# Planos da listagem ainda usam os índices? Só avisa: plano ruim é lentidão, não queda
+python verificar_indices.py --resumo || echo "⚠️ Plano de consulta sem índice: veja o log acima."
+
 # Executa o Gunicorn (Render define automaticamente $PORT)
-exec gunicorn -w 4 -b 0.0.0.0:$PORT app:app
+# Modo e nº de workers/threads em gunicorn.conf.py: SERVIDOR=sync|gthread|asgi,
+# WEB_CONCURRENCY e THREADS
+exec gunicorn -c gunicorn.conf.py
 
@@ -1,22 +1,22 @@
 // =====================================================
 // 🏡 Service Worker - Celo Imóveis
-// Suporte offline + cache inteligente + página de fallback
+// Suporte offline + stale-while-revalidate + página de fallback
+// + catálogo no IndexedDB, sincronizado só pelas mudanças
 // =====================================================
 
-const CACHE_NAME = "celo-imoveis-cache-v2";
+// 📦 Preenchidos pelo servidor ao entregar /service-worker.js (ver app.py e ativos.py):
+// versão dos templates/ativos e URLs com hash dos arquivos para o cache inicial
+const VERSAO_ATIVOS = "dev";
+const ATIVOS = {};
+
+// Muda a cada deploy com CSS/imagens/templates novos: o cache antigo é apagado na ativação
+const CACHE_NAME = `celo-imoveis-${VERSAO_ATIVOS}`;
 
 // 🗂️ Lista de arquivos para cache inicial
-const urlsToCache = [
-  "/",
-  "/offline.html",
-  "/static/css/custom.css",
-  "/static/img/logo.png",
-  "/static/img/favicon-32x32.png",
-  "/static/img/favicon-192x192.png",
-  "/static/img/favicon-512x512.png",
-  "/static/img/favicon.ico",
-  "/static/manifest.json"
-];
+const urlsToCache = ["/", "/offline.html", ...Object.values(ATIVOS)];
+
+// 🔒 Páginas do admin nunca vão para o cache (nem a API de sincronização: ela vai para o IndexedDB)
+const naoCachear = ["/admin", "/login", "/logout", "/add", "/edit/", "/delete/", "/api/imoveis/"];
 
 // 🧱 Instalação
 self.addEventListener("install", (event) => {
@@ -29,7 +29,7 @@ self.addEventListener("install", (event) => {
   self.skipWaiting();
 });
 
-// ♻️ Ativação (remove caches antigos)
+// ♻️ Ativação (remove caches antigos e baixa o catálogo)
 self.addEventListener("activate", (event) => {
   event.waitUntil(
     caches.keys().then((cacheNames) => {
@@ -41,32 +41,288 @@ self.addEventListener("activate", (event) => {
           }
         })
       );
-    })
+    }).then(() => sincronizarCatalogo().catch(() => {}))
   );
   self.clients.claim();
 });
 
-// 🌐 Intercepta requisições (modo offline inteligente)
+// =====================================================
+// 🗄️ Catálogo no IndexedDB
+// "imoveis": um objeto por imóvel (chave id); "meta": versão do catálogo
+// =====================================================
+const DB_NOME = "celo-imoveis";
+const INTERVALO_SINCRONIZACAO = 60 * 1000; // no máximo uma sincronização por minuto
+
+function abrirBanco() {
+  return new Promise((resolve, reject) => {
+    const pedido = indexedDB.open(DB_NOME, 1);
+    pedido.onupgradeneeded = () => {
+      pedido.result.createObjectStore("imoveis", { keyPath: "id" });
+      pedido.result.createObjectStore("meta");
+    };
+    pedido.onsuccess = () => resolve(pedido.result);
+    pedido.onerror = () => reject(pedido.error);
+  });
+}
+
+function esperar(pedido) {
+  return new Promise((resolve, reject) => {
+    pedido.onsuccess = () => resolve(pedido.result);
+    pedido.onerror = () => reject(pedido.error);
+  });
+}
+
+async function lerMeta(chave) {
+  const db = await abrirBanco();
+  return esperar(db.transaction("meta").objectStore("meta").get(chave));
+}
+
+async function todosImoveis() {
+  const db = await abrirBanco();
+  return esperar(db.transaction("imoveis").objectStore("imoveis").getAll());
+}
+
+async function lerImovel(id) {
+  const db = await abrirBanco();
+  return esperar(db.transaction("imoveis").objectStore("imoveis").get(id));
+}
+
+// ✍️ Grava um snapshot (limpar = true) ou um delta, tudo numa transação só
+async function gravarCatalogo(dados, limpar) {
+  const db = await abrirBanco();
+  const tx = db.transaction(["imoveis", "meta"], "readwrite");
+  const imoveis = tx.objectStore("imoveis");
+  if (limpar) imoveis.clear();
+  for (const linha of dados.imoveis) {
+    const imovel = {};
+    dados.campos.forEach((campo, i) => { imovel[campo] = linha[i]; });
+    imoveis.put(imovel);
+  }
+  for (const id of dados.removidos || []) imoveis.delete(id);
+  tx.objectStore("meta").put(dados.versao, "versao");
+  tx.objectStore("meta").put(Date.now(), "sincronizado_em");
+  return new Promise((resolve, reject) => {
+    tx.oncomplete = () => resolve(dados.versao);
+    tx.onerror = () => reject(tx.error);
+  });
+}
+
+async function baixarSnapshot() {
+  const resposta = await fetch("/api/imoveis/snapshot", { credentials: "same-origin", cache: "no-store" });
+  if (!resposta.ok) throw new Error(`snapshot: HTTP ${resposta.status}`);
+  return gravarCatalogo(await resposta.json(), true);
+}
+
+// 🔄 Snapshot na primeira vez; depois só o que mudou desde a versão guardada
+let sincronizando = null;
+
+function sincronizarCatalogo(forcar = false) {
+  if (!sincronizando) {
+    sincronizando = (async () => {
+      const [versao, sincronizadoEm] = await Promise.all([lerMeta("versao"), lerMeta("sincronizado_em")]);
+      if (versao === undefined) return baixarSnapshot();
+      if (!forcar && Date.now() - (sincronizadoEm || 0) < INTERVALO_SINCRONIZACAO) return versao;
+
+      const resposta = await fetch(`/api/imoveis/changes?since=${versao}`,
+                                   { credentials: "same-origin", cache: "no-store" });
+      if (resposta.status === 410) return baixarSnapshot(); // histórico não cobre a versão guardada
+      if (!resposta.ok) throw new Error(`changes: HTTP ${resposta.status}`);
+      return gravarCatalogo(await resposta.json(), false);
+    })().finally(() => { sincronizando = null; });
+  }
+  return sincronizando;
+}
+
+// 📨 A página pode pedir uma sincronização (ex.: ao voltar a ficar online)
+self.addEventListener("message", (event) => {
+  if (event.data === "sincronizar") {
+    event.waitUntil(sincronizarCatalogo(true).catch(() => {}));
+  }
+});
+
+// ⏰ Sincronização periódica em segundo plano (onde o navegador suporta)
+self.addEventListener("periodicsync", (event) => {
+  if (event.tag === "catalogo") {
+    event.waitUntil(sincronizarCatalogo(true).catch(() => {}));
+  }
+});
+
+// =====================================================
+// 📴 Páginas offline a partir do IndexedDB
+// =====================================================
+function escapar(texto) {
+  return String(texto ?? "").replace(/[&<>"']/g, (c) => (
+    { "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;" }[c]
+  ));
+}
+
+function semAcentos(texto) {
+  return String(texto ?? "").normalize("NFD").replace(/[\u0300-\u036f]/g, "").toLowerCase();
+}
+
+// Os mesmos filtros da listagem (consultas.ler_filtros), aplicados no navegador
+function filtrarImoveis(imoveis, params) {
+  const palavras = semAcentos(params.get("busca")).split(/\s+/).filter(Boolean);
+  const minimos = ["dormitorios", "banheiros", "vagas"]
+    .map((campo) => [campo, parseInt(params.get(campo), 10)])
+    .filter(([, valor]) => valor > 0);
+
+  const resultado = imoveis.filter((imovel) => {
+    if (params.get("destaque") === "1" && !imovel.destaque) return false;
+    if (minimos.some(([campo, valor]) => (imovel[campo] || 0) < valor)) return false;
+    const texto = semAcentos(`${imovel.titulo} ${imovel.bairro || ""} ${imovel.cidade || ""}`);
+    return palavras.every((palavra) => texto.includes(palavra));
+  });
+
+  const semValor = (valor, padrao) => (valor === null || valor === undefined ? padrao : valor);
+  const ordens = {
+    preco_asc: (a, b) => semValor(a.preco_centavos, Infinity) - semValor(b.preco_centavos, Infinity),
+    preco_desc: (a, b) => semValor(b.preco_centavos, -1) - semValor(a.preco_centavos, -1),
+    area: (a, b) => semValor(b.area_m2, -1) - semValor(a.area_m2, -1),
+  };
+  return resultado.sort(ordens[params.get("ordenar")] || ((a, b) => b.id - a.id));
+}
+
+function paginaOffline(titulo, conteudo) {
+  return new Response(`<!DOCTYPE html>
+<html lang="pt-br">
+<head>
+  <meta charset="UTF-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1">
+  <title>${escapar(titulo)} - Celo Imóveis</title>
+  <link rel="stylesheet" href="${ATIVOS["css/custom.css"] || "/static/css/custom.css"}">
+</head>
+<body>
+  <div class="container py-4">
+    <p class="alert alert-warning">📴 Você está offline: mostrando o catálogo salvo neste aparelho.</p>
+    ${conteudo}
+  </div>
+</body>
+</html>`, { headers: { "Content-Type": "text/html; charset=utf-8" } });
+}
+
+function cardOffline(imovel) {
+  const detalhes = [
+    imovel.dormitorios ? `${imovel.dormitorios} dorm.` : "",
+    imovel.banheiros ? `${imovel.banheiros} banh.` : "",
+    imovel.vagas ? `${imovel.vagas} vaga(s)` : "",
+    imovel.area ? `${escapar(imovel.area)} m²` : "",
+  ].filter(Boolean).join(" · ");
+  return `<div class="card mb-3"><div class="card-body">
+    <h5 class="card-title"><a href="/imovel/${imovel.id}">${imovel.destaque ? "⭐ " : ""}${escapar(imovel.titulo)}</a></h5>
+    <p class="mb-1"><strong>${escapar(imovel.preco)}</strong></p>
+    ${imovel.bairro ? `<p class="mb-1 text-muted">📍 ${escapar(imovel.bairro)}${imovel.cidade ? `, ${escapar(imovel.cidade)}` : ""}</p>` : ""}
+    <p class="mb-0 small">${detalhes}</p>
+  </div></div>`;
+}
+
+const LIMITE_OFFLINE = 100;
+
+async function listagemOffline(url) {
+  const imoveis = filtrarImoveis(await todosImoveis(), url.searchParams);
+  if (!imoveis.length && !url.search) return null; // catálogo ainda não baixado
+  const cards = imoveis.slice(0, LIMITE_OFFLINE).map(cardOffline).join("");
+  const resto = imoveis.length > LIMITE_OFFLINE
+    ? `<p class="text-muted">… e mais ${imoveis.length - LIMITE_OFFLINE}. Refine a busca para ver os outros.</p>` : "";
+  return paginaOffline("Imóveis", `
+    <form method="GET" action="/" class="mb-3">
+      <input type="text" name="busca" value="${escapar(url.searchParams.get("busca"))}" placeholder="Buscar">
+      <button type="submit">Buscar</button>
+    </form>
+    <p class="text-muted small">${imoveis.length} imóve${imoveis.length === 1 ? "l" : "is"}</p>
+    ${cards || "<p>Nenhum imóvel encontrado.</p>"}${resto}`);
+}
+
+async function detalhesOffline(id) {
+  const imovel = await lerImovel(id);
+  if (!imovel) return null;
+  return paginaOffline(imovel.titulo, `
+    <p><a href="/">⬅ Voltar</a></p>
+    ${cardOffline(imovel)}
+    <p class="text-muted small">Fotos e descrição completa aparecem quando a conexão voltar.</p>`);
+}
+
+// 📴 Navegação sem rede e sem cópia no cache: monta a página com o catálogo local
+async function respostaOffline(request) {
+  const url = new URL(request.url);
+  if (request.mode === "navigate") {
+    try {
+      const detalhes = url.pathname.match(/^\/imovel\/(\d+)$/);
+      const pagina = detalhes ? await detalhesOffline(Number(detalhes[1]))
+        : url.pathname === "/" ? await listagemOffline(url) : null;
+      if (pagina) return pagina;
+    } catch (erro) {
+      console.log("📴 Catálogo offline indisponível:", erro);
+    }
+  }
+  return caches.match("/offline.html");
+}
+
+// 🔄 Revalida no servidor usando o ETag / Last-Modified da cópia guardada.
+// Se nada mudou o servidor responde 304 (sem corpo) e a cópia continua valendo.
+function revalidar(request, cache, cachedResponse) {
+  const headers = new Headers();
+  if (cachedResponse) {
+    const etag = cachedResponse.headers.get("ETag");
+    const lastModified = cachedResponse.headers.get("Last-Modified");
+    if (etag) headers.set("If-None-Match", etag);
+    if (lastModified) headers.set("If-Modified-Since", lastModified);
+  }
+
+  return fetch(request.url, { headers, credentials: "same-origin", cache: "no-store" })
+    .then((response) => {
+      if (response.status === 304 && cachedResponse) {
+        return cachedResponse;
+      }
+      if (response && response.status === 200 && response.type === "basic") {
+        cache.put(request, response.clone());
+      }
+      return response;
+    });
+}
+
+// 🌐 Intercepta requisições (stale-while-revalidate)
 self.addEventListener("fetch", (event) => {
-  event.respondWith(
-    fetch(event.request)
-      .then((response) => {
-        // Se resposta válida, salva no cache
-        if (!response || response.status !== 200 || response.type !== "basic") {
+  const request = event.request;
+  const url = new URL(request.url);
+
+  if (request.method !== "GET" || url.origin !== self.location.origin ||
+      naoCachear.some((prefixo) => url.pathname.startsWith(prefixo))) {
+    return;
+  }
+
+  // 📦 Arquivo com hash no nome nunca muda: cache primeiro, sem revalidar
+  if (url.pathname.startsWith("/ativos/")) {
+    event.respondWith(
+      caches.open(CACHE_NAME).then((cache) =>
+        cache.match(request).then((cachedResponse) => cachedResponse || fetch(request).then((response) => {
+          if (response.status === 200) cache.put(request, response.clone());
           return response;
+        }))
+      )
+    );
+    return;
+  }
+
+  // 🗄️ A cada navegação, aproveita para trazer as mudanças do catálogo (no máximo 1x/minuto)
+  if (request.mode === "navigate") {
+    event.waitUntil(sincronizarCatalogo().catch(() => {}));
+  }
+
+  event.respondWith(
+    caches.open(CACHE_NAME).then((cache) =>
+      cache.match(request).then((cachedResponse) => {
+        const atualizacao = revalidar(request, cache, cachedResponse);
+
+        if (cachedResponse) {
+          // ⚡ Responde na hora com a cópia e atualiza em segundo plano
+          event.waitUntil(atualizacao.catch(() => {}));
+          return cachedResponse;
         }
-        const responseToCache = response.clone();
-        caches.open(CACHE_NAME).then((cache) => {
-          cache.put(event.request, responseToCache);
-        });
-        return response;
-      })
-      .catch(() => {
-        // 📴 Se offline, exibe a página de fallback
-        return caches.match(event.request).then((cachedResponse) => {
-          return cachedResponse || caches.match("/offline.html");
-        });
+
+        // 📴 Sem cópia: espera a rede; se offline, monta a página com o catálogo local
+        return atualizacao.catch(() => respostaOffline(request));
       })
+    )
   );
 });
-
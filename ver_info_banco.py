@@ -5,15 +5,16 @@
 # Autor: Adilan (Celo Imóveis)
 # ===========================================
 
-import sqlite3
+import banco
 
 # Caminho do banco de dados local
-DATABASE = "database.db"
+DATABASE = banco.DATABASE
 
 def ver_info_banco():
     """Mostra informações importantes sobre a tabela 'imoveis'."""
+    conn = None
     try:
-        conn = sqlite3.connect(DATABASE)
+        conn = banco.conectar(DATABASE)
         cursor = conn.cursor()
 
         print("\n🔍 Analisando banco de dados...\n")
@@ -51,7 +52,8 @@ def ver_info_banco():
         print(f"❌ Erro ao acessar o banco: {e}")
 
     finally:
-        conn.close()
+        if conn is not None:
+            conn.close()
 
 
 if __name__ == "__main__":
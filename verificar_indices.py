@@ -0,0 +1,119 @@
+# ===========================================
+# 🧪 VERIFICAR ÍNDICES DA LISTAGEM
+# ===========================================
+# Função: Rodar EXPLAIN QUERY PLAN em todas as combinações de filtros
+#         da página inicial e falhar se alguma voltar a varrer a tabela inteira.
+# Roda no start.sh (só avisa) e antes de cada escala do bench_carga.py (que
+# para com erro); sai com código 1 se algum plano falhar.
+# Uso: python verificar_indices.py [--resumo]   (--resumo: só as falhas)
+# ===========================================
+
+import itertools
+import sys
+
+import banco
+import consultas
+
+FILTROS = {
+    "destaque": ["", "1"],
+    "dormitorios": ["", "2"],
+    "banheiros": ["", "2"],
+    "faixa_preco": ["", "200-400mil"],
+    "ordenar": ["", "preco_asc", "preco_desc", "area"],
+}
+# Mapa: sem área, retângulo visível e "perto de mim" (raio de 2 km)
+AREAS = [
+    {},
+    {"bbox": "-46.65,-24.11,-46.60,-24.08"},
+    {"lat": "-24.0935", "lon": "-46.6206", "raio": "2"},
+]
+
+def plano(conn, filtros, cursor=None):
+    sql, params = consultas.montar_consulta(
+        filtros, fts=banco.tem_fts(conn), cursor=cursor, limite=consultas.POR_PAGINA + 1, geo=banco.tem_geo(conn)
+    )
+    return [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+def verificar_plano(filtros, detalhes, paginando=False):
+    """Retorna a mensagem de erro, ou None se o plano estiver ok."""
+    filtrando = consultas.tem_filtro_indexado(filtros)
+    ordenando = filtros["ordenar"] in consultas.ORDENACOES
+
+    # Varredura completa (SCAN sem índice) só na listagem padrão: segue o rowid e para no LIMIT
+    varreduras = [d for d in detalhes if d.startswith("SCAN ") and " USING " not in d and "VIRTUAL TABLE" not in d]
+    if varreduras and (filtrando or ordenando or paginando or consultas.area_geografica(filtros)
+                       or any("TEMP B-TREE" in d for d in detalhes)):
+        return f"varre a tabela inteira ({varreduras[0]})"
+
+    if consultas.area_geografica(filtros):
+        # Área pequena do mapa: a R*Tree (ou o índice de um filtro) escolhe as linhas, nunca a tabela inteira
+        if not any("imoveis_geo VIRTUAL TABLE INDEX 2" in d for d in detalhes) and \
+                not (filtrando and any(d.startswith("SEARCH imoveis_cards USING INDEX") for d in detalhes)):
+            return "área do mapa sem R*Tree"
+        return None
+    if paginando and not filtrando:
+        # Páginas seguintes: o cursor vira uma busca por faixa (sem OFFSET)
+        if not any(d.startswith("SEARCH imoveis_cards") for d in detalhes):
+            return "cursor sem busca por faixa"
+    if filtrando:
+        # Todo filtro "N+" / destaque / faixa precisa ser uma busca por faixa no índice
+        if not any(d.startswith("SEARCH imoveis_cards USING INDEX") for d in detalhes):
+            return "filtro sem busca por índice"
+    elif ordenando:
+        # Sem filtros, a ordenação deve seguir o índice (sem ordenar em memória)
+        if not any(d.startswith(("SCAN imoveis_cards USING INDEX", "SEARCH imoveis_cards USING INDEX")) for d in detalhes):
+            return "ordenação sem índice"
+        if any("TEMP B-TREE" in d for d in detalhes):
+            return "ordenação em memória"
+    return None
+
+def verificar_indices(database=banco.DATABASE, detalhar=True):
+    conn = banco.conectar(database)
+    banco.garantir_schema(conn)
+
+    print("\n🧪 Verificando planos de consulta da listagem...\n")
+    falhas = 0
+    for valores, area in itertools.product(itertools.product(*FILTROS.values()), AREAS):
+        filtros = consultas.ler_filtros({**dict(zip(FILTROS.keys(), valores)), **area})
+        if filtros["ordenar"] in consultas.ORDENACOES:
+            n_chaves = len(consultas.ORDENACOES[filtros["ordenar"]])
+        else:
+            n_chaves = 2 if filtros["lat"] else len(consultas.ORDENACAO_PADRAO)  # distância + id
+        for cursor in (None, [1] * n_chaves):
+            detalhes = plano(conn, filtros, cursor)
+            erro = verificar_plano(filtros, detalhes, paginando=cursor is not None)
+            descricao = ", ".join(f"{k}={v}" for k, v in filtros.items() if v) or "(sem filtros)"
+            if cursor is not None:
+                descricao += " [página 2+]"
+            if erro:
+                falhas += 1
+                print(f"❌ {descricao}: {erro} → {detalhes}")
+            elif detalhar:
+                print(f"✅ {descricao}: {' | '.join(detalhes)}")
+
+    # 📏 ?limite= da API: zero, negativo ou enorme nunca vira LIMIT -1 (sem limite)
+    for valor, esperado in (("0", 1), ("-2", 1), ("", consultas.POR_PAGINA), ("5000", consultas.MAX_POR_PAGINA)):
+        limite = consultas.limite_pagina(valor)
+        imoveis, _ = consultas.buscar_pagina(conn, consultas.ler_filtros({}), limite=limite,
+                                             fts=banco.tem_fts(conn), geo=banco.tem_geo(conn))
+        if limite != esperado or len(imoveis) > esperado:
+            falhas += 1
+            print(f"❌ limite={valor!r}: {limite} → {len(imoveis)} imóveis (esperado até {esperado})")
+        elif detalhar:
+            print(f"✅ limite={valor!r}: página com {len(imoveis)} imóveis")
+
+    # 🧭 Semelhantes do detalhe: a lista pela chave primária e cada card pelo id
+    detalhes = [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + consultas.SQL_SEMELHANTES, (1,))]
+    if any(d.startswith("SCAN") or "TEMP B-TREE" in d for d in detalhes):
+        falhas += 1
+        print(f"❌ imóveis semelhantes: varre a tabela ou ordena em memória → {detalhes}")
+    elif detalhar:
+        print(f"✅ imóveis semelhantes: {' | '.join(detalhes)}")
+
+    conn.close()
+    print("────────────────────────────────────")
+    print(f"{'✅ Todos os planos usam índices.' if not falhas else f'❌ {falhas} plano(s) com problema.'}\n")
+    return falhas == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if verificar_indices(detalhar="--resumo" not in sys.argv) else 1)